@@ -38,7 +38,7 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
 
     import os
     import psutil
-    from modules.utils import subprocess_run, time, disconnect_this_device, sleep, check_connect, open_app, close_app, get_now_running_app, screenshot, click, check_app_running, subprocess, create_notificationer, EmulatorBlockError, istr, EN, CN, check_if_process_exist, _is_PC_app, get_screenshot_cv_data
+    from modules.utils import subprocess_run, time, disconnect_this_device, sleep, check_connect, open_app, close_app, get_now_running_app, screenshot, click, check_app_running, subprocess, create_notificationer, EmulatorBlockError, istr, EN, CN, check_if_process_exist, _is_PC_app, get_screenshot_cv_data, stop_capture_engines, close_input_routers, template_store, ocr_registry, save_learned_locations, log_location_stats, log_watchdog_stats, log_ocr_cache_stats, log_settle_stats, log_screenshot_stats, log_run_stats
     from modules.AllTask.myAllTask import my_AllTask
     from define_actions import FlowActionGroup
 
@@ -91,6 +91,20 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
                 logging.error(e)
 
 
+    def BAAH_warm_up_templates():
+        """
+        预加载当前服务器的模板图片，避免第一次匹配时才读取解码
+        """
+        if config.userconfigdict["TEMPLATE_WARM_UP"]:
+            template_store.warm_up(config.userconfigdict["PIC_PATH"])
+
+    def BAAH_warm_up_ocr():
+        """
+        启动模拟器期间在后台线程预加载文字识别模型，登录流程会用到英文和简体中文
+        """
+        if config.userconfigdict["OCR_WARM_UP"]:
+            ocr_registry.warm_up(["en", "zhs"])
+
     def _check_process_exist(pid):
         """
         检查进程是否存在
@@ -513,6 +527,7 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
         - 当前屏幕截图 --> now.png
         - 配置文件 --> userconfig.json
         - 错误跟踪文件 --> traceback.txt
+        - 最近的输入操作 --> input_journal.txt
         """
         import platform
         import sys
@@ -521,7 +536,7 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
         import json
         import cv2
         import traceback
-        from modules.utils import _get_edition
+        from modules.utils import _get_edition, input_journal
         logging.info({"zh_CN": "生成错误报告", "en_US": "Generate crash report"})
         now_timestr = time.strftime('%Y-%m-%d_%H-%M-%S')
         if not os.path.exists(config.CRASH_REPORT_FOLDER):
@@ -600,6 +615,9 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
         # *异常错误跟踪文件
         with open(os.path.join(report_path,"traceback.txt"), "w", encoding="utf-8") as f:
             f.write(traceback.format_exc())
+        # *最近的输入操作，与历史截图对照还原出错前的操作
+        with open(os.path.join(report_path,"input_journal.txt"), "w", encoding="utf-8") as f:
+            f.write(input_journal.format(count=50))
         # TODO: 网页报告生成
         logging.info({"zh_CN": "错误报告生成完成", "en_US": "Crash report generated"})
                     
@@ -616,6 +634,8 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
                 if run_precommand:
                     BAAH_run_pre_command()
                 BAAH_release_adb_port()
+                BAAH_warm_up_templates()
+                BAAH_warm_up_ocr()
                 BAAH_start_emulator()
                 BAAH_check_adb_connect()
                 BAAH_start_VPN()
@@ -625,6 +645,16 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
                 logging.info({"zh_CN": "运行任务", "en_US": "start running tasks"})
                 my_AllTask.run()
                 logging.info({"zh_CN": "所有任务结束", "en_US": "All tasks are finished"})
+                logging.debug(f"template store: {template_store.get_stats()}")
+                save_learned_locations()
+                log_location_stats()
+                log_watchdog_stats()
+                log_ocr_cache_stats()
+                log_settle_stats()
+                log_screenshot_stats()
+                log_run_stats()
+                stop_capture_engines()
+                close_input_routers()
                 BAAH_close_target_app()
                 BAAH_close_VPN()
                 BAAH_kill_emulator()
@@ -641,6 +671,9 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
                     CN: f"模拟器卡顿，重启模拟器: {str(ebe)}",
                     EN: f"Emulator Blocked, Restart Emulator: {str(ebe)}"
                 }))
+                stop_capture_engines()
+                close_input_routers()
+                save_learned_locations()
                 if config.sessiondict["EMULATOR_PROCESS_PID"] is None:
                     logging.error(istr({
                         CN: "无模拟器pid，无法重启模拟器，请确保模拟器由BAAH启动",
@@ -672,6 +705,10 @@ def BAAH_core_process(reread_config_name = None, must_auto_quit = False, msg_que
         # 最外层的except捕获正常运行过程中的错误 以及 模拟器重启次数达到最大值的错误
         except Exception as e:
             logging.error({"zh_CN": f"运行出错: {e}", "en_US": f"Error occurred: {e}"})
+            stop_capture_engines()
+            close_input_routers()
+            save_learned_locations()
+            log_run_stats()
             # 打印完整的错误信息
             import traceback
             # 打印错误信息, 保存日志信息到文件
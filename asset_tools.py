@@ -0,0 +1,259 @@
+"""
+素材维护工具，用法: python asset_tools.py <命令> [参数...]
+
+record <config文件名> <保存文件夹> [张数] [间隔秒数]
+    连接模拟器，每隔一段时间截图保存到文件夹，作为其他命令使用的截图素材
+regions <素材文件夹> <截图文件夹> [margin] [阈值]
+    在截图中匹配素材文件夹下的所有模板，把模板出现过的范围写入素材文件夹下的regions.json
+pyramid <素材文件夹> <截图文件夹> [阈值]
+    在截图上比较每个模板金字塔匹配与原图匹配的结果，把结果完全一致的缩小倍数写入regions.json
+pages <素材文件夹> <截图文件夹> [每个页面的指纹点数] [颜色容差]
+    由截图生成素材文件夹下PAGE模板的页面指纹page_fingerprints.json，并在这些截图上检验指纹的判断结果
+digits <素材文件夹> <截图文件夹> <x1,y1,x2,y2> [x1,y1,x2,y2 ...]
+    在截图的数字区域中切分字符，用文字识别模型标注后保存到素材文件夹下的DIGIT文件夹，供数字识别使用
+
+例如: python asset_tools.py regions ./DATA/assets ./DATA/RECORDS
+"""
+import os
+import sys
+import json
+import time
+import cv2
+
+def _list_pngs(folder):
+    """列出folder下（包含子文件夹）所有png文件的路径"""
+    pngs = []
+    for root, dirs, files in os.walk(folder):
+        for filename in sorted(files):
+            if filename.endswith(".png"):
+                pngs.append(os.path.join(root, filename))
+    return sorted(pngs)
+
+def _load_screenshots(screenshot_folder):
+    screenshots = [cv2.imread(each) for each in _list_pngs(screenshot_folder)]
+    screenshots = [each for each in screenshots if each is not None]
+    print(f"{len(screenshots)} screenshots loaded")
+    return screenshots
+
+def _list_templates(asset_folder):
+    """列出素材文件夹下所有模板的 (键, 路径)，键形如 BUTTON/BUTTON_HOME_ICON"""
+    for category in ["PAGE", "BUTTON", "POPUP"]:
+        for template_path in _list_pngs(os.path.join(asset_folder, category)):
+            yield f"{category}/{os.path.splitext(os.path.basename(template_path))[0]}", template_path
+
+def _read_region_file(asset_folder):
+    from modules.utils.template_store import REGION_FILE_NAME, DEFAULT_REGION_MARGIN
+    data = {"margin": DEFAULT_REGION_MARGIN, "regions": {}, "pyramid": {}}
+    region_file = os.path.join(asset_folder, REGION_FILE_NAME)
+    if os.path.exists(region_file):
+        with open(region_file, "r", encoding="utf-8") as f:
+            data.update(json.load(f))
+    return data
+
+def _write_region_file(asset_folder, data):
+    from modules.utils.template_store import REGION_FILE_NAME
+    region_file = os.path.join(asset_folder, REGION_FILE_NAME)
+    # 每个模板写成一行，方便手动查看修改
+    sections = []
+    for section in ["regions", "pyramid"]:
+        lines = [f'        "{key}": {json.dumps(data[section][key])}' for key in sorted(data[section])]
+        sections.append('    "%s": {\n%s\n    }' % (section, ",\n".join(lines)) if lines else f'    "{section}": {{}}')
+    with open(region_file, "w", encoding="utf-8") as f:
+        f.write('{\n    "margin": %d,\n%s\n}\n' % (int(data["margin"]), ",\n".join(sections)))
+    print(f"written to {region_file}")
+
+def record(config_name, output_folder, count = 100, interval = 2):
+    """每隔interval秒截图一次，共count张，保存到output_folder"""
+    from modules.configs.MyConfig import config
+    config.parse_user_config(config_name)
+    from modules.utils import connect_to_device, screenshot, get_screenshot_cv_data
+    os.makedirs(output_folder, exist_ok=True)
+    connect_to_device()
+    for i in range(int(count)):
+        screenshot()
+        data = get_screenshot_cv_data()
+        if data is not None:
+            filename = os.path.join(output_folder, f"{time.strftime('%Y%m%d_%H%M%S')}_{i}.png")
+            cv2.imwrite(filename, data)
+            print(f"[{i + 1}/{count}] {filename}")
+        time.sleep(float(interval))
+
+def regions(asset_folder, screenshot_folder, margin = 20, threshold = 0.9):
+    """
+    从截图中推导每个模板的搜索区域，与已有的regions.json合并（取并集）后写回
+    """
+    from modules.utils.template_store import template_store
+    from modules.utils.image_processing import _match_template
+    threshold = float(threshold)
+    screenshots = _load_screenshots(screenshot_folder)
+    data = _read_region_file(asset_folder)
+    data["margin"] = int(margin)
+    found = data["regions"]
+    for key, template_path in _list_templates(asset_folder):
+        template = template_store.get(template_path)
+        if template is None:
+            continue
+        times = 0
+        for screenshot_data in screenshots:
+            matched = _match_template(screenshot_data, template)
+            if matched is None or matched[1] < threshold:
+                continue
+            times += 1
+            x, y = matched[2]
+            box = [x, y, x + template.w, y + template.h]
+            if key in found:
+                old = found[key]
+                box = [min(old[0], box[0]), min(old[1], box[1]), max(old[2], box[2]), max(old[3], box[3])]
+            found[key] = box
+        print(f"{key}: matched {times} times, region {found.get(key)}")
+    print(f"{len(found)} regions")
+    _write_region_file(asset_folder, data)
+
+def pyramid(asset_folder, screenshot_folder, threshold = 0.9):
+    """
+    在截图上比较每个模板 金字塔匹配 与 原图匹配 的结果，把结果完全一致的最大缩小倍数写入regions.json
+    """
+    from modules.utils.template_store import template_store
+    from modules.utils.image_processing import _match_template, _match_template_pyramid, PYRAMID_SCALES
+    threshold = float(threshold)
+    screenshots = _load_screenshots(screenshot_folder)
+    data = _read_region_file(asset_folder)
+    exact_cost, pyramid_cost = 0, 0
+    for key, template_path in _list_templates(asset_folder):
+        template = template_store.get(template_path)
+        if template is None:
+            continue
+        exact_results = []
+        start = time.perf_counter()
+        for screenshot_data in screenshots:
+            exact_results.append(_match_template(screenshot_data, template))
+        template_exact_cost = time.perf_counter() - start
+        chosen, chosen_cost = 1, template_exact_cost
+        for scale in PYRAMID_SCALES:
+            if min(template.h, template.w) // scale < 8:
+                continue
+            agree = 0
+            start = time.perf_counter()
+            for screenshot_data, exact in zip(screenshots, exact_results):
+                coarse = _match_template_pyramid(screenshot_data, template, scale, threshold)
+                exact_found = exact is not None and exact[1] >= threshold
+                coarse_found = coarse is not None
+                # 匹配与否一致，匹配上时位置也一致
+                if exact_found == coarse_found and (not exact_found or (abs(exact[2][0] - coarse[2][0]) <= 1 and abs(exact[2][1] - coarse[2][1]) <= 1)):
+                    agree += 1
+            cost = time.perf_counter() - start
+            print(f"{key} x{scale}: agree {agree}/{len(screenshots)}, {cost / max(len(screenshots), 1) * 1000:.2f} ms vs {template_exact_cost / max(len(screenshots), 1) * 1000:.2f} ms")
+            if agree == len(screenshots):
+                chosen, chosen_cost = scale, cost
+                break
+        data["pyramid"][key] = chosen
+        exact_cost += template_exact_cost
+        pyramid_cost += chosen_cost
+    print(f"total: exact {exact_cost:.2f} s, with validated pyramid scales {pyramid_cost:.2f} s")
+    _write_region_file(asset_folder, data)
+
+def pages(asset_folder, screenshot_folder, points = 16, tolerance = 30):
+    """
+    生成页面指纹，并统计在截图上的判断结果: 正确 / 不明确（需要模板匹配） / 错误
+    """
+    from modules.utils.page_classifier import compile_page_fingerprints, get_page_classifier, FINGERPRINT_FILE_NAME
+    screenshots = _load_screenshots(screenshot_folder)
+    fingerprints, truths = compile_page_fingerprints(asset_folder, screenshots, points=int(points), tolerance=int(tolerance))
+    with open(os.path.join(asset_folder, FINGERPRINT_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, indent=4)
+    classifier = get_page_classifier(asset_folder)
+    print(f"{len(classifier.page_names)} pages fingerprinted, without fingerprint: {classifier.unknown_pages}")
+    correct, ambiguous, wrong = 0, 0, 0
+    start = time.perf_counter()
+    for screenshot_data, truth in zip(screenshots, truths):
+        # 与Page.identify的判断过程一致
+        scores = classifier.score(screenshot_data)
+        confident = [name for name, score in scores if score >= 0.9]
+        candidates = [name for name, score in scores if score >= 0.5] + classifier.unknown_pages
+        if len(confident) == 1:
+            if confident[0] in truth:
+                correct += 1
+            else:
+                wrong += 1
+        elif candidates:
+            # 需要模板匹配，模板匹配的候选中包含正确的页面即可
+            if not truth or set(truth) & set(candidates):
+                ambiguous += 1
+            else:
+                wrong += 1
+        elif not truth:
+            correct += 1
+        else:
+            wrong += 1
+    cost = (time.perf_counter() - start) / max(len(screenshots), 1) * 1000
+    print(f"correct: {correct}, ambiguous: {ambiguous}, wrong: {wrong}, {cost:.3f} ms per screenshot")
+
+def digits(asset_folder, screenshot_folder, *areas, max_per_char = 4, min_ocr_score = 0.95):
+    """
+    收集数字字形: 文字识别模型识别出的字符数与切分出的字符数一致时，按顺序给每个字符标注，
+    与同一字符已有字形的相关系数都低于0.95时作为新的字形保存，每个字符最多保存max_per_char个
+    """
+    import numpy as np
+    from modules.utils.digit_recognizer import GLYPH_FOLDER_NAME, DIGIT_MIN_CONFIDENCE, DigitRecognizer, segment_glyphs, glyph_char, glyph_file_name, _glyph_vector
+    from modules.utils.image_processing import ocr_pic_area
+    areas = [[int(v) for v in area.split(",")] for area in areas]
+    if not areas:
+        print(__doc__)
+        return
+    screenshots = _load_screenshots(screenshot_folder)
+    glyph_folder = os.path.join(asset_folder, GLYPH_FOLDER_NAME)
+    os.makedirs(glyph_folder, exist_ok=True)
+    saved = {}
+    for filename in os.listdir(glyph_folder):
+        if filename.endswith(".png"):
+            glyph_mat = cv2.imread(os.path.join(glyph_folder, filename), cv2.IMREAD_GRAYSCALE)
+            if glyph_mat is not None:
+                saved.setdefault(glyph_char(filename), []).append(_glyph_vector(glyph_mat))
+    added, skipped = 0, 0
+    for screenshot_data in screenshots:
+        for x1, y1, x2, y2 in areas:
+            text, score = ocr_pic_area(screenshot_data, x1, y1, x2, y2)
+            text = text.replace(" ", "")
+            glyphs = segment_glyphs(screenshot_data[y1:y2, x1:x2])
+            if not text or score < min_ocr_score or len(text) != len(glyphs):
+                skipped += 1
+                continue
+            for char, (_, glyph_mat) in zip(text, glyphs):
+                vectors = saved.setdefault(char, [])
+                if len(vectors) >= max_per_char:
+                    continue
+                vector = _glyph_vector(glyph_mat)
+                if vectors and max(float(vector @ each) for each in vectors) >= 0.95:
+                    continue
+                vectors.append(vector)
+                cv2.imwrite(os.path.join(glyph_folder, f"{glyph_file_name(char)}_{len(vectors)}.png"), glyph_mat)
+                added += 1
+    print(f"{added} glyphs added, {skipped} areas skipped (OCR uncertain or segmentation mismatch)")
+    print("glyphs: " + ", ".join(f"{char}={len(vectors)}" for char, vectors in sorted(saved.items())))
+    # 在同样的区域上检验字形识别与文字识别模型的一致率和耗时
+    recognizer = DigitRecognizer(asset_folder)
+    agree, confident, total, cost = 0, 0, 0, 0
+    for screenshot_data in screenshots:
+        for x1, y1, x2, y2 in areas:
+            start = time.perf_counter()
+            text, confidence = recognizer.recognize(screenshot_data[y1:y2, x1:x2])
+            cost += time.perf_counter() - start
+            total += 1
+            if confidence >= DIGIT_MIN_CONFIDENCE:
+                confident += 1
+                agree += text == ocr_pic_area(screenshot_data, x1, y1, x2, y2)[0].replace(" ", "")
+    print(f"confident: {confident}/{total}, agree with OCR: {agree}/{confident}, {cost / max(total, 1) * 1e6:.1f} us per area")
+
+COMMANDS = {
+    "record": record,
+    "regions": regions,
+    "pages": pages,
+    "pyramid": pyramid,
+    "digits": digits,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(0)
+    COMMANDS[sys.argv[1]](*sys.argv[2:])
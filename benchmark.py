@@ -0,0 +1,105 @@
+"""
+性能测试脚本，用法: python benchmark.py <config文件名> <测试项> [次数]
+
+例如: python benchmark.py config.json adb 50
+"""
+import sys
+import time
+import cv2
+import numpy as np
+from modules.configs.MyConfig import config
+if len(sys.argv) < 3:
+    print(__doc__)
+    sys.exit(0)
+config.parse_user_config(sys.argv[1])
+from modules.utils import *
+from modules.AllPage.Page import Page
+
+def _timeit(func, times):
+    """执行func times次，返回每秒执行次数"""
+    start = time.perf_counter()
+    for _ in range(times):
+        func()
+    cost = time.perf_counter() - start
+    return times / cost if cost > 0 else float("inf")
+
+def bench_adb(times):
+    """比较每条命令启动adb进程 与 直接连接adb server 两种方式的点击和截图速度"""
+    connect_to_device()
+    origin_method = config.userconfigdict["ADB_CONNECT_METHOD"]
+    for method in ["subprocess", "socket"]:
+        config.userconfigdict["ADB_CONNECT_METHOD"] = method
+        if method == "socket" and not adb_client.is_available():
+            print(f"[{method}] adb server unavailable, skip")
+            continue
+        # 点击魔法点，不会触发任何操作
+        taps = _timeit(lambda: click_on_screen(*Page.MAGICPOINT), times)
+        frames = _timeit(lambda: screen_shot_to_global(), times)
+        print(f"[{method}] taps/sec: {taps:.2f}, frames/sec: {frames:.2f}")
+    config.userconfigdict["ADB_CONNECT_METHOD"] = origin_method
+
+def bench_input(times):
+    """比较各输入方式的单次点击耗时，maatouch只是把事件写入管道，不等待设备处理完"""
+    connect_to_device()
+    for method in INPUT_METHODS:
+        backend = INPUT_BACKEND_CLASSES[method](config)
+        if not backend.is_available():
+            print(f"[{method}] unavailable, skip")
+            continue
+        # 点击魔法点，不会触发任何操作
+        taps = _timeit(lambda: backend.tap(*Page.MAGICPOINT), times)
+        print(f"[{method}] ms/tap: {1000 / taps:.2f}")
+        backend.close()
+
+def bench_screenshot(times):
+    """比较pipe(png编码) 与 raw(原始帧) 截图方式的速度"""
+    connect_to_device()
+    origin_method = config.userconfigdict["SCREENSHOT_METHOD"]
+    origin_compress = config.userconfigdict["RAW_SCREENSHOT_COMPRESS"]
+    for method, compress in [("pipe", "none"), ("raw", "none"), ("raw", "gzip")]:
+        config.userconfigdict["SCREENSHOT_METHOD"] = method
+        config.userconfigdict["RAW_SCREENSHOT_COMPRESS"] = compress
+        frames = _timeit(lambda: screen_shot_to_global(), times)
+        print(f"[{method}, compress={compress}] frames/sec: {frames:.2f}")
+    config.userconfigdict["SCREENSHOT_METHOD"] = origin_method
+    config.userconfigdict["RAW_SCREENSHOT_COMPRESS"] = origin_compress
+
+def _python_nms(result, threshold, w, h):
+    """原来的多点匹配去重实现，作为对照"""
+    loc = np.where(result >= threshold)
+    pt_scores = [(pt[0], pt[1], result[pt[1], pt[0]]) for pt in zip(*loc[::-1])]
+    pt_scores.sort(key=lambda x: x[2], reverse=True)
+    filtered_pts = []
+    for x, y, val in pt_scores:
+        if not any(abs(x - fx) < w / 2 and abs(y - fy) < h / 2 for fx, fy, _ in filtered_pts):
+            filtered_pts.append((x, y, val))
+    return filtered_pts
+
+def bench_nms(times):
+    """多点匹配去重: 随着超过阈值的候选点增多，原实现 与 non_max_suppression 的耗时"""
+    rng = np.random.default_rng(0)
+    w, h = 60, 60
+    # 平滑的随机匹配结果矩阵，大小与1280*720截图上匹配60*60模板相同
+    result = cv2.GaussianBlur(rng.random((720 - h + 1, 1280 - w + 1)).astype(np.float32), (0, 0), 4)
+    result = (result - result.min()) / (result.max() - result.min())
+    for threshold in [0.9, 0.8, 0.7, 0.6, 0.5]:
+        candidates = int((result >= threshold).sum())
+        vectorized = _timeit(lambda: non_max_suppression(result, threshold, w, h), times)
+        python_times = max(1, min(times, 3))
+        python = _timeit(lambda: _python_nms(result, threshold, w, h), python_times)
+        print(f"[threshold {threshold}] candidates: {candidates}, python: {1000 / python:.2f} ms, vectorized: {1000 / vectorized:.2f} ms, matches: {len(_python_nms(result, threshold, w, h))} / {len(non_max_suppression(result, threshold, w, h))}")
+
+BENCHMARKS = {
+    "adb": bench_adb,
+    "input": bench_input,
+    "screenshot": bench_screenshot,
+    "nms": bench_nms,
+}
+
+if __name__ == "__main__":
+    bench_name = sys.argv[2]
+    bench_times = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    if bench_name not in BENCHMARKS:
+        print(f"Unknown benchmark {bench_name}, choose from {list(BENCHMARKS.keys())}")
+        sys.exit(1)
+    BENCHMARKS[bench_name](bench_times)
@@ -1,6 +1,8 @@
 import multiprocessing
 import multiprocessing.managers
 from BAAH import BAAH_core_process, BAAH_single_func_process
+from modules.utils.ocr_server import ensure_ocr_server
+from ..define import gui_shared_config
 
 class RunningBAAHProcess:
     def __init__(self):
@@ -40,6 +42,9 @@ class RunningBAAHProcess:
         如果进程已经在运行，则返回原有的queue
         """
         if not self.check_is_running(configname):
+            if gui_shared_config.softwareconfigdict["OCR_SERVER"]:
+                # 第一个运行的配置启动共用的文字识别服务，之后的配置直接连接
+                ensure_ocr_server(gui_shared_config.softwareconfigdict["OCR_SERVER_PORT"])
             # 用于共享消息
             manager = self.__ctx.Manager()
             queue = manager.Queue()
@@ -26,6 +26,15 @@ def set_other(config, gui_shared_config):
         # 错误报告
         ui.checkbox(config.get_text("config_crash_report")).bind_value(gui_shared_config.softwareconfigdict, "ENABLE_CRASH_REPORT")
     
+    with ui.row():
+        # 共用的文字识别服务
+        ui.checkbox(config.get_text("config_ocr_server")).bind_value(gui_shared_config.softwareconfigdict, "OCR_SERVER")
+        ui.number(config.get_text("config_ocr_server_port"),
+                  step=1,
+                  min=1024,
+                  max=65535,
+                  precision=0).bind_value(gui_shared_config.softwareconfigdict, 'OCR_SERVER_PORT', forward=lambda x:int(x), backward=lambda x:int(x))
+    
     with ui.row():
         ui.number(config.get_text("config_run_until_try_times"),
                   step=1,
@@ -45,6 +54,15 @@ def set_other(config, gui_shared_config):
                     suffix="s",
                     step=0.1,
                     precision=1).bind_value(config.userconfigdict, 'TIME_AFTER_CLICK')
+        # 画面稳定后提前结束等待
+        ui.checkbox(config.get_text("config_wait_screen_settle")).bind_value(config.userconfigdict, 'WAIT_SCREEN_SETTLE')
+        ui.number(config.get_text("config_screen_settle_stable_time"),
+                    suffix="s",
+                    step=0.05,
+                    min=0.05,
+                    precision=2).bind_value(config.userconfigdict, 'SCREEN_SETTLE_STABLE_TIME').bind_visibility_from(config.userconfigdict, 'WAIT_SCREEN_SETTLE')
+        # 按设备时序缩放等待时间
+        ui.checkbox(config.get_text("config_timing_profile_scale")).bind_value(config.userconfigdict, 'TIMING_PROFILE_SCALE')
     
     ui.label(config.get_text("config_desc_response_y"))
     with ui.row():
@@ -56,7 +74,49 @@ def set_other(config, gui_shared_config):
     
     with ui.row():
         # 截图模式
-        ui.select(options=["png", "pipe"], label=config.get_text("config_screenshot_mode")).bind_value(config.userconfigdict, 'SCREENSHOT_METHOD').style('width: 400px')
+        ui.select(options=["png", "pipe", "raw"], label=config.get_text("config_screenshot_mode")).bind_value(config.userconfigdict, 'SCREENSHOT_METHOD').style('width: 400px')
+        # 没有输入操作时沿用上一帧截图
+        ui.number(config.get_text("config_screenshot_reuse_age"),
+                    suffix="s",
+                    step=0.1,
+                    min=0,
+                    precision=1).bind_value(config.userconfigdict, 'SCREENSHOT_REUSE_AGE')
+        # raw截图传输压缩
+        ui.select(options=["none", "gzip"], label=config.get_text("config_raw_screenshot_compress")).bind_value(config.userconfigdict, 'RAW_SCREENSHOT_COMPRESS').style('width: 400px').bind_visibility_from(config.userconfigdict, 'SCREENSHOT_METHOD', lambda v: v == "raw")
+
+    with ui.row():
+        # 后台持续截图
+        ui.checkbox(config.get_text("config_continuous_capture")).bind_value(config.userconfigdict, 'CONTINUOUS_CAPTURE').bind_enabled_from(config.userconfigdict, 'SCREENSHOT_METHOD', lambda v: v in ["pipe", "raw"])
+        # 启动时预加载模板图片
+        ui.checkbox(config.get_text("config_template_warm_up")).bind_value(config.userconfigdict, 'TEMPLATE_WARM_UP')
+        # 按区域匹配模板
+        ui.checkbox(config.get_text("config_template_search_region")).bind_value(config.userconfigdict, 'TEMPLATE_SEARCH_REGION')
+        # 记住模板匹配位置
+        ui.checkbox(config.get_text("config_template_learn_location")).bind_value(config.userconfigdict, 'TEMPLATE_LEARN_LOCATION')
+        # 金字塔匹配
+        ui.checkbox(config.get_text("config_template_pyramid_match")).bind_value(config.userconfigdict, 'TEMPLATE_PYRAMID_MATCH')
+        # 启动时预加载文字识别模型
+        ui.checkbox(config.get_text("config_ocr_warm_up")).bind_value(config.userconfigdict, 'OCR_WARM_UP')
+        # 数字字形识别
+        ui.checkbox(config.get_text("config_digit_recognizer")).bind_value(config.userconfigdict, 'DIGIT_RECOGNIZER')
+
+    with ui.row():
+        # 文字识别线程数与执行方式
+        ui.number(config.get_text("config_ocr_intra_op_threads"),
+                  step=1,
+                  min=0,
+                  precision=0).bind_value(config.userconfigdict, 'OCR_INTRA_OP_THREADS', forward=lambda x:int(x), backward=lambda x:int(x))
+        ui.number(config.get_text("config_ocr_inter_op_threads"),
+                  step=1,
+                  min=0,
+                  precision=0).bind_value(config.userconfigdict, 'OCR_INTER_OP_THREADS', forward=lambda x:int(x), backward=lambda x:int(x))
+        ui.select(options=["sequential", "parallel"], label=config.get_text("config_ocr_execution_mode")).bind_value(config.userconfigdict, 'OCR_EXECUTION_MODE').style('width: 200px')
+
+    with ui.row():
+        # adb通信方式
+        ui.select(options=["socket", "subprocess"], label=config.get_text("config_adb_connect_method")).bind_value(config.userconfigdict, 'ADB_CONNECT_METHOD').style('width: 400px')
+        # 点击/滑动的输入方式
+        ui.select(options=["maatouch", "shell", "subprocess"], label=config.get_text("config_input_method")).bind_value(config.userconfigdict, 'INPUT_METHOD').style('width: 400px')
 
     ui.label(config.get_text("config_warn_change")).style('color: red')
 
@@ -21,6 +21,10 @@ def run_baah_script(config_name):
                 raise FileNotFoundError(f"Config file {config_name} not found")
 
             config.parse_user_config(config_name)
+            if config.softwareconfigdict["OCR_SERVER"]:
+                # 本机还没有文字识别服务时启动一个，同时运行的其他BAAH进程可以共用
+                from modules.utils.ocr_server import ensure_ocr_server
+                ensure_ocr_server(config.softwareconfigdict["OCR_SERVER_PORT"])
         else:
             logging.warn({"zh_CN": "启动程序时没有指定配置文件,启动时请设置如 'BAAH.exe ceshi.json' 启动参数", "en_US": "No config file specified when starting the program, please use 'BAAH.exe configname' to declare config name"})
             raise Exception("No config file specified")
@@ -1,4 +1,4 @@
-from modules.utils import match, page_pic
+from modules.utils import match, page_pic, identify_page, PageCheck, PixelCheck
 
 from modules.configs.MyConfig import config
 
@@ -87,4 +87,31 @@ class Page:
         ------
         如果是指定页面，返回True，否则返回False
         """
-        return match(page_pic(pagename), threshold=threshold)
\ No newline at end of file
+        return Page.page_check(pagename, threshold).evaluate()
+
+    @staticmethod
+    def page_check(pagename, threshold=0.9) -> PageCheck:
+        """
+        指定页面的判断条件，用于和其他截图判断条件组合
+
+        有页面指纹（asset_tools.py pages 生成）时先用指纹判断，不确定时再做模板匹配
+        """
+        return PageCheck(pagename, threshold=threshold)
+
+    @staticmethod
+    def popup_check():
+        """
+        当前截图上没有弹窗遮挡时MAGICPOINT处是白色，用于和其他截图判断条件组合
+        """
+        return PixelCheck(Page.MAGICPOINT, Page.COLOR_WHITE)
+
+    @staticmethod
+    def identify(confidence=0.9):
+        """
+        判断当前截图是哪个页面，见identify_page
+
+        Return
+        ------
+        (页面名, 置信度)，不是任何已知页面时页面名为None
+        """
+        return identify_page(confidence)
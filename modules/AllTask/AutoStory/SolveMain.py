@@ -12,7 +12,7 @@ from modules.AllTask.Task import Task
 from modules.AllTask.AutoStory.StoryHelper import try_to_solve_new_section, goto_story_page
 
 from modules.utils import (click, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, screenshot,
-                           match_pixel, istr, CN, EN)
+                           match_pixel, istr, CN, EN, get_respond_y)
 
 
 class SolveMain(Task):
@@ -77,7 +77,7 @@ class SolveMain(Task):
             offset_lr = i%2 # 0左1右
             if i !=0 and offset_lr == 0:
                 # 往右翻页
-                ScrollSelect.compute_swipe(809, 365, distance=600, responsedist=config.userconfigdict['RESPOND_Y'], horizontal=True)
+                ScrollSelect.compute_swipe(809, 365, distance=600, responsedist=get_respond_y(), horizontal=True)
             # 两次不同高度
             click((x_click[0], y_click[0]) if offset_lr==0 else (x_click[1], y_click[0]))
             click((x_click[0], y_click[1]) if offset_lr==0 else (x_click[1], y_click[1]))
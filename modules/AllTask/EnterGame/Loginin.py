@@ -9,7 +9,7 @@ from modules.AllTask.Task import Task
 
 from modules.utils.log_utils import logging
 
-from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, check_app_running, open_app, config, screenshot, EmulatorBlockError, istr, CN, EN, match_pixel, OCR_LANG, ocr_area, get_screenshot_cv_data, _is_STEAM_app
+from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, check_app_running, open_app, config, screenshot, EmulatorBlockError, istr, CN, EN, match_pixel, OCR_LANG, ocr_area, get_screenshot_cv_data, _is_STEAM_app, match_first, scaled_wait
 
 from modules.AllTask.EnterGame.GameUpdate import GameUpdate
 
@@ -33,6 +33,8 @@ class Loginin(Task):
         self.meet_login_page = False
         # 每轮检测中间休息间隔
         self.sleep_between_detect = 3
+        # 按设备时序缩放后的实际检测间隔，on_run时计算
+        self.detect_interval = self.sleep_between_detect
         # 进入游戏后还会蹦出来活动弹窗,这里让run_until能多跑几轮
         self.extra_run_times = 2
         # steam 和 安卓包 活动弹窗左下勾的位置
@@ -108,7 +110,7 @@ class Loginin(Task):
         if self.detect_loading_bar() > 10:
             bar_percent = self.detect_loading_bar()
             # 默认宽恕一定时间
-            self.task_start_time += 0.5 * self.sleep_between_detect
+            self.task_start_time += 0.5 * self.detect_interval
             bar_percent_updated = False
             external_time_triggered = False
             # 检测进度条是否动了,每5秒检测一次，如果动了就宽恕这之间的时间
@@ -146,6 +148,22 @@ class Loginin(Task):
         else:
             event_button_text = ocr_area(self.APP_event_check_box[0], self.APP_event_check_box[1])[0].lower()
             logging.info(f"App event button ocr: {event_button_text}")
+        # 同一帧上按优先级批量匹配需要点掉的页面，第一个匹配上的生效
+        jump_pics = [
+            popup_pic(PopupName.POPUP_UPDATE_APP),
+            button_pic(ButtonName.BUTTON_CONFIRMB),
+            button_pic(ButtonName.BUTTON_USER_AGREEMENT),
+            button_pic(ButtonName.BUTTON_QUIT_LAST)
+        ]
+        if config.userconfigdict["SERVER_TYPE"] == "CN_BILI":
+            jump_pics.append(button_pic(ButtonName.BUTTON_LOGIN_BILI))
+        jump_result = []
+        def get_jump_pic():
+            """第一次用到时才匹配，安装器/游戏不在前台的分支不需要匹配"""
+            if not jump_result:
+                jump_index, _ = match_first([(jump_pics[0], 0.8)] + jump_pics[1:])
+                jump_result.append(jump_pics[jump_index] if jump_index != -1 else None)
+            return jump_result[0]
         # ======== 判断流 ========
         # 如果进入安装器页面
         if any([check_app_running(ins_act, printit=False) for ins_act in self.installer_activities]):
@@ -165,7 +183,7 @@ class Loginin(Task):
             screenshot()
 
         # 大更新
-        elif match(popup_pic(PopupName.POPUP_UPDATE_APP), threshold=0.8):
+        elif get_jump_pic() == popup_pic(PopupName.POPUP_UPDATE_APP):
             if config.userconfigdict["BIG_UPDATE"]:
                 GameUpdate().run()
                 raise EmulatorBlockError(istr({
@@ -177,16 +195,16 @@ class Loginin(Task):
                     CN: "检测到新版本，未开启游戏包体更新，请手动更新",
                     EN: "New version detected, auto update is not enabled, please update manually"
                 }))
-        elif match(button_pic(ButtonName.BUTTON_CONFIRMB)):
+        elif get_jump_pic() == button_pic(ButtonName.BUTTON_CONFIRMB):
             # 点掉确认按钮
             click(button_pic(ButtonName.BUTTON_CONFIRMB))
-        elif match(button_pic(ButtonName.BUTTON_USER_AGREEMENT)):
+        elif get_jump_pic() == button_pic(ButtonName.BUTTON_USER_AGREEMENT):
             # 用户协议
             click(button_pic(ButtonName.BUTTON_USER_AGREEMENT))
-        elif match(button_pic(ButtonName.BUTTON_QUIT_LAST)):
+        elif get_jump_pic() == button_pic(ButtonName.BUTTON_QUIT_LAST):
             # 点掉放弃上次战斗进度按钮
             click(button_pic(ButtonName.BUTTON_QUIT_LAST))
-        elif match(button_pic(ButtonName.BUTTON_LOGIN_BILI)) and config.userconfigdict["SERVER_TYPE"] == "CN_BILI":
+        elif get_jump_pic() == button_pic(ButtonName.BUTTON_LOGIN_BILI):
             # 点掉B站登录按钮
             # 防止点到上方横幅右侧切换账号按钮，这里睡4s等待横幅消失
             click(button_pic(ButtonName.BUTTON_LOGIN_BILI), sleeptime=4)
@@ -251,11 +269,13 @@ class Loginin(Task):
         self.task_start_time = time.time()
         self.last_seen_bar_change_time = time.time()
         self.last_seen_bar_percent = 0
+        # 检测间隔按设备时序缩放，检测次数相应增减，总时长不变
+        self.detect_interval = scaled_wait(self.sleep_between_detect)
         # 循环进行条件判断点击操作
         self.run_until(self.try_jump_useless_pages, 
                       lambda: match(popup_pic(PopupName.POPUP_LOGIN_FORM)) or match(popup_pic(PopupName.POPUP_LOGIN_FORM_STEAM)) or Page.is_page(PageName.PAGE_HOME), 
-                      times = 200,
-                      sleeptime = self.sleep_between_detect)
+                      times = int(200 * self.sleep_between_detect / self.detect_interval),
+                      sleeptime = self.detect_interval)
         logging.info(istr({
             CN: "等待5s可能的延迟活动弹窗……",
             EN: "Waiting for possible delayed event pop-ups 5s..."
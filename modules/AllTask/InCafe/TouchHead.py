@@ -5,7 +5,7 @@ from modules.configs.MyConfig import config
 from modules.AllPage.Page import Page
 from modules.AllTask.Task import Task
 from modules.utils.log_utils import logging
-from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, screenshot, match_pixel, get_screenshot_cv_data, compare_diff
+from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, screenshot, match_pixel, get_screenshot_cv_data, compare_diff, Gesture
 
 class TouchHead(Task):
     # 安全的可点击边界，排除了下方按钮区域
@@ -26,17 +26,18 @@ class TouchHead(Task):
         click(Page.MAGICPOINT)
         self.run_until(
             lambda: click(Page.MAGICPOINT),
-            lambda: Page.is_page(PageName.PAGE_CAFE) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+            lambda: (Page.page_check(PageName.PAGE_CAFE) & Page.popup_check()).evaluate(),
         )
         canmatchRes = match(button_pic(ButtonName.BUTTON_STU_NOTICE), threshold=0.95, returnpos=True, rotate_trans=True)
         if canmatchRes[0]:
             logging.info({"zh_CN": "匹配到注意力符号，点击头部", "en_US": "match the 'mind' symbol, click it!"})
-            # 中心点
-            self.safe_click((canmatchRes[1][0]+50, canmatchRes[1][1]+30), sleeptime=0.1)
-            # 四个角
+            # 中心点 + 四个角，一次提交
+            gesture = Gesture()
+            self.safe_click((canmatchRes[1][0]+50, canmatchRes[1][1]+30), sleeptime=0.1, gesture=gesture)
             for offsetx in [-20, 20]:
                 for offsety in [-30, 30]:
-                    self.safe_click((canmatchRes[1][0]+50+offsetx, canmatchRes[1][1]+30+offsety), sleeptime=0.1)
+                    self.safe_click((canmatchRes[1][0]+50+offsetx, canmatchRes[1][1]+30+offsety), sleeptime=0.1, gesture=gesture)
+            gesture.submit().wait()
             # 等待羁绊弹窗
             sleep(1)
         self.run_until(
@@ -44,11 +45,14 @@ class TouchHead(Task):
             lambda: Page.is_page(PageName.PAGE_CAFE),
         )
 
-    def safe_click(self, pos, sleeptime=1):
+    def safe_click(self, pos, sleeptime=1, gesture=None):
+        """gesture不为None时，把点击和之后的等待加入手势而不是立即点击"""
         x=pos[0]
         y=pos[1]
         if x<self.SAFE_X_LEFT or x>self.SAFE_X_RIGHT or y<self.SAFE_Y_TOP or y>self.SAFE_Y_BOTTOM:
             logging.warn({"zh_CN": f"点击坐标{pos}不在安全范围内，不点击", "en_US":f"Click position {pos} is not in the safe range"})
+        elif gesture is not None:
+            gesture.tap(x, y).wait(sleeptime * 1000)
         else:
             click(pos, sleeptime=sleeptime)
 
@@ -70,7 +74,7 @@ class TouchHead(Task):
                 # 如果使用了图片差异来摸头
                 self.run_until(
                     lambda: click(Page.MAGICPOINT),
-                    lambda: Page.is_page(PageName.PAGE_CAFE) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+                    lambda: (Page.page_check(PageName.PAGE_CAFE) & Page.popup_check()).evaluate(),
                 )
                 # 左下进入编辑模式，截图
                 click((68, 649), 1)
@@ -83,7 +87,7 @@ class TouchHead(Task):
                     # 确认来到咖啡厅页面
                     self.run_until(
                         lambda: click(Page.MAGICPOINT),
-                        lambda: Page.is_page(PageName.PAGE_CAFE) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+                        lambda: (Page.page_check(PageName.PAGE_CAFE) & Page.popup_check()).evaluate(),
                     )
                     logging.info({"zh_CN": "开始检测图片差异", "en_US": "Start detecting image discrepancies"})
                     if match_times != 0:
@@ -100,9 +104,11 @@ class TouchHead(Task):
                     logging.info({"zh_CN": f"第{match_times+1}次检测到{len(diff_pos_list)}个差异中心",
                                   "en_US": f"{len(diff_pos_list)} centers of diff "
                                            f"were detected for the {match_times} time"})
-                    # 挨个点击
+                    # 挨个点击，一次提交
+                    gesture = Gesture()
                     for pos in diff_pos_list:
-                        self.safe_click(pos, sleeptime=0.1)
+                        self.safe_click(pos, sleeptime=0.1, gesture=gesture)
+                    gesture.submit().wait()
                     sleep(1.5)
                 # 最后用注意力符号模式再检查一下
                 self.run_until(
@@ -145,7 +151,7 @@ class TouchHead(Task):
                     # 清除可能的好感度弹窗
                     self.run_until(
                         lambda: click(Page.MAGICPOINT),
-                        lambda: Page.is_page(PageName.PAGE_CAFE) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+                        lambda: (Page.page_check(PageName.PAGE_CAFE) & Page.popup_check()).evaluate(),
                     )
                     screenshot()
                     if (match(button_pic(ButtonName.BUTTON_STU_NOTICE), threshold=0.95, rotate_trans=True)):
@@ -158,7 +164,7 @@ class TouchHead(Task):
                 # 变换视角前再次确认关闭弹窗回到咖啡厅页面
                 self.run_until(
                     lambda: click(Page.MAGICPOINT),
-                    lambda: Page.is_page(PageName.PAGE_CAFE) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+                    lambda: (Page.page_check(PageName.PAGE_CAFE) & Page.popup_check()).evaluate(),
                 )
                 logging.info({"zh_CN": "变换视角", "en_US": "Transform Perspective"})
                 for func in movefuncs:
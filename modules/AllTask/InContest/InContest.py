@@ -6,7 +6,7 @@ from DATA.assets.PopupName import PopupName
 from modules.AllPage.Page import Page
 from modules.AllTask.Task import Task
 
-from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, config, filter_num, istr, CN, EN, ocr_area
+from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, config, filter_num, istr, CN, EN, ocr_area, ocr_digit_areas, MatchCheck
 from modules.utils.log_utils import logging
 
 class InContest(Task):
@@ -22,28 +22,26 @@ class InContest(Task):
         return self.back_to_home()
 
     def recognize_rank(self) -> list[int]:
-        res_list = []
-        res_list.append(filter_num(ocr_area((129, 288), (270, 339))[0]))
+        areas = [((129, 288), (270, 339))]
         other3_L_T_Y = [200, 360, 520]
         other3_X = 553
         other3_offset = (160, 50)
         
         for y in other3_L_T_Y:
-            res_list.append(filter_num(ocr_area((other3_X, y), (other3_X+other3_offset[0], y+other3_offset[1]))[0]))
+            areas.append(((other3_X, y), (other3_X+other3_offset[0], y+other3_offset[1])))
         
-        return [int(each) for each in res_list]
+        return [int(filter_num(each[0])) for each in ocr_digit_areas(areas)]
 
     def recognize_level(self) -> list[int]:
-        res_list = []
-        res_list.append(filter_num(ocr_area((162, 186), (226, 213))[0]))
+        areas = [((162, 186), (226, 213))]
         other3_L_T_Y = [291, 449, 609]
         other3_X = 461
         other3_offset = (56, 26)
 
         for y in other3_L_T_Y:
-            res_list.append(filter_num(ocr_area((other3_X, y), (other3_X+other3_offset[0], y+other3_offset[1]))[0]))
+            areas.append(((other3_X, y), (other3_X+other3_offset[0], y+other3_offset[1])))
         
-        return [int(each) for each in res_list]
+        return [int(filter_num(each[0])) for each in ocr_digit_areas(areas)]
         
     def collect_reward(self):
         self.run_until(
@@ -118,13 +116,15 @@ class InContest(Task):
                 lambda: click((994, 241)),
                 lambda: match(popup_pic(PopupName.POPUP_CONTEST_TARGET))
             )
+        # 票卷不足时的通知弹窗或者使用钻石弹窗
+        no_ticket_popup = (MatchCheck(popup_pic(PopupName.POPUP_NOTICE)) | MatchCheck(popup_pic(PopupName.POPUP_USE_DIAMOND), threshold=0.85)) & self.has_popup_check()
         # click the start button in the popup
         self.run_until(
             lambda: click(button_pic(ButtonName.BUTTON_EDIT)),
-            lambda: Page.is_page(PageName.PAGE_EDIT_TEAM) or ((match(popup_pic(PopupName.POPUP_NOTICE)) or match(popup_pic(PopupName.POPUP_USE_DIAMOND), threshold=0.85)) and self.has_popup())
+            lambda: (Page.page_check(PageName.PAGE_EDIT_TEAM) | no_ticket_popup).evaluate()
         )
         #  匹配到通知弹窗或者匹配到使用钻石弹窗，说明没有票卷了，为什么日服的通知标题有时候是片假名有时候是汉字啊
-        if ((match(popup_pic(PopupName.POPUP_NOTICE)) or match(popup_pic(PopupName.POPUP_USE_DIAMOND), threshold=0.85)) and self.has_popup()):
+        if no_ticket_popup.evaluate():
             # if no ticket
             logging.warning({"zh_CN": "已经无票卷...尝试收集奖励", "en_US": "No ticket...try to collect reward"})
             # sessiondict设置
@@ -8,7 +8,7 @@ from modules.AllPage.Page import Page
 from modules.AllTask.Task import Task
 from modules.AllTask.SubTask.ScrollSelect import ScrollSelect
 
-from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, istr, CN, EN
+from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, istr, CN, EN, get_respond_y, scroll_calibration_needed, calibrate_scroll_response
 import numpy as np
 
 
@@ -22,10 +22,10 @@ class BuyItems(Task):
         return Page.is_page(PageName.PAGE_SHOP)
 
     def on_run(self) -> None:
-        if config.userconfigdict["RESPOND_Y"]:
-            responsey = config.userconfigdict['RESPOND_Y']
-        else:
-            responsey = 40
+        # 商品列表可以滑动，第一次来时测量滑动触发距离
+        if scroll_calibration_needed():
+            calibrate_scroll_response(930, 532, 230, (660, 130, 1220, 640))
+        responsey = get_respond_y()
         # 横着的四个物品的中心点
         clickable_xs = np.linspace(703, 1166, 4, dtype=int)
         # 总共购买的物品数量
@@ -123,7 +123,7 @@ class LocationSelect(Task):
         # 清除弹窗
         self.run_until(
             lambda: click(Page.MAGICPOINT),
-            lambda: Page.is_page(PageName.PAGE_TIMETABLE_SEL) and match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE),
+            lambda: (Page.page_check(PageName.PAGE_TIMETABLE_SEL) & Page.popup_check()).evaluate(),
             times=15,
             sleeptime=2
         )
@@ -8,7 +8,7 @@ from modules.AllTask.Task import Task
 from modules.AllTask.SubTask.ScrollSelect import ScrollSelect
 
 from modules.utils import (click, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, screenshot,
-                           match_pixel, ocr_area_0, get_screenshot_cv_data, istr, CN, EN)
+                           match_pixel, ocr_area_0, ocr_digit_area, get_screenshot_cv_data, istr, CN, EN)
 from .IdentifyRoomHreatNumber import get_hearts_of_rooms, get_open_status_of_rooms, get_special_like_student_of_rooms
 from modules.utils.log_utils import logging
 import numpy as np
@@ -41,7 +41,7 @@ class SmartSelect(Task):
         if ocr_area_0((580, 333), (628, 368)):
             self.clear_popup()
             return 0
-        ticket_num = ocr_area((580, 333), (628, 368))[0]
+        ticket_num = ocr_digit_area((580, 333), (628, 368))[0]
         try:
             ticket_num = int(ticket_num)
         except:
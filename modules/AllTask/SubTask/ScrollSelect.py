@@ -6,7 +6,7 @@ from modules.AllPage.Page import Page
 from modules.AllTask.Task import Task
 import numpy as np
 
-from modules.utils import click, get_screenshot_cv_data, match_pixel, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, find_color_diff_positions, logging, istr, CN, EN, screenshot
+from modules.utils import click, get_screenshot_cv_data, match_pixel, swipe, match, page_pic, button_pic, popup_pic, sleep, ocr_area, config, find_color_diff_positions, logging, istr, CN, EN, screenshot, get_respond_y
 
 
 class ScrollSelect(Task):
@@ -47,7 +47,7 @@ class ScrollSelect(Task):
         self.hasexpectimage = hasexpectimage
         self.swipeoffsetx = swipeoffsetx
         if config.userconfigdict["RESPOND_Y"] is not None:
-            self.responsey = config.userconfigdict['RESPOND_Y']
+            self.responsey = get_respond_y()
         else:
             logging.warn({"zh_CN": "未设置滑动触发距离RESPOND_Y，使用默认值40",
                           "en_US": "Default value 40 is used for swipe trigger distance RESPOND_Y"})
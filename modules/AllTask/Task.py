@@ -4,7 +4,7 @@ from DATA.assets.PopupName import PopupName
 from DATA.assets.ButtonName import ButtonName
 
 
-from modules.utils import click, swipe, match, page_pic, match_pixel, button_pic, popup_pic, sleep, screenshot, config, istr, CN, EN, ocr_area, logic_run_until, _is_PC_app, _is_STEAM_app
+from modules.utils import click, swipe, match, page_pic, match_pixel, button_pic, popup_pic, sleep, screenshot, config, istr, CN, EN, ocr_area, ocr_digit_areas, logic_run_until, _is_PC_app, _is_STEAM_app, match_first, MatchCheck, PixelCheck, Gesture
 
 from modules.utils.adb_utils import check_app_running, open_app
 from modules.utils.baah_exceptions import EmulatorBlockError
@@ -94,8 +94,9 @@ class Task:
                 can_back_home = True
                 Task.clear_popup()
             # 有社区弹窗，点关闭按钮
-            if match(popup_pic(PopupName.POPUP_LOGIN_FORM)) or match(popup_pic(PopupName.POPUP_LOGIN_FORM_STEAM)):
-                if(match(popup_pic(PopupName.POPUP_LOGIN_FORM_STEAM))):
+            login_form_index, _ = match_first([popup_pic(PopupName.POPUP_LOGIN_FORM_STEAM), popup_pic(PopupName.POPUP_LOGIN_FORM)])
+            if login_form_index != -1:
+                if login_form_index == 0:
                     click((1123, 114), sleeptime=1)
                 else:
                     click((1226, 56), sleeptime=1)
@@ -118,6 +119,8 @@ class Task:
             if can_back_home:
                 sleep(3)
         logging.error({"zh_CN": "返回主页失败", "en_US":"Failed to return to home page"})
+        page = Page.identify()
+        logging.info({"zh_CN": f"当前页面: {page}", "en_US": f"Current page: {page}"})
         return False
         
     
@@ -208,7 +211,7 @@ class Task:
             if _is_STEAM_app(config.userconfigdict["SERVER_TYPE"]) and match(popup_pic(PopupName.POPUP_LOGIN_FORM_STEAM)):
                 # 如果是STEAM且识别到社区弹窗，关闭社区弹窗(STEAM社区弹窗比小)
                 click((1123, 114))
-            elif match(button_pic(ButtonName.BUTTON_CONFIRMB)) and match(page_pic(PageName.PAGE_HOME)):
+            elif (MatchCheck(button_pic(ButtonName.BUTTON_CONFIRMB)) & Page.page_check(PageName.PAGE_HOME)).evaluate():
                 # 登陆后活动临期提示只能通过点掉确认来关闭
                 click(button_pic(ButtonName.BUTTON_CONFIRMB))
             else:
@@ -228,12 +231,21 @@ class Task:
         """
         判断是否有弹窗
         """
-        if Page.is_page(PageName.PAGE_HOME):
-            if config.userconfigdict["SERVER_TYPE"] in ["JP", "PC_EXE_JP"]:
-                return not match_pixel((8, 26), Page.COLOR_HOME_LEFT_NICKNAME)
-            else:
-                return not match_pixel((1027, 49), Page.COLOR_WHITE)
-        return not match_pixel(Page.MAGICPOINT, Page.COLOR_WHITE)
+        return Task.has_popup_check().evaluate()
+
+    @staticmethod
+    def has_popup_check():
+        """
+        有弹窗的截图判断条件，主页上看左上角昵称（日服）或右上角的白色，其他页面看MAGICPOINT的白色
+
+        先比较像素，像素表明没有弹窗时不需要再匹配主页模板
+        """
+        on_home = Page.page_check(PageName.PAGE_HOME)
+        if config.userconfigdict["SERVER_TYPE"] in ["JP", "PC_EXE_JP"]:
+            home_clear = PixelCheck((8, 26), Page.COLOR_HOME_LEFT_NICKNAME)
+        else:
+            home_clear = PixelCheck((1027, 49), Page.COLOR_WHITE)
+        return (on_home & ~home_clear) | (~on_home & ~Page.popup_check())
     
     @staticmethod
     def has_cost_popup(notice = True, diamond = True, price = True):
@@ -246,13 +258,14 @@ class Task:
             # 没有弹窗
             return False
         # 体力不足弹窗标题"购买体力"，卷票次数不足标题是“通知”
-        if notice and match(popup_pic(PopupName.POPUP_NOTICE)):
-            return True
-        if diamond and match(popup_pic(PopupName.POPUP_USE_DIAMOND), threshold=0.85):
-            return True
-        if price and match(popup_pic(PopupName.POPUP_TOTAL_PRICE), threshold=0.9):
-            return True
-        return False
+        cost_popups = []
+        if notice:
+            cost_popups.append(popup_pic(PopupName.POPUP_NOTICE))
+        if diamond:
+            cost_popups.append((popup_pic(PopupName.POPUP_USE_DIAMOND), 0.85))
+        if price:
+            cost_popups.append((popup_pic(PopupName.POPUP_TOTAL_PRICE), 0.9))
+        return match_first(cost_popups)[0] != -1
     
     @staticmethod
     def _modify_now_teams_students(clear_all = False, auto_team = False):
@@ -283,9 +296,11 @@ class Task:
                     dont_care = False
                     break
             if not dont_care:
-                # 全点一遍
+                # 全点一遍，一次提交
+                gesture = Gesture()
                 for x_height in x_heights:
-                    click((x_height, y_height), sleeptime=0.2)
+                    gesture.tap(x_height, y_height).wait(200)
+                gesture.submit().wait()
                 # 检查一遍
                 for x_height in x_heights:
                     Task.run_until(
@@ -354,24 +369,17 @@ class Task:
         """
         OCR账号资源，返回一个字典，包含当前账号的钻石，金币，体力等资源数量
         """
+        # 体力，信用点，钻石
         if config.userconfigdict["SERVER_TYPE"] in ["CN", "CN_BILI"]:
             # 国服比较靠右
-            power_str = ocr_area((503, 17), (602, 56))[0].strip()
-            credit_str = ocr_area((688, 19), (832, 59))[0].strip()
-            diamond_str = ocr_area((863, 21), (973, 60))[0].strip()
+            areas = [((503, 17), (602, 56)), ((688, 19), (832, 59)), ((863, 21), (973, 60))]
         if config.userconfigdict["SERVER_TYPE"] in ["JP", "PC_EXE_JP"]:
             # 日服比较靠左
-            power_str = ocr_area((537, 24), (612, 49))[0].strip()
-            credit_str = ocr_area((699, 24), (844, 47))[0].strip()
-            diamond_str = ocr_area((899, 24), (1002, 48))[0].strip()
+            areas = [((537, 24), (612, 49)), ((699, 24), (844, 47)), ((899, 24), (1002, 48))]
         else:
             # ...
-            power_str = ocr_area((483, 17), (582, 56))[0].strip()
-            # print("体力: ", power_str)
-            credit_str = ocr_area((668, 19), (812, 59))[0].strip()
-            # print("信用点: ", credit_str)
-            diamond_str = ocr_area((863, 21), (973, 60))[0].strip()
-            # print("钻石: ", diamond_str)
+            areas = [((483, 17), (582, 56)), ((668, 19), (812, 59)), ((863, 21), (973, 60))]
+        power_str, credit_str, diamond_str = [res[0].strip() for res in ocr_digit_areas(areas)]
         return {
             "power": power_str,
             "credit": credit_str,
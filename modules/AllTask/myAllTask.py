@@ -3,7 +3,8 @@ from modules.AllTask import *
 
 from modules.AllPage.Page import Page
 
-from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, screenshot
+from DATA.assets.PageName import PageName
+from modules.utils import click, swipe, match, page_pic, button_pic, popup_pic, sleep, screenshot, timing_calibration_needed, calibrate_timing
 from modules.utils.log_utils import logging, istr, CN, EN
 from modules.configs.MyConfig import config
 
@@ -324,7 +325,14 @@ class AllTask:
                 continue
             # 运行任务，更新正在运行的任务下标
             config.sessiondict["CURRENT_PERIOD_TASK_INDEX"] = i
+            config.sessiondict["CURRENT_TASK_NAME"] = task.name
+            # 还没有设备时序档案或时序偏离档案时，在静止的主页上测量
+            if timing_calibration_needed():
+                screenshot()
+                if Page.is_page(PageName.PAGE_HOME):
+                    calibrate_timing()
             task.run()
+        config.sessiondict["CURRENT_TASK_NAME"] = ""
     
     def add_task(self, task:Task) -> None:
         """
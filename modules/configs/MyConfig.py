@@ -1,5 +1,6 @@
 import json
 import os
+import copy
 import time
 from .myversion import myversion
 from modules.configs.defaultSettings import defaultUserDict, defaultSoftwareDict, defaultSessionDict, defaultStorageDict
@@ -181,12 +182,12 @@ class MyConfigger:
                 # 对应关系的键不在，那就只能用默认值
                 if print_warn:
                     print("No {}, set {}".format(key, defaultmap[key]["d"]))
-                selfmap[key] = defaultmap[key]["d"]
+                selfmap[key] = copy.deepcopy(defaultmap[key]["d"])  # 可变的默认值不能在多次解析间共用
         else:
             # 没有对应关系就只能默认值
             if print_warn:
                 print("No {}, set {}".format(key, defaultmap[key]["d"]))
-            selfmap[key] = defaultmap[key]["d"]
+            selfmap[key] = copy.deepcopy(defaultmap[key]["d"])  # 可变的默认值不能在多次解析间共用
 
     def _check_user_config(self):
         """
@@ -119,6 +119,12 @@ defaultUserDict = {
     "TARGET_PORT":{"d":5555},
     "KILL_PORT_IF_EXIST":{"d":False},
     "TIME_AFTER_CLICK":{"d": 0.7},
+    # 点击/滑动后是否在画面变化并稳定后提前结束等待，开启时点击后等待时间和run_until等待时间只作为最长等待时间
+    "WAIT_SCREEN_SETTLE":{"d":False},
+    # 画面连续多少秒不再变化视为稳定
+    "SCREEN_SETTLE_STABLE_TIME":{"d":0.2},
+    # 是否按实测的设备时序缩放点击/滑动后的等待时间，并使用实测的滑动触发距离，未测量过时会在主页自动测量
+    "TIMING_PROFILE_SCALE":{"d":False},
     "RESPOND_Y":{
         "d": 40,
         "m":{
@@ -226,10 +232,58 @@ defaultUserDict = {
     # 游戏卡启动时的重新启动模拟器最多尝试次数
     "MAX_RESTART_EMULATOR_TIMES":{"d":0},
 
-    # 截图模式, png：保存/读取png图片，pipe读取/单例化管道内数据
+    # 截图模式, png：保存/读取png图片，pipe读取/单例化管道内数据，raw：读取不经过png编码的原始帧数据
     "SCREENSHOT_METHOD":{
         "d":"pipe",
-        "s":["png", "pipe"]
+        "s":["png", "pipe", "raw"]
+    },
+    # raw截图模式下传输时是否压缩，网络adb等较慢的连接可以开启gzip
+    "RAW_SCREENSHOT_COMPRESS":{
+        "d":"none",
+        "s":["none", "gzip"]
+    },
+
+    # 是否在后台线程中持续截图，截图时直接取最近一次操作后的最新帧，仅pipe/raw截图模式有效
+    "CONTINUOUS_CAPTURE":{"d":False},
+    # 上一次截图之后没有点击/滑动等输入操作时，距上次截图不到这么多秒的截图直接沿用上一帧，0表示每次都重新截图
+    # 沿用期间看不到不依赖输入的画面变化（加载画面、渐显的弹窗），等待这类变化的轮询会晚这么多秒发现，因此默认关闭
+    "SCREENSHOT_REUSE_AGE":{"d":0},
+
+    # 是否在启动时预加载当前服务器的所有模板图片到缓存中
+    "TEMPLATE_WARM_UP":{"d":True},
+    # 是否按素材文件夹下regions.json声明的区域匹配模板，区域内没匹配上时仍会搜索整张截图
+    "TEMPLATE_SEARCH_REGION":{"d":True},
+    # 是否记住模板上一次匹配到的位置，下次匹配时先在该位置附近搜索
+    # 附近匹配上就直接返回，不再找整张截图中的最佳位置，同一画面中出现多次的模板可能得到与以前不同的坐标，因此默认关闭
+    "TEMPLATE_LEARN_LOCATION":{"d":False},
+    # 透明模板旋转匹配时，某个角度的匹配值超过阈值多少就不再等待其他角度的匹配结果
+    "ROTATE_MATCH_EARLY_EXIT_MARGIN":{"d":0.03},
+    # 是否对大模板使用金字塔匹配（先在缩小的截图上找候选位置，再在原图上精确匹配，候选位置没达到阈值时仍搜索整张截图）
+    # 只对asset_tools.py pyramid在截图上验证过缩小倍数的模板生效
+    "TEMPLATE_PYRAMID_MATCH":{"d":False},
+    # 是否优先用素材DIGIT文件夹下的数字字形识别数字，置信度不够时再用文字识别模型
+    "DIGIT_RECOGNIZER":{"d":True},
+    # 是否在启动模拟器期间由后台线程预先加载文字识别模型并做一次空识别
+    "OCR_WARM_UP":{"d":True},
+    # 文字识别onnx会话的算子内/算子间线程数，0为onnxruntime默认值
+    "OCR_INTRA_OP_THREADS":{"d":0},
+    "OCR_INTER_OP_THREADS":{"d":0},
+    # 文字识别onnx会话的执行方式
+    "OCR_EXECUTION_MODE":{
+        "d":"sequential",
+        "s":["sequential", "parallel"]
+    },
+
+    # adb通信方式, socket：直接连接adb server（不可用时自动退回subprocess），subprocess：每条命令启动一次adb进程
+    "ADB_CONNECT_METHOD":{
+        "d":"socket",
+        "s":["socket", "subprocess"]
+    },
+    # 点击/滑动的输入方式, maatouch：常驻maatouch进程注入触摸事件，shell：常驻adb shell会话执行input命令，subprocess：每次操作执行一条input命令
+    # 配置的方式不可用时依次换用后面的方式，默认的shell与原来每次执行input命令的效果相同
+    "INPUT_METHOD":{
+        "d":"shell",
+        "s":["maatouch", "shell", "subprocess"]
     },
 
     # 是否执行游戏登录任务（与游戏打开登录，统计消耗的体力，金币，钻石有关）
@@ -412,6 +466,11 @@ defaultSoftwareDict = {
     # 发生错误时，是否输出custom日志
     "SAVE_ERR_CUSTOM_LOG":{"d":True},
     "ENABLE_CRASH_REPORT":{"d":False},
+    # 是否由本机的文字识别服务进程统一识别，多个配置同时运行时共用一份文字识别模型
+    # 认证密钥每次启动随机生成，只有同一个BAAH（GUI或命令行）启动的运行进程之间共用
+    "OCR_SERVER":{"d":False},
+    # 文字识别服务监听的本机端口
+    "OCR_SERVER_PORT":{"d":17329},
     # Mirror酱的密钥
     "SEC_KEY_M":{
         "d": "",
@@ -435,14 +494,26 @@ defaultSessionDict = {
     "SCREENSHOT_READ_FAIL_TIMES":{"d":0},
     # 当前尝试重启模拟器次数
     "RESTART_EMULATOR_TIMES":{"d":0}, # 跨运行生命周期
-    # 截图数据，当SCREENSHOT_METHOD为pipe时使用
+    # 截图数据，当SCREENSHOT_METHOD为pipe或raw时使用
     "SCREENSHOT_DATA":{"d":None},
+    # 当前截图的帧号，每次截图时更新，用于缓存同一张截图上的分析结果
+    "SCREENSHOT_FRAME_ID":{"d":None},
+    # 当前截图开始截取的时间戳
+    "SCREENSHOT_TIME":{"d":0},
     # 记录这次运行执行到第几个任务了，任务开始时更新此项。-1表示之前没有执行任何任务
     "CURRENT_PERIOD_TASK_INDEX":{"d":-1},
     # 当前脚本重新执行过的次数
     "CURRENT_RETRY_TIMES":{"d":0}, # 跨运行生命周期
     # 记录历史四张截图
     "HISTORY_SCREENSHOT_LIST":{"d":[]},
+    # 最近一次向设备发送输入操作（点击，滑动，打开应用）的时间戳
+    "LAST_INPUT_TIME":{"d":0},
+    # 最近一次等待画面稳定时看到的最后一帧，(开始截取的时间戳, 缩略图)
+    "SETTLE_LAST_THUMBNAIL":{"d":None},
+    # 当前正在运行的任务名，用于按任务分组运行统计
+    "CURRENT_TASK_NAME":{"d":""},
+    # 运行统计，{任务名: {统计项: 计数}}
+    "RUN_STATS":{"d":{}},
 }
 
 # storagedict存储与某一个配置文件对应的游戏实例的持久性存储信息（如钻石历史变化曲线），其生命周期与userconfig相同，但是在脚本运行时是随用随写的
@@ -451,4 +522,8 @@ defaultStorageDict = {
     "LAST_SAVE_MONEY_DIAMOND_DATE":{"d":""},
     # 记录历史存储的 信用点和钻石和对应日期 列表
     "HISTORY_MONEY_DIAMOND_LIST":{"d":[]},
+    # 模板上一次匹配到的左上角坐标，{模板路径: [x, y]}，下次匹配时先在这附近搜索
+    "TEMPLATE_LOCATION_DICT":{"d":{}},
+    # 设备时序档案，{"device", "screencap_latency", "tap_latency", "scroll_response", "calibrated_at"}
+    "TIMING_PROFILE":{"d":{}},
 }
\ No newline at end of file
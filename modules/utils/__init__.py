@@ -3,8 +3,25 @@ import json
 from DATA.assets.ButtonName import ButtonName
 from DATA.assets.PopupName import PopupName
 from typing import Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from .adb_utils import *
+from .input_journal import *
+from .gesture import *
+from .input_backend import *
+from .capture_engine import *
+from .screen_settle import *
+from .timing_profile import *
 from .image_processing import *
+from .template_store import *
+from .template_location import *
+from .run_stats import *
+from .page_classifier import *
+from .frame_memo import *
+from .ocr_registry import *
+from .ocr_cache import *
+from .digit_recognizer import *
+from .screen_predicate import *
+from .screen_watchdog import *
 from .subprocess_helper import *
 from .grid_analyze import *
 from .notification import *
@@ -20,6 +37,22 @@ from modules.configs.MyConfig import config, ActionType
 def get_config_time_after_click():
     return config.userconfigdict['TIME_AFTER_CLICK']
 
+def _wait_after_input(seconds:float):
+    """
+    点击/滑动后等待seconds秒
+
+    开启WAIT_SCREEN_SETTLE时seconds只是最长等待时间，画面相对操作前的画面变化并稳定后提前结束
+
+    开启TIMING_PROFILE_SCALE时seconds先按设备时序档案缩放
+    """
+    seconds = scaled_wait(seconds)
+    stable_time = config.userconfigdict["SCREEN_SETTLE_STABLE_TIME"]
+    if config.userconfigdict["WAIT_SCREEN_SETTLE"] and seconds > stable_time:
+        reference = settle_reference(get_screenshot_cv_data(), config.sessiondict["SCREENSHOT_TIME"])
+        wait_screen_settle(reference, seconds, stable_time)
+    else:
+        time.sleep(seconds)
+
 def get_config_screenshot_name():
     return config.userconfigdict['SCREENSHOT_NAME']
 
@@ -30,11 +63,12 @@ def get_screenshot_cv_data():
     """
     获取截图的内容数据，当图片截图出错时，返回的内容是None
     """
-    if config.userconfigdict["SCREENSHOT_METHOD"] == "pipe":
+    if config.userconfigdict["SCREENSHOT_METHOD"] in ["pipe", "raw"]:
         return config.sessiondict["SCREENSHOT_DATA"]
     else:
         try:
-            return cv2.imread(get_config_screenshot_name())
+            # 同一张截图只读取解码一次
+            return frame_memo.get_or_compute("png", (get_config_screenshot_name(),), lambda: cv2.imread(get_config_screenshot_name()))
         except Exception as e: 
             logging.error(istr({
                 CN: f"读取图片文件出错，{e}",
@@ -54,9 +88,9 @@ def click(item:Union[str, Tuple[float, float]], sleeptime = -1, threshold=0.9) -
         if matchRes[0]:
             click_on_screen(matchRes[1][0], matchRes[1][1])
             if(sleeptime!=-1):
-                time.sleep(sleeptime)
+                _wait_after_input(sleeptime)
             else:
-                time.sleep(get_config_time_after_click())
+                _wait_after_input(get_config_time_after_click())
             return True
         else:
             logging.warning({"zh_CN": "无法匹配模板图像: {} ".format(item), "en_US":"Cannot match the pattern: {} ".format(item)})
@@ -64,9 +98,9 @@ def click(item:Union[str, Tuple[float, float]], sleeptime = -1, threshold=0.9) -
     else:
         click_on_screen(item[0], item[1])
         if(sleeptime!=-1):
-            time.sleep(sleeptime)
+            _wait_after_input(sleeptime)
         else:
-            time.sleep(get_config_time_after_click())
+            _wait_after_input(get_config_time_after_click())
         return True
 
 def swipe(item:Union[str, Tuple[float, float]], toitem: Union[str, Tuple[float, float]], durationtime = 0.3, sleeptime = -1) -> bool:
@@ -79,13 +113,13 @@ def swipe(item:Union[str, Tuple[float, float]], toitem: Union[str, Tuple[float,
     topos = None
     # check if the item is a str
     if isinstance(item, str):
-        (res, pos) = match_pattern(sourcepic_mat=get_screenshot_cv_data() ,patternpic=item)
+        (res, pos, _) = match(item, returnpos=True)
         if res:
             frompos = (pos[0], pos[1])
     else:
         frompos = (item[0], item[1])
     if isinstance(toitem, str):
-        (res, pos) = match_pattern(sourcepic_mat=get_screenshot_cv_data(), patternpic=toitem)
+        (res, pos, _) = match(toitem, returnpos=True)
         if res:
             topos = (pos[0], pos[1])
     else:
@@ -93,9 +127,9 @@ def swipe(item:Union[str, Tuple[float, float]], toitem: Union[str, Tuple[float,
     if(frompos and topos):
         swipe_on_screen(frompos[0], frompos[1], topos[0], topos[1], durationtime*1000)
         if sleeptime == -1:
-            sleep(get_config_time_after_click())
+            _wait_after_input(get_config_time_after_click())
         else:
-            sleep(sleeptime)
+            _wait_after_input(sleeptime)
         return True
     else:
         logging.warning("Cannot find the target pattern {} and {} when try to swipe".format(item, toitem))
@@ -114,11 +148,57 @@ def match(imgurl:str, threshold:float = 0.9, returnpos = False, rotate_trans=Fal
         
     if rotate_trans is True, the pattern will be rotated if it is transparent
     """
-    # check if the item is a str
+    compute = lambda: match_pattern(get_screenshot_cv_data(),imgurl, threshold=threshold, auto_rotate_if_trans=rotate_trans)
+    if isinstance(imgurl, str):
+        # 同一张截图上相同的匹配只做一次
+        match_res = frame_memo.get_or_compute("match", (imgurl, threshold, rotate_trans), compute)
+    else:
+        match_res = compute()
     if returnpos:
-        return match_pattern(get_screenshot_cv_data(),imgurl, threshold=threshold, auto_rotate_if_trans=rotate_trans)
+        return match_res
     else:
-        return match_pattern(get_screenshot_cv_data(),imgurl, threshold=threshold, auto_rotate_if_trans=rotate_trans)[0]
+        return match_res[0]
+
+_batch_match_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="batch-match")
+"""批量匹配的线程池，matchTemplate执行时会释放GIL"""
+
+def match_many(items:list, first_match = False) -> list:
+    """
+    Task: match a list of pattern pictures against the current screenshot in one call
+
+    items: list of picture url or (picture url, threshold), in priority order
+
+    return the list of [whether the pattern is found, (x, y), the max matching val] in the same order as items
+
+    if first_match is True, stop as soon as the first item (in priority order) is found,
+    the results of the items after it are None
+    """
+    futures = []
+    for item in items:
+        imgurl, threshold = (item, 0.9) if isinstance(item, str) else item
+        futures.append(_batch_match_pool.submit(match, imgurl, threshold, True))
+    results = [None] * len(futures)
+    for i, future in enumerate(futures):
+        results[i] = future.result()
+        if first_match and results[i][0]:
+            # 优先级更高的都没匹配上，这个就是结果，取消还没开始的匹配
+            for rest in futures[i + 1:]:
+                rest.cancel()
+            break
+    return results
+
+def match_first(items:list) -> Tuple[int, Tuple[bool, Tuple[float, float], float]]:
+    """
+    Task: find the first item (in priority order) that matches the current screenshot
+
+    items: list of picture url or (picture url, threshold)
+
+    return (index of the matched item, its match result), index is -1 if nothing matched
+    """
+    for i, result in enumerate(match_many(items, first_match=True)):
+        if result is not None and result[0]:
+            return i, result
+    return -1, (False, (0, 0), 0)
 
 def ocr_area(frompixel, topixel, multi_lines = False, ocr_lang = OCR_LANG.EN) -> Tuple[str, float]:
     """
@@ -131,9 +211,81 @@ def ocr_area(frompixel, topixel, multi_lines = False, ocr_lang = OCR_LANG.EN) ->
     """
     lowerpixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
     highterpixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
-    ocr_result = ocr_pic_area(get_screenshot_cv_data(), lowerpixel[0], lowerpixel[1], highterpixel[0], highterpixel[1], multi_lines=multi_lines, ocr_lang = ocr_lang)
+    ocr_result = frame_memo.get_or_compute("ocr", (lowerpixel, highterpixel, multi_lines, ocr_lang), lambda: ocr_pic_area(get_screenshot_cv_data(), lowerpixel[0], lowerpixel[1], highterpixel[0], highterpixel[1], multi_lines=multi_lines, ocr_lang = ocr_lang))
     return ocr_result
 
+def ocr_areas(areas, ocr_lang = OCR_LANG.EN) -> list:
+    """
+    OCR several single-line areas of screenshot in batch, results are in the same order as areas
+    
+    areas: [(frompixel, topixel), ...]
+    
+    return [[text, score], ...], the same as calling ocr_area on each area
+    """
+    keys = []
+    for frompixel, topixel in areas:
+        lowerpixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
+        highterpixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
+        keys.append((lowerpixel, highterpixel, False, ocr_lang))
+    # 当前帧上已经识别过的区域不再识别，其余区域一起识别
+    missing = [i for i, key in enumerate(keys) if not frame_memo.is_cached("ocr", key)]
+    computed = {}
+    if missing:
+        results = ocr_pic_areas(get_screenshot_cv_data(), [(*keys[i][0], *keys[i][1]) for i in missing], ocr_lang = ocr_lang)
+        computed = dict(zip(missing, results))
+    return [frame_memo.get_or_compute("ocr", key, lambda i=i: computed[i]) for i, key in enumerate(keys)]
+
+def _recognize_digits(lowerpixel, highterpixel):
+    """
+    用当前服务器素材中的数字字形识别区域内的数字，没有字形或置信度不够时返回None
+    """
+    if not config.userconfigdict["DIGIT_RECOGNIZER"]:
+        return None
+    recognizer = get_digit_recognizer(get_config_pic_path())
+    if not recognizer.available():
+        return None
+    def compute():
+        screenshot_data = get_screenshot_cv_data()
+        if screenshot_data is None:
+            return None
+        return recognizer.recognize(screenshot_data[lowerpixel[1]:highterpixel[1], lowerpixel[0]:highterpixel[0]])
+    result = frame_memo.get_or_compute("digit", (lowerpixel, highterpixel), compute)
+    if result is None or result[1] < DIGIT_MIN_CONFIDENCE:
+        add_run_stat("digit_fallback")
+        return None
+    add_run_stat("digit_hit")
+    return [result[0], result[1]]
+
+def ocr_digit_area(frompixel, topixel, ocr_lang = OCR_LANG.EN) -> Tuple[str, float]:
+    """
+    OCR the digits in the given rectangle area of screenshot
+    
+    digit glyphs of the current server are used first, ocr_area is used when there is no glyph or the confidence is low
+    """
+    lowerpixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
+    highterpixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
+    result = _recognize_digits(lowerpixel, highterpixel)
+    if result is not None:
+        return result
+    return ocr_area(lowerpixel, highterpixel, ocr_lang = ocr_lang)
+
+def ocr_digit_areas(areas, ocr_lang = OCR_LANG.EN) -> list:
+    """
+    OCR the digits in several areas, results are in the same order as areas
+    
+    areas that digit glyphs can not recognize confidently are OCRed together by ocr_areas
+    """
+    results = []
+    for frompixel, topixel in areas:
+        lowerpixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
+        highterpixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
+        results.append(_recognize_digits(lowerpixel, highterpixel))
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, result in zip(missing, ocr_areas([areas[i] for i in missing], ocr_lang = ocr_lang)):
+            results[i] = result
+    return results
+
 def ocr_area_0(frompixel, topixel, ocr_lang = OCR_LANG.EN) -> bool:
     """
     OCR the number in the given rectangle area whether it is 0, return False if length>1
@@ -145,7 +297,7 @@ def ocr_area_0(frompixel, topixel, ocr_lang = OCR_LANG.EN) -> bool:
     """
     lowerpixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
     highterpixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
-    res_str = ocr_pic_area(get_screenshot_cv_data(), lowerpixel[0], lowerpixel[1], highterpixel[0], highterpixel[1], ocr_lang = ocr_lang)[0]
+    res_str = ocr_digit_area(lowerpixel, highterpixel, ocr_lang = ocr_lang)[0]
     res_str = res_str.strip()
     allpossibles = ["0", "O", "o", "Q", "０"]
     # 如果长度为1，就判断它是不是0
@@ -178,8 +330,9 @@ def match_pixel(xy, color, printit = False):
         color: Page.COLOR_*
         axis is in image form
     """
-    sc_mat_data = get_screenshot_cv_data()
-    return match_pixel_color_range(sc_mat_data, xy[0], xy[1], color[0], color[1], printit=printit)
+    if printit:
+        return match_pixel_color_range(get_screenshot_cv_data(), xy[0], xy[1], color[0], color[1], printit=printit)
+    return frame_memo.get_or_compute("pixel", (tuple(xy), tuple(map(tuple, color))), lambda: match_pixel_color_range(get_screenshot_cv_data(), xy[0], xy[1], color[0], color[1]))
 
 def page_pic(picname):
     """
@@ -188,6 +341,50 @@ def page_pic(picname):
     # get_config_pic_path() + "/PAGE" + f"/{picname}.png"
     return os.path.join(get_config_pic_path(), "PAGE", f"{picname}.png")
 
+def page_scores() -> list:
+    """
+    当前截图上所有有指纹的页面的得分，[(页面名, 得分)] 从高到低，同一帧只计算一次
+    """
+    return frame_memo.get_or_compute("page_scores", (get_config_pic_path(),), lambda: get_page_classifier(get_config_pic_path()).score(get_screenshot_cv_data()))
+
+def identify_page(confidence = 0.9, pages = None, threshold = 0.9) -> Tuple[Union[str, None], float]:
+    """
+    判断当前截图是哪个页面
+
+    先用页面指纹一次性给所有页面打分，只有一个页面得分达到confidence时直接返回该页面；
+    结果不明确时，按得分从高到低对可能的页面（以及没有指纹的页面）做模板匹配
+
+    Parameters
+    ----------
+    pages:
+        只关心这些页面时传入，模板匹配只在其中进行，有指纹并且得分很低的页面不做模板匹配直接排除
+    threshold:
+        模板匹配的阈值
+
+    Return
+    ------
+    (页面名, 置信度)，不是任何已知（或pages中的）页面时页面名为None
+    """
+    classifier = get_page_classifier(get_config_pic_path())
+    scores = page_scores()
+    confident = [each for each in scores if each[1] >= confidence]
+    if len(confident) == 1 and (pages is None or confident[0][0] in pages):
+        return confident[0]
+    candidates = [name for name, score in scores if score >= 0.5] + classifier.unknown_pages
+    if pages is not None:
+        candidates = [name for name in candidates if name in pages]
+    for pagename in candidates:
+        res = match(page_pic(pagename), threshold=threshold, returnpos=True)
+        if res[0]:
+            return (pagename, res[2])
+    return (None, scores[0][1] if scores else 0)
+
+def match_page(pagename, threshold = 0.9) -> bool:
+    """
+    当前截图是否是指定页面，有页面指纹时大多数情况下不需要模板匹配
+    """
+    return frame_memo.get_or_compute("page", (pagename, threshold), lambda: identify_page(pages=[pagename], threshold=threshold)[0] == pagename)
+
 def button_pic(buttonname):
     """
     给定按钮的图片名称，得到图片的路径
@@ -228,22 +425,83 @@ def _update_history_screenshot_list():
             history_list.pop(0)
     config.sessiondict["HISTORY_SCREENSHOT_LIST"] = history_list
 
+def _screenshot_from_capture_engine(output_png = False):
+    """
+    从后台持续截图引擎中取最近一次输入操作之后的最新帧，等待超时则直接截图
+    """
+    frame = get_capture_engine().wait_frame_after(config.sessiondict["LAST_INPUT_TIME"])
+    if frame is None:
+        logging.warn(istr({
+            CN: "持续截图引擎未能及时提供新的截图，直接截图",
+            EN: "Continuous capture did not provide a new frame in time, take screenshot directly"
+        }))
+        screen_shot_to_global(output_png = output_png)
+        return
+    config.sessiondict["SCREENSHOT_DATA"] = frame
+    new_frame_id()
+    if output_png:
+        cv2.imwrite("./{}".format(get_config_screenshot_name()), frame)
+
+def _can_reuse_screenshot() -> bool:
+    """
+    上一帧之后没有向设备发送过输入操作，并且上一帧截取时间距今不到SCREENSHOT_REUSE_AGE秒
+    """
+    max_age = config.userconfigdict["SCREENSHOT_REUSE_AGE"]
+    last_time = config.sessiondict["SCREENSHOT_TIME"]
+    if max_age <= 0 or config.sessiondict["SCREENSHOT_FRAME_ID"] is None:
+        return False
+    if config.sessiondict["LAST_INPUT_TIME"] >= last_time or time.time() - last_time >= max_age:
+        return False
+    return get_screenshot_cv_data() is not None
+
 def screenshot(output_png = False):
     """
     Task: take a screenshot
 
+    上一帧仍然新鲜时（见_can_reuse_screenshot）直接沿用上一帧，不重新截图
+
     Params
     ------
     output_png:
         是否强制保存到png图片
     """
-    # start = time.time()
-    screen_shot_to_global(output_png = output_png)
+    if not output_png and _can_reuse_screenshot():
+        add_run_stat("screenshot_reused")
+        return
+    capture_start = time.time()
+    if use_continuous_capture():
+        _screenshot_from_capture_engine(output_png = output_png)
+    else:
+        start = time.perf_counter()
+        screen_shot_to_global(output_png = output_png)
+        if config.userconfigdict["SCREENSHOT_METHOD"] in ["pipe", "raw"]:
+            record_latency("screencap_latency", time.perf_counter() - start)
+    config.sessiondict["SCREENSHOT_TIME"] = capture_start
+    add_run_stat("screenshot_capture")
     _global_screenshot_check()
     _update_history_screenshot_list()
     # end = time.time()
     # 输出截图耗时小数点后两位
     # logging.debug("截图耗时{:.2f}秒".format(end-start))
+
+def log_screenshot_stats():
+    """
+    按任务输出这次运行中实际截图和沿用上一帧的次数
+    """
+    reused = get_run_stat_total("screenshot_reused")
+    if get_run_stat_total("screenshot_capture") + reused == 0:
+        return
+    logging.info(istr({
+        CN: f"截图: 实际截图{get_run_stat_total('screenshot_capture')}次，沿用上一帧{reused}次",
+        EN: f"Screenshot: {get_run_stat_total('screenshot_capture')} captured, {reused} reused"
+    }))
+    for task_name, task_stats in config.sessiondict["RUN_STATS"].items():
+        if task_stats.get("screenshot_capture", 0) + task_stats.get("screenshot_reused", 0) == 0:
+            continue
+        logging.info(istr({
+            CN: f"  {task_name}: 截图{task_stats.get('screenshot_capture', 0)}次，沿用{task_stats.get('screenshot_reused', 0)}次",
+            EN: f"  {task_name}: {task_stats.get('screenshot_capture', 0)} captured, {task_stats.get('screenshot_reused', 0)} reused"
+        }))
     
 def check_connect():
     # 检查当前python目录下是否有screenshot.png文件，如果有就删除
@@ -312,17 +570,41 @@ def _global_screenshot_check():
     """
     全局的截图元素检查，是否有卡顿弹窗等
     """
-    if "NGS" in ocr_area([444, 307], [829, 355])[0] and match(popup_pic(PopupName.POPUP_NOTICE)):
-        raise EmulatorBlockError(istr({
-            CN: "匹配到NGS，触发模拟器卡顿异常",
-            EN: "Match NGS, trigger emulator lag error"
-        }))
-    if match(button_pic(ButtonName.BUTTON_RECONNECT)):
-        click(button_pic(ButtonName.BUTTON_RECONNECT))
-        logging.warn(istr({
-            CN: "检测到网络异常弹窗，点击重连按钮",
-            EN: "Network exception popup detected, reconnect button clicked"
-        }))
+    screen_watchdog.check()
+
+POPUP_DIM_CHECK = ~PixelCheck((300, 2), ((240, 240, 240), (255, 255, 255)))
+"""
+弹窗出现时背景变暗，屏幕顶部的白色（Page.MAGICPOINT）消失，作为弹窗类检查项的前置条件
+"""
+
+def _on_ngs_popup():
+    raise EmulatorBlockError(istr({
+        CN: "匹配到NGS，触发模拟器卡顿异常",
+        EN: "Match NGS, trigger emulator lag error"
+    }))
+
+def _on_reconnect_popup():
+    click(button_pic(ButtonName.BUTTON_RECONNECT))
+    logging.warn(istr({
+        CN: "检测到网络异常弹窗，点击重连按钮",
+        EN: "Network exception popup detected, reconnect button clicked"
+    }))
+
+# 先匹配通知弹窗，匹配不到时不需要做文字识别
+screen_watchdog.register(WatchdogDetector(
+    "ngs",
+    POPUP_DIM_CHECK,
+    lambda: (OcrCheck([444, 307], [829, 355], "NGS") & MatchCheck(popup_pic(PopupName.POPUP_NOTICE))).evaluate(),
+    _on_ngs_popup,
+    interval = 2
+))
+screen_watchdog.register(WatchdogDetector(
+    "reconnect",
+    POPUP_DIM_CHECK,
+    lambda: match(button_pic(ButtonName.BUTTON_RECONNECT)),
+    _on_reconnect_popup,
+    interval = 1
+))
 
 def logic_run_until(func1, func2, times=None, sleeptime = None) -> bool:
     """
@@ -344,8 +626,13 @@ def logic_run_until(func1, func2, times=None, sleeptime = None) -> bool:
         screenshot()
         if(func2()):
             return True
+        last_input_time = config.sessiondict["LAST_INPUT_TIME"]
         func1()
-        sleep(sleeptime)
+        if config.sessiondict["LAST_INPUT_TIME"] != last_input_time:
+            _wait_after_input(sleeptime)
+        else:
+            # func1没有点击/滑动，画面不会因此变化
+            sleep(sleeptime)
     screenshot()
     if(func2()):
         return True
@@ -0,0 +1,248 @@
+import os
+import shlex
+import socket
+import struct
+import threading
+from typing import List, Union
+
+# adb server 协议: https://android.googlesource.com/platform/packages/modules/adb/+/refs/heads/main/OVERVIEW.TXT
+# 客户端通过TCP连接到adb server（默认5037端口），每个请求格式为 4位16进制长度 + 请求内容
+# server 返回 OKAY 或 FAIL(+4位16进制长度+错误信息)
+# host:transport:<serial> 把这条连接切换到指定设备，随后的 shell:/exec:/sync: 服务就直接在这条连接上收发数据
+# ========================================
+
+class AdbClientError(Exception):
+    """
+    adb server 通信失败，调用者可以据此退回到subprocess调用adb的方式
+    """
+    pass
+
+
+class AdbCommandSentError(AdbClientError):
+    """
+    命令已经发给设备之后才出错，命令可能已经执行过，调用者不应再用subprocess重发（例如input tap会点击两次）
+    """
+    pass
+
+
+class AdbClient:
+    """
+    直接与adb server通信的客户端，省去每条命令都启动一次adb进程（fork/exec + 与server握手）的开销
+
+    adb server协议规定一条连接在切换到设备后只能承载一个服务，因此短命令每次新建一条本机TCP连接（远比启动进程便宜），
+    需要长期存在的服务（如持续读写的shell）则通过open_service拿到连接后自行保持
+    """
+    DEFAULT_PORT = 5037
+    SYNC_DATA_MAX = 64 * 1024
+
+    def __init__(self, host = "127.0.0.1", port = None, timeout = 10):
+        self.host = host
+        if port is None:
+            port = int(os.environ.get("ANDROID_ADB_SERVER_PORT", self.DEFAULT_PORT))
+        self.port = port
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # server是否可连接的缓存，None表示还没检查过
+        self._available = None
+
+    # ===============底层协议===================
+
+    def _connect(self, timeout = None) -> socket.socket:
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=timeout if timeout is not None else self.timeout)
+        except OSError as e:
+            raise AdbClientError(f"Cannot connect to adb server {self.host}:{self.port}: {e}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbClientError("adb server closed the connection unexpectedly")
+            data.extend(chunk)
+        return bytes(data)
+
+    @staticmethod
+    def _recv_all(sock: socket.socket) -> bytes:
+        chunks = []
+        while True:
+            chunk = sock.recv(256 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _send_request(self, sock: socket.socket, payload: str, is_command = False):
+        """
+        发送一个请求并检查 OKAY/FAIL 状态
+
+        is_command: 请求本身就是要在设备上执行的服务（shell:/exec:），发送之后没有收到明确的FAIL时抛出AdbCommandSentError
+        """
+        data = payload.encode("utf-8")
+        try:
+            sock.sendall(b"%04x" % len(data) + data)
+        except OSError as e:
+            raise AdbClientError(f"adb request {payload} failed: {e}")
+        sent_error = AdbCommandSentError if is_command else AdbClientError
+        try:
+            status = self._recv_exactly(sock, 4)
+        except (OSError, AdbClientError) as e:
+            raise sent_error(f"adb request {payload} failed: {e}")
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            # server明确拒绝了请求，命令没有执行
+            try:
+                length = int(self._recv_exactly(sock, 4), 16)
+                message = self._recv_exactly(sock, length).decode("utf-8", errors="ignore")
+            except (OSError, ValueError) as e:
+                message = str(e)
+            raise AdbClientError(f"adb request {payload} failed: {message}")
+        raise sent_error(f"adb request {payload} got unknown status {status}")
+
+    def open_service(self, serial: str, service: str, timeout = None) -> socket.socket:
+        """
+        打开一条切换到serial设备的连接，并在其上启动service（例如 shell:ls, exec:screencap, sync:）
+
+        返回的socket由调用者负责关闭
+        """
+        sock = self._connect(timeout)
+        try:
+            self._send_request(sock, f"host:transport:{serial}")
+            self._send_request(sock, service, is_command=True)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _join_cmd(cmd: Union[str, List[str]]) -> str:
+        """列表形式的命令逐个参数转义后拼接，字符串形式的命令原样交给设备的shell"""
+        if isinstance(cmd, str):
+            return cmd
+        return " ".join(shlex.quote(str(each)) for each in cmd)
+
+    # ===============功能函数===================
+
+    def is_available(self) -> bool:
+        """
+        检查adb server是否可以连接
+
+        只缓存可连接的结果，server还没启动时（连接被拒绝，开销很小）下次调用会重新检查
+        """
+        if self._available:
+            return True
+        with self._lock:
+            try:
+                self.server_version()
+                self._available = True
+            except AdbClientError:
+                self._available = False
+        return self._available
+
+    def reset_available(self):
+        """server连接出错后调用，下次使用前重新检查"""
+        self._available = None
+
+    def server_version(self) -> int:
+        sock = self._connect(timeout=2)
+        try:
+            self._send_request(sock, "host:version")
+            length = int(self._recv_exactly(sock, 4), 16)
+            return int(self._recv_exactly(sock, length), 16)
+        except (OSError, ValueError) as e:
+            # server没有完全启动或返回了无法解析的内容
+            raise AdbClientError(f"adb host:version failed: {e}")
+        finally:
+            sock.close()
+
+    def shell_bytes(self, serial: str, cmd: Union[str, List[str]], timeout = None) -> bytes:
+        """执行shell命令，返回原始输出字节"""
+        sock = self.open_service(serial, "shell:" + self._join_cmd(cmd), timeout)
+        try:
+            return self._recv_all(sock)
+        except OSError as e:
+            raise AdbCommandSentError(f"adb shell {cmd} failed: {e}")
+        finally:
+            sock.close()
+
+    def shell(self, serial: str, cmd: Union[str, List[str]], timeout = None) -> str:
+        """执行shell命令，返回文本输出，与subprocess_run(...).stdout对应"""
+        output = self.shell_bytes(serial, cmd, timeout).decode("utf-8", errors="ignore")
+        # 老版本adbd的shell服务使用pty，换行是\r\n
+        return output.replace("\r\n", "\n")
+
+    def exec_out(self, serial: str, cmd: Union[str, List[str]], timeout = None) -> bytes:
+        """
+        使用exec服务执行命令，输出不经过pty，二进制数据不会被改写（对应 adb exec-out）
+        """
+        sock = self.open_service(serial, "exec:" + self._join_cmd(cmd), timeout)
+        try:
+            return self._recv_all(sock)
+        except OSError as e:
+            raise AdbCommandSentError(f"adb exec-out {cmd} failed: {e}")
+        finally:
+            sock.close()
+
+    def _sync_request(self, sock: socket.socket, command: bytes, arg: bytes):
+        sock.sendall(command + struct.pack("<I", len(arg)) + arg)
+
+    def stat(self, serial: str, path: str):
+        """
+        sync服务的STAT，返回(mode, size, mtime)，文件不存在时mode为0
+        """
+        sock = self.open_service(serial, "sync:")
+        try:
+            self._sync_request(sock, b"STAT", path.encode("utf-8"))
+            header = self._recv_exactly(sock, 16)
+            if header[:4] != b"STAT":
+                raise AdbClientError(f"adb sync stat {path} got unknown response {header[:4]}")
+            return struct.unpack("<III", header[4:])
+        finally:
+            sock.close()
+
+    def pull(self, serial: str, path: str) -> bytes:
+        """sync服务的RECV，读取设备上的文件内容"""
+        sock = self.open_service(serial, "sync:")
+        try:
+            self._sync_request(sock, b"RECV", path.encode("utf-8"))
+            data = bytearray()
+            while True:
+                header = self._recv_exactly(sock, 8)
+                command, length = header[:4], struct.unpack("<I", header[4:])[0]
+                if command == b"DATA":
+                    data.extend(self._recv_exactly(sock, length))
+                elif command == b"DONE":
+                    return bytes(data)
+                elif command == b"FAIL":
+                    raise AdbClientError(f"adb pull {path} failed: {self._recv_exactly(sock, length).decode('utf-8', errors='ignore')}")
+                else:
+                    raise AdbClientError(f"adb pull {path} got unknown response {command}")
+        finally:
+            sock.close()
+
+    def push(self, serial: str, data: bytes, path: str, mode = 0o644, mtime = 0):
+        """sync服务的SEND，把data写入设备上的path"""
+        sock = self.open_service(serial, "sync:")
+        try:
+            self._sync_request(sock, b"SEND", f"{path},{mode}".encode("utf-8"))
+            for i in range(0, len(data), self.SYNC_DATA_MAX):
+                self._sync_request(sock, b"DATA", data[i:i + self.SYNC_DATA_MAX])
+            sock.sendall(b"DONE" + struct.pack("<I", mtime))
+            header = self._recv_exactly(sock, 8)
+            command, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if command == b"FAIL":
+                raise AdbClientError(f"adb push {path} failed: {self._recv_exactly(sock, length).decode('utf-8', errors='ignore')}")
+            if command != b"OKAY":
+                raise AdbClientError(f"adb push {path} got unknown response {command}")
+        finally:
+            sock.close()
+
+
+adb_client = AdbClient()
+"""
+进程内共用的adb server客户端
+"""
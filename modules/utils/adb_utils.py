@@ -4,7 +4,12 @@ import traceback
 from modules.configs.MyConfig import config
 from modules.utils.log_utils import logging, istr, CN, EN
 from modules.utils.subprocess_helper import subprocess_run
+from modules.utils.adb_client import adb_client, AdbClientError, AdbCommandSentError
+from modules.utils.frame_memo import new_frame_id
+from modules.utils.input_journal import input_journal
 import time
+import struct
+import gzip
 import numpy as np
 import cv2
 import platform
@@ -44,6 +49,65 @@ def get_config_adb_path(use_config=None):
     return target_config.userconfigdict['ADB_PATH']
 
 
+def _use_adb_client(use_config=None):
+    """是否通过socket直接与adb server通信，server不可用时退回subprocess"""
+    target_config = config if not use_config else use_config
+    return target_config.userconfigdict["ADB_CONNECT_METHOD"] == "socket" and adb_client.is_available()
+
+def _subprocess_args(cmd_list) -> list:
+    """
+    adb进程的命令参数，字符串形式的命令作为一个参数整体传给设备的shell（不能逐字符展开）
+    """
+    if isinstance(cmd_list, str):
+        return [cmd_list]
+    return list(cmd_list)
+
+def adb_shell(cmd_list, use_config=None, idempotent=False) -> str:
+    """
+    在设备上执行shell命令，返回标准输出的文本
+
+    cmd_list为字符串时作为一整条命令交给设备的shell（可以包含管道），与adb_client一致
+
+    优先使用常驻的adb server socket连接，失败时退回到启动adb进程执行，
+    有副作用的命令已经发给设备之后才出错时不再重发（避免点击等操作执行两次），返回空字符串
+
+    idempotent: 只读的查询命令（dumpsys, getprop等），命令发出后出错也退回到adb进程重新执行
+    """
+    target_config = config if not use_config else use_config
+    if _use_adb_client(target_config):
+        try:
+            return adb_client.shell(getNewestSeialNumber(target_config), cmd_list)
+        except AdbCommandSentError as e:
+            adb_client.reset_available()
+            if not idempotent:
+                logging.warn(f"adb socket shell failed after the command was sent: {e}")
+                return ""
+            logging.debug(f"adb socket shell failed, retry with subprocess: {e}")
+        except AdbClientError as e:
+            adb_client.reset_available()
+            logging.debug(f"adb socket shell failed, fallback to subprocess: {e}")
+    return subprocess_run([get_config_adb_path(target_config), "-s", getNewestSeialNumber(target_config), "shell", *_subprocess_args(cmd_list)]).stdout
+
+def adb_exec_out(cmd_list, use_config=None, idempotent=False) -> bytes:
+    """
+    在设备上执行命令，返回未经pty改写的原始输出字节（adb exec-out），
+    与adb_shell一样，有副作用的命令已经发给设备之后才出错时不再重发，返回空字节，idempotent的查询命令则重新执行
+    """
+    target_config = config if not use_config else use_config
+    if _use_adb_client(target_config):
+        try:
+            return adb_client.exec_out(getNewestSeialNumber(target_config), cmd_list)
+        except AdbCommandSentError as e:
+            adb_client.reset_available()
+            if not idempotent:
+                logging.warn(f"adb socket exec-out failed after the command was sent: {e}")
+                return b""
+            logging.debug(f"adb socket exec-out failed, retry with subprocess: {e}")
+        except AdbClientError as e:
+            adb_client.reset_available()
+            logging.debug(f"adb socket exec-out failed, fallback to subprocess: {e}")
+    return subprocess_run([get_config_adb_path(target_config), "-s", getNewestSeialNumber(target_config), "exec-out", *_subprocess_args(cmd_list)], encoding=None).stdout
+
 # 判断是否有TARGET_PORT这个配置项
 def disconnect_this_device():
     """Disconnect this device."""
@@ -72,19 +136,35 @@ def connect_to_device(use_config=None):
     subprocess_run([get_config_adb_path(target_config), "connect", getNewestSeialNumber(target_config)])
 
 
+def mark_input_action(use_config=None, kind="input", detail=None, until=None):
+    """
+    把输入操作记入input_journal，并记录最近一次操作（预计执行完）的时间，
+    后台持续截图时据此挑选操作之后的帧，截图时据此判断上一帧是否还能用
+
+    until: 异步执行的操作（如手势）预计执行完的时间
+    """
+    target_config = config if not use_config else use_config
+    input_journal.record(kind, detail, until)
+    # 已提交但还没执行完的手势记录的是预计执行完的时间，不能往前改
+    target_config.sessiondict["LAST_INPUT_TIME"] = max(time.time(), until or 0, target_config.sessiondict["LAST_INPUT_TIME"])
+
 def click_on_screen(x, y):
     """Click on the given coordinates."""
     if _is_PC_app(config.userconfigdict["SERVER_TYPE"]):
         click_program_window_precise(x, y)
-        return
-    subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), "shell", "input", "tap", str(int(x)), str(int(y))])
+    else:
+        from modules.utils.input_backend import get_input_router
+        get_input_router().tap(x, y)
+    mark_input_action(kind="click", detail=(int(x), int(y)))
 
 def swipe_on_screen(x1, y1, x2, y2, ms):
     """Swipe from the given coordinates to the other given coordinates."""
     if _is_PC_app(config.userconfigdict["SERVER_TYPE"]):
         scroll_program_window_precise(x1, y1, x2, y2, ms)
-        return
-    subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), "shell", "input", "swipe", str(int(x1)), str(int(y1)), str(int(x2)), str(int(y2)), str(int(ms))])
+    else:
+        from modules.utils.input_backend import get_input_router
+        get_input_router().swipe(x1, y1, x2, y2, ms)
+    mark_input_action(kind="swipe", detail=(int(x1), int(y1), int(x2), int(y2), int(ms)))
 
 def convert_img(path):
     with open(path, "rb") as f:
@@ -94,6 +174,97 @@ def convert_img(path):
         f.write(bys_)
 
 
+# screencap原始帧的像素格式，android PixelFormat
+RAW_FORMAT_RGBA_8888 = 1
+RAW_FORMAT_RGBX_8888 = 2
+RAW_FORMAT_BGRA_8888 = 5
+
+def parse_raw_screencap(raw_data: bytes):
+    """
+    解析不带-p参数的screencap输出，返回BGR图像，格式不支持时返回None
+
+    数据为 宽、高、像素格式(各4字节小端) [+ Android 9以上的色彩空间4字节] + 每像素4字节的像素数据
+    """
+    if raw_data is None or len(raw_data) < 12:
+        return None
+    width, height, pixel_format = struct.unpack_from("<III", raw_data, 0)
+    pixel_size = width * height * 4
+    header_size = len(raw_data) - pixel_size
+    if header_size not in (12, 16) or pixel_format not in (RAW_FORMAT_RGBA_8888, RAW_FORMAT_RGBX_8888, RAW_FORMAT_BGRA_8888):
+        logging.error(istr({
+            CN: f"无法解析的原始截图数据: {width}x{height} 格式{pixel_format} 长度{len(raw_data)}",
+            EN: f"Unsupported raw screencap data: {width}x{height} format {pixel_format} length {len(raw_data)}"
+        }))
+        return None
+    # 直接在收到的字节上建立numpy视图，不复制，然后一次cvtColor得到后续匹配需要的连续BGR图像
+    rgba = np.frombuffer(raw_data, np.uint8, count=pixel_size, offset=header_size).reshape(height, width, 4)
+    if pixel_format == RAW_FORMAT_BGRA_8888:
+        return cv2.cvtColor(rgba, cv2.COLOR_BGRA2BGR)
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+def _raw_screen_shot(use_config=None):
+    """
+    使用exec-out拉取不经过png编码的原始帧
+
+    RAW_SCREENSHOT_COMPRESS为gzip时在设备端压缩，适合网络adb等带宽较小的连接
+    """
+    target_config = config if not use_config else use_config
+    if target_config.userconfigdict["RAW_SCREENSHOT_COMPRESS"] == "gzip":
+        raw_data = adb_exec_out("screencap | gzip -1", target_config, idempotent=True)
+        try:
+            raw_data = gzip.decompress(raw_data)
+        except Exception as e:
+            logging.error(istr({
+                CN: f"原始截图解压失败: {e}",
+                EN: f"Failed to decompress raw screenshot: {e}"
+            }))
+            return None
+    else:
+        raw_data = adb_exec_out(["screencap"], target_config, idempotent=True)
+    return parse_raw_screencap(raw_data)
+
+def capture_screen_data(use_config=None):
+    """
+    按照pipe/raw截图方法获取一帧截图数据并返回，不写入sessiondict，截图失败时返回None
+    """
+    target_config = config
+    if use_config:
+        target_config = use_config
+    # 方法二，使用cv2提取PIPE管道中的数据
+    # 使用subprocess的Popen调用adb shell命令，并将结果保存到PIPE管道中
+    if _is_PC_app(target_config.userconfigdict["SERVER_TYPE"]):
+        img_array = capture_program_window_precise(use_config=target_config)
+        return img_array
+    if target_config.userconfigdict["SCREENSHOT_METHOD"] == "raw":
+        # 方法三，原始帧，省去设备端png编码和本机png解码
+        img_screenshot = _raw_screen_shot(target_config)
+        if img_screenshot is None:
+            logging.error({"zh_CN": "raw截图失败", "en_US": "Failed to take raw screenshot"})
+        return img_screenshot
+    binary_screenshot = None
+    if _use_adb_client(target_config):
+        try:
+            # exec服务不经过pty，数据不需要替换换行
+            binary_screenshot = adb_client.exec_out(getNewestSeialNumber(target_config), ["screencap", "-p"])
+        except AdbClientError as e:
+            adb_client.reset_available()
+            logging.debug(f"adb socket screencap failed, fallback to subprocess: {e}")
+    if binary_screenshot is None:
+        process = subprocess.run([get_config_adb_path(target_config), "-s", getNewestSeialNumber(target_config), "shell", "screencap", "-p"], stdout=subprocess.PIPE)
+        # 读取管道中的数据
+        screenshot = process.stdout
+        # 将读取的字节流数据的回车换行替换成'\n'
+        if platform.system() not in ["Linux", "Darwin"]:
+            binary_screenshot = screenshot.replace(b'\r\n', b'\n')
+        else:
+            # Linux和Macos系统不需要替换
+            binary_screenshot = screenshot
+    # 使用numpy和imdecode将二进制数据转换成cv2的mat图片格式
+    if (binary_screenshot == b''):
+        logging.error({"zh_CN": "pipe截图失败", "en_US": "Failed to take pipe screenshot"})
+        return None
+    return cv2.imdecode(np.frombuffer(binary_screenshot, np.uint8), cv2.IMREAD_COLOR)
+
 def screen_shot_to_global(use_config=None, output_png=False):
     """
     Take a screenshot and save it to the GlobalState.
@@ -101,12 +272,13 @@ def screen_shot_to_global(use_config=None, output_png=False):
     Params
     ------
     use_config: 期望使用的config对象，为None则使用全局导入的config
-    output_png: 使用pipe截图方法时是否保存png图片。截图方法为png时永远会输出png
+    output_png: 使用pipe/raw截图方法时是否保存png图片。截图方法为png时永远会输出png
     """
     target_config = config
     if use_config:
         target_config = use_config
-    whether_pipe = target_config.userconfigdict["SCREENSHOT_METHOD"] == "pipe"
+    # pipe和raw都把截图数据保存在内存中
+    whether_pipe = target_config.userconfigdict["SCREENSHOT_METHOD"] in ["pipe", "raw"]
     if not whether_pipe:
         # 方法一，重定向输出到文件
         filename = target_config.userconfigdict['SCREENSHOT_NAME']
@@ -126,30 +298,11 @@ def screen_shot_to_global(use_config=None, output_png=False):
         if not _is_PC_app(target_config.userconfigdict["SERVER_TYPE"]) and platform.system() not in ["Linux", "Darwin"]:
             convert_img("./{}".format(filename))
     else:
-        # 方法二，使用cv2提取PIPE管道中的数据
-        # 使用subprocess的Popen调用adb shell命令，并将结果保存到PIPE管道中
-        if _is_PC_app(target_config.userconfigdict["SERVER_TYPE"]):
-            img_array = capture_program_window_precise(use_config=target_config)
-            img_screenshot = img_array
-        else:
-            process = subprocess.run([get_config_adb_path(target_config), "-s", getNewestSeialNumber(target_config), "shell", "screencap", "-p"], stdout=subprocess.PIPE)
-            # 读取管道中的数据
-            screenshot = process.stdout
-            # 将读取的字节流数据的回车换行替换成'\n'
-            if platform.system() not in ["Linux", "Darwin"]:
-                binary_screenshot = screenshot.replace(b'\r\n', b'\n')
-            else:
-                # Linux和Macos系统不需要替换
-                binary_screenshot = screenshot
-            # 使用numpy和imdecode将二进制数据转换成cv2的mat图片格式
-            if (binary_screenshot == b''):
-                logging.error({"zh_CN": "pipe截图失败", "en_US": "Failed to take pipe screenshot"})
-                target_config.sessiondict["SCREENSHOT_DATA"] = None
-                return
-            img_screenshot = cv2.imdecode(np.frombuffer(binary_screenshot, np.uint8), cv2.IMREAD_COLOR)
+        img_screenshot = capture_screen_data(target_config)
         target_config.sessiondict["SCREENSHOT_DATA"] = img_screenshot
-        if output_png:
+        if output_png and img_screenshot is not None:
             cv2.imwrite("./{}".format(target_config.userconfigdict['SCREENSHOT_NAME']), img_screenshot)
+    new_frame_id(target_config)
 
 def get_now_running_app(use_config=None):
     """
@@ -164,7 +317,7 @@ def get_now_running_app(use_config=None):
             return config.userconfigdict["ACTIVITY_PATH"]
         else:
             return ""
-    output = subprocess_run([get_config_adb_path(target_config), "-s", getNewestSeialNumber(target_config), 'shell', 'dumpsys', 'window']).stdout
+    output = adb_shell(['dumpsys', 'window'], target_config, idempotent=True)
     # adb shell "dumpsys window | grep mCurrentFocus"
     # 有时候启动器排前，应用排后，这里逆序排序
     for sentence in output.split("\n")[::-1]:
@@ -236,6 +389,24 @@ def check_app_running(activity_path: str, printit = True) -> bool:
         return False
 
 
+def _adb_shell_nowait(cmd_list):
+    """
+    执行不需要等待结果的shell命令。socket方式下命令本身很快返回，直接同步执行；subprocess方式下保持异步不阻塞
+    """
+    if _use_adb_client():
+        try:
+            adb_client.shell(getNewestSeialNumber(), cmd_list)
+            return
+        except AdbCommandSentError as e:
+            # 打开/关闭应用等命令可能已经执行，不再重发
+            adb_client.reset_available()
+            logging.warn(f"adb socket shell failed after the command was sent: {e}")
+            return
+        except AdbClientError as e:
+            adb_client.reset_available()
+            logging.debug(f"adb socket shell failed, fallback to subprocess: {e}")
+    subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', *_subprocess_args(cmd_list)], isasync=True)
+
 def open_app(activity_path: str):
     """
     使用adb打开app
@@ -247,7 +418,7 @@ def open_app(activity_path: str):
     try:
         # https://github.com/MaaXYZ/MaaFramework/issues/548
         # check waydroid, open in full screen
-        check_brand = subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'getprop', 'ro.product.brand']).stdout
+        check_brand = adb_shell(['getprop', 'ro.product.brand'], idempotent=True)
         if "waydroid" in check_brand.lower():
             brand_waydroid = True
             logging.info("waydroid detected")
@@ -256,15 +427,16 @@ def open_app(activity_path: str):
         pass
     # ==============================
     if brand_waydroid:
-        subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'am', 'start', '--windowingMode', '4', activity_path], isasync=True)
+        _adb_shell_nowait(['am', 'start', '--windowingMode', '4', activity_path])
     else:
-        subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'am', 'start', activity_path], isasync=True)
+        _adb_shell_nowait(['am', 'start', activity_path])
     time.sleep(1)
     # 加-n参数，可以在已经启动的时候，切换activity而不只是包
-    subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'am', 'start', '-n', activity_path], isasync=True)
+    _adb_shell_nowait(['am', 'start', '-n', activity_path])
     time.sleep(1)
     appname = activity_path.split("/")[0]
-    subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'monkey', '-p', appname, '1'], isasync=True)
+    _adb_shell_nowait(['monkey', '-p', appname, '1'])
+    mark_input_action(kind="open_app", detail=activity_path)
 
 def close_app(activity_path: str):
     """
@@ -274,6 +446,7 @@ def close_app(activity_path: str):
         return True
     appname = activity_path.split("/")[0]
     subprocess_run([get_config_adb_path(), "-s", getNewestSeialNumber(), 'shell', 'am', 'force-stop', appname], isasync=True)
+    mark_input_action(kind="close_app", detail=activity_path)
 
 def get_wm_size(use_config=None):
     """
@@ -502,8 +675,8 @@ class MaaTouchUtils:
             logging.info(completed_process.stdout)
         # 给予执行权限
         completed_process = subprocess_run([self.adb_path, "-s", self.adb_serial, "shell", "chmod", "755", f"/data/local/tmp/{jar_name}"])
-        # 启动maatouch
-        self.maatouch_process = subprocess_run([self.adb_path, "-s", self.adb_serial, "shell", f'export CLASSPATH=/data/local/tmp/{jar_name}; app_process /data/local/tmp com.shxyke.touchevent.App'], isasync=True)
+        # 启动maatouch，只向它写入，它的输出不会被读取，不丢弃的话管道写满后maatouch会阻塞
+        self.maatouch_process = subprocess_run([self.adb_path, "-s", self.adb_serial, "shell", f'export CLASSPATH=/data/local/tmp/{jar_name}; app_process /data/local/tmp com.shxyke.touchevent.App'], isasync=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         logging.info(f"maatouch pid: {self.maatouch_process.pid}")
         time.sleep(0.5)
         # 检查是否启动成功
@@ -572,6 +745,7 @@ class MaaTouchUtils:
         key_str = f"k {key} o\nc\n"
         self.maatouch_process.stdin.write(key_str)
         self.maatouch_process.stdin.flush()
+        mark_input_action(self.config, kind="key", detail=key)
 
     @_check_init
     def _key_down(self, key:int):
@@ -579,6 +753,7 @@ class MaaTouchUtils:
         key_str = f"k {key} d\nc\n"
         self.maatouch_process.stdin.write(key_str)
         self.maatouch_process.stdin.flush()
+        mark_input_action(self.config, kind="key", detail=key)
     
     @_check_init
     def _key_up(self, key:int):
@@ -587,42 +762,65 @@ class MaaTouchUtils:
         self.maatouch_process.stdin.write(key_str)
         self.maatouch_process.stdin.flush()
 
-    # ============功能函数==================
+    @_check_init
+    def run_script(self, script:str):
+        """一次写入一整段maatouch脚本，由maatouch按脚本中的w命令计时执行，不等待执行完"""
+        self.maatouch_process.stdin.write(script)
+        self.maatouch_process.stdin.flush()
 
-    def sleep_ms(self, ms):
-        """休眠ms毫秒"""
-        time.sleep(ms / 1000)
+    # ============脚本生成==================
 
-    def click(self, x, y):
-        self._press_down(0, x, y, 100)
-        self._press_up(0)
+    @staticmethod
+    def wait_script(ms) -> str:
+        ms = int(ms)
+        return f"w {ms}\n" if ms > 0 else ""
 
-    def swipe(self, x1, y1, x2, y2, ms):
-        x_step = (x2 - x1) / ms
-        y_step = (y2 - y1) / ms
-        self._press_down(0, x1, y1, 100)
+    @staticmethod
+    def tap_script(x, y, id:int = 0, pressure = 100) -> str:
+        return f"d {id} {int(x)} {int(y)} {int(pressure)}\nc\nu {id}\nc\n"
+
+    def swipe_script(self, x1, y1, x2, y2, ms, id:int = 0, pressure = 100) -> str:
+        ms = int(ms)
+        x_step = (x2 - x1) / ms if ms > 0 else 0
+        y_step = (y2 - y1) / ms if ms > 0 else 0
+        script = [f"d {id} {int(x1)} {int(y1)} {int(pressure)}\nc\n"]
         # 细粒度20ms
         for i in range(self.time_step, ms, self.time_step):
-            self.sleep_ms(self.time_step)
-            self._press_move(0, x1 + x_step * i, y1 + y_step * i, 100)
+            script.append(self.wait_script(self.time_step))
+            script.append(f"m {id} {int(x1 + x_step * i)} {int(y1 + y_step * i)} {int(pressure)}\nc\n")
         # 最后一步
-        self.sleep_ms(ms % self.time_step)
-        self._press_move(0, x2, y2, 100)
-        self._press_up(0)
+        script.append(self.wait_script(ms - (ms - 1) // self.time_step * self.time_step if ms > 0 else 0))
+        script.append(f"m {id} {int(x2)} {int(y2)} {int(pressure)}\nc\nu {id}\nc\n")
+        return "".join(script)
 
-    def zoom(self, center_x, center_y, radius_from, radius_to, ms):
+    def zoom_script(self, center_x, center_y, radius_from, radius_to, ms) -> str:
+        ms = int(ms)
+        x_step = (radius_to - radius_from) / ms if ms > 0 else 0
         # 从中心点左右开始按下
-        self._press_down(0, center_x - radius_from, center_y, 100)
-        self._press_down(1, center_x + radius_from, center_y, 100)
-        x_step = (radius_to - radius_from) / ms
+        script = [f"d 0 {int(center_x - radius_from)} {int(center_y)} 100\nd 1 {int(center_x + radius_from)} {int(center_y)} 100\nc\n"]
         # 细粒度20ms
         for i in range(self.time_step, ms, self.time_step):
-            self.sleep_ms(self.time_step)
-            self._press_move(0, center_x - (radius_from + x_step * i), center_y, 100)
-            self._press_move(1, center_x + (radius_from + x_step * i), center_y, 100)
+            script.append(self.wait_script(self.time_step))
+            script.append(f"m 0 {int(center_x - (radius_from + x_step * i))} {int(center_y)} 100\nm 1 {int(center_x + (radius_from + x_step * i))} {int(center_y)} 100\nc\n")
         # 最后一步
-        self.sleep_ms(ms % self.time_step)
-        self._press_move(0, center_x - radius_to, center_y, 100)
-        self._press_move(1, center_x + radius_to, center_y, 100)
-        self._press_up(0)
-        self._press_up(1)
+        script.append(self.wait_script(ms - (ms - 1) // self.time_step * self.time_step if ms > 0 else 0))
+        script.append(f"m 0 {int(center_x - radius_to)} {int(center_y)} 100\nm 1 {int(center_x + radius_to)} {int(center_y)} 100\nc\nu 0\nu 1\nc\n")
+        return "".join(script)
+
+    # ============功能函数==================
+
+    def sleep_ms(self, ms):
+        """休眠ms毫秒"""
+        time.sleep(ms / 1000)
+
+    def click(self, x, y):
+        self.run_script(self.tap_script(x, y))
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        """整段滑动一次写入，由maatouch计时，Python只等待滑动结束"""
+        self.run_script(self.swipe_script(x1, y1, x2, y2, ms))
+        self.sleep_ms(ms)
+
+    def zoom(self, center_x, center_y, radius_from, radius_to, ms):
+        self.run_script(self.zoom_script(center_x, center_y, radius_from, radius_to, ms))
+        self.sleep_ms(ms)
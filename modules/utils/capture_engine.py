@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import deque
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.adb_utils import capture_screen_data, getNewestSeialNumber
+
+__all__ = ["CaptureEngine", "get_capture_engine", "stop_capture_engines", "use_continuous_capture"]
+
+class CaptureEngine:
+    """
+    后台持续截图引擎，在单独的线程里不断截图，把最新的几帧保存在环形缓冲区中
+
+    任务线程截图时不必再等待一次完整的截图往返，直接取最近一次输入操作之后截到的最新帧
+    """
+    def __init__(self, capture_func, buffer_size = 3, name = "capture"):
+        self.capture_func = capture_func
+        self.frames = deque(maxlen=buffer_size)
+        """(开始截图的时间戳, 截图数据) 的环形缓冲区"""
+        self.name = name
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self.is_running():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        logging.info(istr({
+            CN: f"后台持续截图已启动: {self.name}",
+            EN: f"Continuous capture started: {self.name}"
+        }))
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self.frames.clear()
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def is_running(self):
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def _loop(self):
+        while self._running:
+            # 以开始截图的时间作为帧的时间，保证该帧一定晚于此前的输入操作
+            capture_start = time.time()
+            try:
+                frame = self.capture_func()
+            except Exception as e:
+                logging.debug(f"continuous capture failed: {e}")
+                frame = None
+            if frame is None:
+                # 截图失败时稍等再试，避免设备断开时空转
+                time.sleep(0.2)
+                continue
+            with self._cond:
+                self.frames.append((capture_start, frame))
+                self._cond.notify_all()
+
+    def latest(self):
+        """返回最新的(时间戳, 截图数据)，还没有帧时返回None"""
+        with self._cond:
+            return self.frames[-1] if self.frames else None
+
+    def wait_frame_after(self, timestamp, timeout = 5):
+        """
+        等待并返回开始截图时间晚于timestamp的最新一帧，超时返回None
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                if self.frames and self.frames[-1][0] > timestamp:
+                    return self.frames[-1][1]
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._cond.wait(remaining)
+
+
+_capture_engines = {}
+"""每个设备序列号对应一个持续截图引擎"""
+
+def get_capture_engine(use_config=None) -> CaptureEngine:
+    """
+    得到当前设备的持续截图引擎，不存在或已停止时创建并启动
+    """
+    target_config = config if not use_config else use_config
+    serial = getNewestSeialNumber(target_config)
+    engine = _capture_engines.get(serial)
+    if engine is None:
+        engine = CaptureEngine(lambda: capture_screen_data(target_config), name=f"capture-{serial}")
+        _capture_engines[serial] = engine
+    if not engine.is_running():
+        engine.start()
+    return engine
+
+def stop_capture_engines():
+    """停止所有持续截图引擎"""
+    for engine in _capture_engines.values():
+        engine.stop()
+    _capture_engines.clear()
+
+def use_continuous_capture(use_config=None) -> bool:
+    """持续截图只在截图数据保存在内存中（pipe/raw）时有效"""
+    target_config = config if not use_config else use_config
+    return target_config.userconfigdict["CONTINUOUS_CAPTURE"] and target_config.userconfigdict["SCREENSHOT_METHOD"] in ["pipe", "raw"]
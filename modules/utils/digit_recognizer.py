@@ -0,0 +1,178 @@
+import os
+import cv2
+import numpy as np
+from modules.utils.log_utils import logging, istr, CN, EN
+
+__all__ = ["DIGIT_MIN_CONFIDENCE", "glyph_char", "glyph_file_name", "segment_glyphs", "split_merged_glyph", "DigitRecognizer", "get_digit_recognizer"]
+
+GLYPH_FOLDER_NAME = "DIGIT"
+"""
+每套素材（DATA/assets*）根目录下的数字字形文件夹，由 asset_tools.py digits 从截图中收集，
+文件名为 <字符名>_<序号>.png，内容是二值化后的单个字符（字符为白色，背景为黑色）
+"""
+
+GLYPH_CHAR_NAMES = {"slash": "/", "comma": ",", "dot": "."}
+"""文件名中不能直接使用的字符"""
+
+GLYPH_SIZE = (12, 20)
+"""比较时字形统一缩放到的 (宽, 高)"""
+
+MIN_COMPONENT_AREA = 4
+"""小于这个像素数的连通域视为噪点"""
+
+MAX_ASPECT_DIFF = 1.6
+"""字符与字形的宽高比相差超过这个倍数时不比较"""
+
+DIGIT_MIN_CONFIDENCE = 0.85
+"""识别结果中最低的字符得分低于这个值时，调用者应改用文字识别模型"""
+
+def glyph_char(filename: str) -> str:
+    """字形文件名 -> 字符"""
+    name = os.path.splitext(os.path.basename(filename))[0].rsplit("_", 1)[0]
+    return GLYPH_CHAR_NAMES.get(name, name)
+
+def glyph_file_name(char: str) -> str:
+    """字符 -> 字形文件名中的字符名"""
+    for name, value in GLYPH_CHAR_NAMES.items():
+        if value == char:
+            return name
+    return char
+
+def segment_glyphs(image_mat) -> list:
+    """
+    把截图区域二值化后按连通域切分成字符，返回从左到右的 [(x, 二值化的字符图像)]
+
+    文字的像素总是比背景少，据此决定二值化后是否反色
+    """
+    if image_mat is None or image_mat.size == 0:
+        return []
+    gray = cv2.cvtColor(image_mat, cv2.COLOR_BGR2GRAY) if image_mat.ndim == 3 else image_mat
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    glyphs = []
+    for i in range(1, count):
+        x, y, w, h, area = stats[i]
+        if area < MIN_COMPONENT_AREA:
+            continue
+        glyphs.append((int(x), np.where(labels[y:y+h, x:x+w] == i, 255, 0).astype(np.uint8)))
+    glyphs.sort(key=lambda glyph: glyph[0])
+    return glyphs
+
+def _glyph_vector(glyph_mat) -> np.ndarray:
+    """字形四周补一圈背景后缩放到GLYPH_SIZE，减去均值并归一化，两个向量的内积即相关系数"""
+    padded = cv2.copyMakeBorder(glyph_mat, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    vector = cv2.resize(padded, GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def _aspect(glyph_mat) -> float:
+    return glyph_mat.shape[1] / glyph_mat.shape[0]
+
+def _trim(glyph_mat):
+    """去掉四周的空白行列"""
+    ys, xs = np.nonzero(glyph_mat)
+    if len(ys) == 0:
+        return glyph_mat
+    return glyph_mat[ys.min():ys.max()+1, xs.min():xs.max()+1]
+
+def split_merged_glyph(glyph_mat, glyph_w: float) -> list:
+    """
+    抗锯齿使相邻字符连在一起时，按字符宽度glyph_w估计字符数，在每个预计分界附近选像素最少的列切开
+    """
+    h, w = glyph_mat.shape
+    count = int(round(w / glyph_w))
+    if count < 2:
+        return [glyph_mat]
+    column_sums = (glyph_mat > 0).sum(axis=0)
+    cuts = [0]
+    for i in range(1, count):
+        expected = int(round(i * w / count))
+        low, high = max(expected - int(glyph_w / 4), cuts[-1] + 1), min(expected + int(glyph_w / 4) + 1, w - 1)
+        if low >= high:
+            return [glyph_mat]
+        cuts.append(low + int(np.argmin(column_sums[low:high])))
+    cuts.append(w)
+    parts = [_trim(glyph_mat[:, cuts[i]:cuts[i+1]]) for i in range(count)]
+    return [part for part in parts if part.size > 0 and np.count_nonzero(part) >= MIN_COMPONENT_AREA]
+
+
+class DigitRecognizer:
+    """
+    用素材中的字形逐个比较连通域来识别数字，比文字识别模型快几个数量级
+    """
+    def __init__(self, asset_root: str):
+        self.asset_root = asset_root
+        self.chars = []
+        self._aspects = None
+        self._vectors = None
+        glyph_folder = os.path.join(asset_root, GLYPH_FOLDER_NAME)
+        if not os.path.isdir(glyph_folder):
+            return
+        aspects, vectors = [], []
+        for filename in sorted(os.listdir(glyph_folder)):
+            if not filename.endswith(".png"):
+                continue
+            glyph_mat = cv2.imread(os.path.join(glyph_folder, filename), cv2.IMREAD_GRAYSCALE)
+            if glyph_mat is None:
+                logging.warn(istr({
+                    CN: f"数字字形读取失败: {filename}",
+                    EN: f"Failed to read digit glyph: {filename}"
+                }))
+                continue
+            self.chars.append(glyph_char(filename))
+            aspects.append(_aspect(glyph_mat))
+            vectors.append(_glyph_vector(glyph_mat))
+        if self.chars:
+            self._aspects = np.array(aspects, dtype=np.float32)
+            self._vectors = np.stack(vectors)
+
+    def available(self) -> bool:
+        return len(self.chars) > 0
+
+    def recognize(self, image_mat):
+        """
+        返回 (识别结果, 置信度)，置信度为所有字符中最低的相关系数，没有字形或区域内没有字符时置信度为0
+        """
+        if not self.available():
+            return "", 0
+        glyphs = segment_glyphs(image_mat)
+        if not glyphs:
+            return "", 0
+        # 比所有字形都宽得多的连通域是连在一起的多个字符
+        max_aspect = float(self._aspects.max()) * MAX_ASPECT_DIFF
+        glyph_aspect = float(np.median(self._aspects))
+        split_glyphs = []
+        for _, glyph_mat in glyphs:
+            if _aspect(glyph_mat) > max_aspect:
+                split_glyphs.extend(split_merged_glyph(glyph_mat, glyph_aspect * glyph_mat.shape[0]))
+            else:
+                split_glyphs.append(glyph_mat)
+        text = []
+        confidence = 1.0
+        for glyph_mat in split_glyphs:
+            scores = self._vectors @ _glyph_vector(glyph_mat)
+            aspect_diff = np.maximum(self._aspects / _aspect(glyph_mat), _aspect(glyph_mat) / self._aspects)
+            scores[aspect_diff > MAX_ASPECT_DIFF] = -1
+            best = int(np.argmax(scores))
+            text.append(self.chars[best])
+            confidence = min(confidence, float(scores[best]))
+        return "".join(text), max(confidence, 0)
+
+
+_digit_recognizers = {}
+"""素材根目录 -> (字形文件夹修改时间, DigitRecognizer)"""
+
+def get_digit_recognizer(asset_root: str) -> DigitRecognizer:
+    """
+    得到素材根目录对应的数字识别器，字形文件夹修改后重新加载
+    """
+    glyph_folder = os.path.join(asset_root, GLYPH_FOLDER_NAME)
+    mtime = os.stat(glyph_folder).st_mtime if os.path.isdir(glyph_folder) else None
+    cached = _digit_recognizers.get(asset_root)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, DigitRecognizer(asset_root))
+        _digit_recognizers[asset_root] = cached
+    return cached[1]
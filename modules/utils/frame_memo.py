@@ -0,0 +1,81 @@
+import itertools
+import threading
+from modules.configs.MyConfig import config
+from modules.utils.run_stats import add_run_stat
+
+__all__ = ["new_frame_id", "FrameMemo", "frame_memo"]
+
+# 同一张截图会被反复分析（先match再click同一个按钮，同一区域先ocr_area_0再ocr_area），
+# 每次截图时给这张截图分配一个帧号，以(帧号, 分析种类, 参数)为键缓存分析结果，截图更换后缓存整体失效
+# ========================================
+
+_frame_id_counter = itertools.count(1)
+"""进程内递增的帧号，重新解析配置后也不会重复"""
+
+def new_frame_id(use_config = None) -> int:
+    """
+    截图数据被替换时调用，给新的截图分配帧号
+    """
+    target_config = config if not use_config else use_config
+    frame_id = next(_frame_id_counter)
+    target_config.sessiondict["SCREENSHOT_FRAME_ID"] = frame_id
+    return frame_id
+
+
+_MISSING = object()
+
+class FrameMemo:
+    """
+    当前帧的分析结果缓存
+
+    批量匹配时会在多个线程中同时读写，读写和换帧都在锁内进行；计算本身在锁外，
+    计算期间截图换了帧时结果不再存入
+    """
+    def __init__(self):
+        self.frame_id = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, kind: str, key: tuple, func):
+        """
+        当前帧上已经算过(kind, key)时直接返回缓存的结果，并按kind计入运行统计，否则调用func计算并缓存
+        """
+        frame_id = config.sessiondict["SCREENSHOT_FRAME_ID"]
+        if frame_id is None:
+            # 这次运行还没有截过图
+            return func()
+        memo_key = (kind, key)
+        with self._lock:
+            if frame_id != self.frame_id:
+                self._results.clear()
+                self.frame_id = frame_id
+            result = self._results.get(memo_key, _MISSING)
+        if result is not _MISSING:
+            add_run_stat(f"memo_{kind}_hit")
+            return result
+        result = func()
+        # 截图读取失败等情况不缓存
+        if result is not None:
+            with self._lock:
+                if self.frame_id == frame_id:
+                    self._results[memo_key] = result
+        return result
+
+    def is_cached(self, kind: str, key: tuple) -> bool:
+        """
+        当前帧上是否已经缓存了(kind, key)的结果
+        """
+        frame_id = config.sessiondict["SCREENSHOT_FRAME_ID"]
+        with self._lock:
+            return frame_id is not None and frame_id == self.frame_id and (kind, key) in self._results
+
+    def clear(self):
+        with self._lock:
+            self.frame_id = None
+            self._results.clear()
+
+
+frame_memo = FrameMemo()
+"""
+进程内共用的当前帧分析结果缓存
+"""
@@ -0,0 +1,77 @@
+import time
+from modules.utils.adb_utils import MaaTouchUtils
+
+__all__ = ["GestureHandle", "Gesture"]
+
+# 把一串点击/滑动/等待编成一个手势一次提交
+# maatouch方式下整个手势编译成一段带w（等待）命令的maatouch脚本，一次写入管道，间隔由设备端计时，
+# 提交后立即返回，任务线程可以同时分析截图，需要时再等待手势结束
+# 其他输入方式下按顺序逐个执行，提交时就会等到执行完
+# ========================================
+
+class GestureHandle:
+    """
+    已提交的手势，end_time为预计执行完的时间戳
+    """
+    def __init__(self, end_time: float):
+        self.end_time = end_time
+
+    def done(self) -> bool:
+        return time.time() >= self.end_time
+
+    def wait(self):
+        """等待手势执行完"""
+        remaining = self.end_time - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+class Gesture:
+    """
+    手势构建器，例如 Gesture().tap(100, 200).wait(100).tap(300, 200).submit().wait()
+    """
+    def __init__(self):
+        self.actions = []
+        """[(操作种类, 参数)]，操作种类为 tap/swipe/wait"""
+
+    def tap(self, x, y):
+        self.actions.append(("tap", (x, y)))
+        return self
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        self.actions.append(("swipe", (x1, y1, x2, y2, ms)))
+        return self
+
+    def wait(self, ms):
+        self.actions.append(("wait", (ms,)))
+        return self
+
+    def duration_ms(self) -> float:
+        """手势中所有等待和滑动的总时长（毫秒）"""
+        return sum(args[-1] for kind, args in self.actions if kind in ["swipe", "wait"])
+
+    def to_maatouch_script(self, maatouch: MaaTouchUtils) -> str:
+        script = []
+        for kind, args in self.actions:
+            if kind == "tap":
+                script.append(maatouch.tap_script(*args))
+            elif kind == "swipe":
+                script.append(maatouch.swipe_script(*args))
+            else:
+                script.append(maatouch.wait_script(*args))
+        return "".join(script)
+
+    def run_with(self, tap_func, swipe_func):
+        """不支持脚本的输入方式: 用tap_func/swipe_func逐个执行，等待用time.sleep"""
+        for kind, args in self.actions:
+            if kind == "tap":
+                tap_func(*args)
+            elif kind == "swipe":
+                swipe_func(*args)
+            else:
+                time.sleep(args[0] / 1000)
+
+    def submit(self, use_config=None) -> GestureHandle:
+        """提交到当前设备，返回可以等待的GestureHandle"""
+        from modules.utils.input_backend import submit_gesture
+        return submit_gesture(self, use_config)
@@ -5,16 +5,18 @@ import math
 from modules.configs.MyConfig import config
 import numpy as np
 from typing import Tuple
-from pponnxcr import TextSystem
 import time
 from os.path import exists
 from math import isnan
 from enum import Enum
 import os
-
-OCR_SYS_EN = TextSystem('en')
-OCR_SYS_ZHT = TextSystem('zht')
-OCR_SYS_ZHS = TextSystem('zhs')
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from modules.utils.template_store import template_store, Template
+from modules.utils.template_location import get_learned_window, learn_location
+from modules.utils.run_stats import add_run_stat
+from modules.utils.ocr_registry import ocr_registry
+from modules.utils.ocr_cache import ocr_cache
 
 class OCR_LANG(Enum):
     """
@@ -24,6 +26,13 @@ class OCR_LANG(Enum):
     ZHT = 2
     ZHS = 3
 
+OCR_LANG_MODEL = {
+    OCR_LANG.EN: "en",
+    OCR_LANG.ZHT: "zht",
+    OCR_LANG.ZHS: "zhs",
+}
+"""ocr语言 -> pponnxcr的模型名，模型在第一次使用时由ocr_registry加载"""
+
 def get_similarity(img1, img2):
     """img1: MatLike, img2: MatLike"""
     similar = np.sum(np.minimum(img1, img2)) / np.sum(np.maximum(img1, img2))
@@ -87,7 +96,206 @@ def check_the_pic_validity(_img, _templ):
         return False
     return True
 
-def match_pattern(sourcepic_mat: MatLike, patternpic: str|MatLike,threshold: float = 0.9, show_result:bool = False, auto_rotate_if_trans = False, multi_match: bool = False) -> Tuple[bool, Tuple[float, float], float] | list:
+ROTATE_DEGREES = [-3, -2, -1, 0, 1, 2, 3]
+"""透明模板旋转匹配时尝试的角度"""
+
+_rotate_match_pool = ThreadPoolExecutor(max_workers=min(len(ROTATE_DEGREES), os.cpu_count() or 1), thread_name_prefix="rotate-match")
+"""旋转匹配的线程池，matchTemplate执行时会释放GIL，各个角度可以同时匹配"""
+
+def _get_rotation_variants(template: Template):
+    """
+    得到模板各个角度的旋转结果 [(角度, BGR图, mask)]，只在第一次使用时生成并保存在模板上
+    """
+    if template.rotations is None:
+        rotations = []
+        for degree in ROTATE_DEGREES:
+            rotate_pattern = rotate_image_with_transparency(template.image, degree)
+            # 以透明部分作为mask
+            rotate_mask = np.where(rotate_pattern[:, :, 3] > 0, 255, 0).astype(np.uint8)
+            rotate_bgr = np.ascontiguousarray(rotate_pattern[:, :, :3]) # 去除透明通道
+            rotate_mask.setflags(write=False)
+            rotate_bgr.setflags(write=False)
+            rotations.append((degree, rotate_bgr, rotate_mask))
+        template.rotations = rotations
+    return template.rotations
+
+def _match_rotated(screenshot_cvmat, rotate_bgr, rotate_mask):
+    # https://www.cnblogs.com/FHC1994/p/9123393.html
+    tresult = cv2.matchTemplate(screenshot_cvmat, rotate_bgr, cv2.TM_CCORR_NORMED, mask=rotate_mask)
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(tresult)
+    return tresult, max_val, max_loc
+
+def _match_template(screenshot_cvmat, template: Template, auto_rotate_if_trans = False, early_exit_value = None):
+    """
+    在screenshot_cvmat中匹配模板，返回(匹配结果矩阵, 最大匹配值, 最大匹配值左上角坐标)，图片无法匹配时返回None
+
+    旋转匹配时，某个角度的匹配值达到early_exit_value就不再等待其他角度
+    """
+    # 判断透明度通道
+    have_alpha=False
+    if(template.has_alpha and auto_rotate_if_trans):
+        # 有透明度通道且开启了旋转匹配
+        have_alpha = True
+        rotations = _get_rotation_variants(template)
+        if not check_the_pic_validity(screenshot_cvmat, rotations[0][1]):
+            return None
+        # 越接近不旋转的角度越可能匹配上，优先提交
+        futures = {_rotate_match_pool.submit(_match_rotated, screenshot_cvmat, rotate_bgr, rotate_mask): degree for degree, rotate_bgr, rotate_mask in sorted(rotations, key=lambda each: abs(each[0]))}
+        results = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            if early_exit_value is not None and any(each[1] >= early_exit_value for each in results.values()):
+                # 已经有角度明显匹配上，取消还没开始的角度
+                for future in pending:
+                    future.cancel()
+                break
+        best_max_val = -1
+        best_max_loc = (0, 0)
+        best_result = None
+        for degree in ROTATE_DEGREES:
+            if degree not in results:
+                continue
+            tresult, max_val, max_loc = results[degree]
+            # print("角度为{}时，最大匹配值为{}".format(degree, max_val))
+            if max_val>best_max_val:
+                best_max_val = max_val
+                best_max_loc = max_loc
+                best_result = tresult
+        result = best_result
+        min_val, max_val, min_loc, max_loc = 0, best_max_val, 0, best_max_loc
+    else:
+        # 无旋转匹配
+        # TODO： 多点匹配：https://pyimagesearch.com/2021/03/29/multi-template-matching-with-opencv/
+        if template.has_alpha:
+            # 有透明度通道，以缓存中预先生成的透明部分mask匹配
+            if not check_the_pic_validity(screenshot_cvmat, template.bgr):
+                return None
+            result = cv2.matchTemplate(screenshot_cvmat, template.bgr, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        else:
+            # 无透明度通道
+            if not check_the_pic_validity(screenshot_cvmat, template.bgr):
+                return None
+            result = cv2.matchTemplate(screenshot_cvmat, template.bgr, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    
+    return result, max_val, max_loc
+
+PYRAMID_SCALES = [4, 2]
+"""金字塔匹配可用的缩小倍数，从大到小"""
+PYRAMID_CANDIDATES = 3
+"""缩小后的匹配结果里取几个峰值，在原图上精确匹配"""
+
+_pyramid_source_cache = {"source": None, "small": {}}
+"""最近一次缩小的截图 {缩小倍数: 缩小的截图}，同一张截图匹配多个模板时不必重复缩小"""
+_pyramid_source_lock = threading.Lock()
+
+def _get_small_source(screenshot_cvmat, scale):
+    # 批量匹配时会在多个线程中同时调用
+    with _pyramid_source_lock:
+        cache = _pyramid_source_cache
+        if cache["source"] is not screenshot_cvmat:
+            cache["source"] = screenshot_cvmat
+            cache["small"] = {}
+        if scale not in cache["small"]:
+            cache["small"][scale] = cv2.resize(screenshot_cvmat, (screenshot_cvmat.shape[1] // scale, screenshot_cvmat.shape[0] // scale), interpolation=cv2.INTER_AREA)
+        return cache["small"][scale]
+
+def _get_small_template(template: Template, scale):
+    if scale not in template.pyramid:
+        size = (template.w // scale, template.h // scale)
+        small_bgr = cv2.resize(template.bgr, size, interpolation=cv2.INTER_AREA)
+        small_mask = cv2.resize(template.mask, size, interpolation=cv2.INTER_NEAREST) if template.has_alpha else None
+        template.pyramid[scale] = (small_bgr, small_mask)
+    return template.pyramid[scale]
+
+def _match_template_pyramid(screenshot_cvmat, template: Template, scale, threshold):
+    """
+    先在缩小scale倍的截图上匹配缩小的模板找到几个候选位置，再在原图上每个候选位置附近的小窗口里精确匹配
+
+    最佳候选达到threshold时返回与_match_template相同格式的结果（匹配结果矩阵只包含最佳候选窗口），否则返回None，
+    由调用者在整张截图上精确匹配，避免缩小后漏掉的位置被当成没有匹配到
+    """
+    small_source = _get_small_source(screenshot_cvmat, scale)
+    small_bgr, small_mask = _get_small_template(template, scale)
+    if not check_the_pic_validity(small_source, small_bgr):
+        return None
+    coarse = cv2.matchTemplate(small_source, small_bgr, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+    # 带mask时完全一致的区域可能得到nan/inf
+    coarse = np.nan_to_num(coarse, nan=-1, posinf=-1, neginf=-1)
+    best = None
+    for _ in range(PYRAMID_CANDIDATES):
+        _, coarse_val, _, coarse_loc = cv2.minMaxLoc(coarse)
+        if coarse_val <= -1:
+            break
+        # 去掉这个峰值附近的点，再找下一个峰值
+        cx, cy = coarse_loc
+        coarse[max(cy - small_bgr.shape[0] // 2, 0):cy + small_bgr.shape[0] // 2 + 1, max(cx - small_bgr.shape[1] // 2, 0):cx + small_bgr.shape[1] // 2 + 1] = -1
+        # 缩小时的取整误差在scale个像素以内
+        x1, y1 = max(cx * scale - scale - 1, 0), max(cy * scale - scale - 1, 0)
+        x2 = min(cx * scale + scale + 1 + template.w, screenshot_cvmat.shape[1])
+        y2 = min(cy * scale + scale + 1 + template.h, screenshot_cvmat.shape[0])
+        matched = _match_template(screenshot_cvmat[y1:y2, x1:x2], template)
+        if matched is not None and (best is None or matched[1] > best[1]):
+            best = (matched[0], matched[1], (matched[2][0] + x1, matched[2][1] + y1))
+    if best is None or best[1] < threshold:
+        return None
+    return best
+
+def _match_template_in_region(screenshot_cvmat, template: Template, region, threshold, auto_rotate_if_trans = False, early_exit_value = None):
+    """
+    只在截图的region(x1, y1, x2, y2)区域内匹配模板，匹配值达到threshold时返回与_match_template相同格式（坐标换算回整张截图）的结果，否则返回None
+    """
+    x1, y1 = region[0], region[1]
+    x2, y2 = min(region[2], screenshot_cvmat.shape[1]), min(region[3], screenshot_cvmat.shape[0])
+    if x2 - x1 < template.w or y2 - y1 < template.h:
+        return None
+    matched = _match_template(screenshot_cvmat[y1:y2, x1:x2], template, auto_rotate_if_trans, early_exit_value)
+    if matched is None or matched[1] < threshold:
+        return None
+    return matched[0], matched[1], (matched[2][0] + x1, matched[2][1] + y1)
+
+MULTI_MATCH_MAX = 100
+"""多点匹配最多返回的匹配数量"""
+NMS_DILATE_MIN_CANDIDATES = 1000
+"""超过阈值的点多于这个数量时才做局部最大值过滤"""
+
+def non_max_suppression(result, threshold, w, h, max_matches = MULTI_MATCH_MAX) -> list:
+    """
+    从matchTemplate的结果矩阵中找出所有不小于threshold的峰值，返回按匹配值从高到低排列的 [(x, y, 匹配值)]，最多max_matches个
+
+    候选点很多时先用膨胀只保留局部最大值，再按匹配值从高到低，去掉与已选中的点横向距离小于w/2且纵向距离小于h/2的点
+    """
+    candidates = result >= threshold
+    if np.count_nonzero(candidates) > NMS_DILATE_MIN_CANDIDATES:
+        # 候选点很多时先只保留局部最大值：与3*3邻域膨胀后的值相等的点
+        candidates &= result >= cv2.dilate(result, np.ones((3, 3), np.uint8))
+    ys, xs = np.nonzero(candidates)
+    scores = result[ys, xs]
+    # 带mask匹配时可能出现inf
+    finite = np.isfinite(scores)
+    ys, xs, scores = ys[finite], xs[finite], scores[finite]
+    if len(xs) == 0:
+        return []
+    order = np.argsort(-scores, kind="stable")
+    xs, ys, scores = xs[order], ys[order], scores[order]
+    keep = []
+    alive = np.ones(len(xs), dtype=bool)
+    i = 0
+    while len(keep) < max_matches:
+        # 下一个还没被去掉的点
+        rest = np.flatnonzero(alive[i:])
+        if len(rest) == 0:
+            break
+        i += int(rest[0])
+        keep.append(i)
+        # 去掉这个点附近的点
+        alive[i:] &= (np.abs(xs[i:] - xs[i]) >= w / 2) | (np.abs(ys[i:] - ys[i]) >= h / 2)
+    return [(int(xs[i]), int(ys[i]), float(scores[i])) for i in keep]
+
+def match_pattern(sourcepic_mat: MatLike, patternpic: str|MatLike,threshold: float = 0.9, show_result:bool = False, auto_rotate_if_trans = False, multi_match: bool = False, max_matches: int = MULTI_MATCH_MAX) -> Tuple[bool, Tuple[float, float], float] | list:
     """
     Match the pattern picture in the source picture.
     
@@ -97,6 +305,7 @@ def match_pattern(sourcepic_mat: MatLike, patternpic: str|MatLike,threshold: flo
     ------
     sourcepic_mat: Big pictures which may contains pattern, in MatLike
     patternpic: Small pattern picture path to be matched, in str
+    max_matches: The max number of matches returned when multi_match is True
     """
     # logging.debug("Matching pattern {}".format(patternpic))
     default_response = (False, (0, 0), 0)
@@ -113,99 +322,64 @@ def match_pattern(sourcepic_mat: MatLike, patternpic: str|MatLike,threshold: flo
             raise Exception("由于卡顿或其他原因，截图文件损坏，请尝试清理电脑内存后重启程序")
         return default_response
     if isinstance(patternpic, str):
-        # 检查图片是否存在
-        if not exists(patternpic):
+        # 从模板缓存中读取，同时检查图片是否存在
+        template = template_store.get(patternpic)
+        if template is None:
             logging.error({"zh_CN": "匹配的模板图片 文件不存在: {}".format(patternpic), "en_US":"The pattern picture file does not exist: {}".format(patternpic)})
             return default_response
-        pattern = cv2.imread(patternpic, cv2.IMREAD_UNCHANGED)  # 读取包含透明通道的模板图像
     else:
-        # MatLike类型直接赋值给pattern
-        pattern = patternpic
-        if pattern is None:
+        # MatLike类型直接构造模板
+        if patternpic is None:
             logging.error({
                 "zh_CN": "匹配的模板图片为空", 
                 "en_US":"The pattern picture is None"
             })
             return default_response
-    # 判断透明度通道
-    have_alpha=False
-    if(pattern.shape[2] == 4 and auto_rotate_if_trans):
-        # 有透明度通道且开启了旋转匹配
-        have_alpha = True
-        best_max_val = -1
-        best_max_loc = (0, 0)
-        best_result = None
-        for i in range(-3, 4):
-            degree = i
-            # 旋转
-            rotate_pattern = rotate_image_with_transparency(pattern, degree)
-            # 以透明部分作为mask
-            rotate_mask = rotate_pattern[:, :, 3]  # 透明通道
-            rotate_mask[rotate_mask>0] = 255
-            rotate_pattern = rotate_pattern[:, :, :3] # 去除透明通道
-            # https://www.cnblogs.com/FHC1994/p/9123393.html
-            if not check_the_pic_validity(screenshot_cvmat, rotate_pattern):
-                return default_response
-            tresult = cv2.matchTemplate(screenshot_cvmat, rotate_pattern, cv2.TM_CCORR_NORMED, mask=rotate_mask)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(tresult)
-            # print("角度为{}时，最大匹配值为{}".format(degree, max_val))
-            if max_val>best_max_val:
-                best_max_val = max_val
-                best_max_loc = max_loc
-                best_result = tresult
-        result = best_result
-        min_val, max_val, min_loc, max_loc = 0, best_max_val, 0, best_max_loc
-    else:
-        # 无旋转匹配
-        # TODO： 多点匹配：https://pyimagesearch.com/2021/03/29/multi-template-matching-with-opencv/
-        if pattern.shape[2] == 4:
-            # 有透明度通道
-            # 以透明部分作为mask
-            pattern_mask = pattern[:, :, 3]  # 透明通道
-            pattern_mask[pattern_mask>0] = 255
-            pattern = pattern[:, :, :3] # 去除透明通道
-            if not check_the_pic_validity(screenshot_cvmat, pattern):
-                return default_response
-            result = cv2.matchTemplate(screenshot_cvmat, pattern, cv2.TM_CCOEFF_NORMED, mask=pattern_mask)
-        else:
-            # 无透明度通道
-            if not check_the_pic_validity(screenshot_cvmat, pattern):
-                return default_response
-            result = cv2.matchTemplate(screenshot_cvmat, pattern[:,:,:3], cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        template = Template.from_image(patternpic)
+    # 旋转匹配时某个角度的匹配值超过阈值一定幅度就不再等待其他角度
+    early_exit_value = threshold + config.userconfigdict["ROTATE_MATCH_EARLY_EXIT_MARGIN"] if auto_rotate_if_trans and not multi_match else None
+    # 大模板在整张截图上搜索时先在缩小的截图上找候选位置，只用于asset_tools.py pyramid在截图上验证过缩小倍数的模板
+    pyramid_scale = 1
+    if isinstance(patternpic, str) and not multi_match and not auto_rotate_if_trans and config.userconfigdict["TEMPLATE_PYRAMID_MATCH"]:
+        pyramid_scale = template_store.get_pyramid_scale(patternpic) or 1
+    # 依次在 上次匹配到的位置附近 -> 模板声明的搜索区域 里匹配，都没匹配上再搜索整张截图
+    matched = None
+    if isinstance(patternpic, str) and not multi_match:
+        if config.userconfigdict["TEMPLATE_LEARN_LOCATION"]:
+            window = get_learned_window(patternpic, template.w, template.h)
+            if window is not None:
+                matched = _match_template_in_region(screenshot_cvmat, template, window, threshold, auto_rotate_if_trans, early_exit_value)
+                add_run_stat("match_location_hit" if matched is not None else "match_location_miss")
+        if matched is None and config.userconfigdict["TEMPLATE_SEARCH_REGION"]:
+            region = template_store.get_region(patternpic)
+            if region is not None:
+                matched = _match_template_in_region(screenshot_cvmat, template, region, threshold, auto_rotate_if_trans, early_exit_value)
+                add_run_stat("match_region_hit" if matched is not None else "match_region_miss")
+    if matched is None and pyramid_scale > 1:
+        matched = _match_template_pyramid(screenshot_cvmat, template, pyramid_scale, threshold)
+        add_run_stat("match_pyramid_hit" if matched is not None else "match_pyramid_miss")
+    if matched is None:
+        matched = _match_template(screenshot_cvmat, template, auto_rotate_if_trans, early_exit_value)
+        add_run_stat("match_full_frame")
+        if matched is None:
+            return default_response
+    if isinstance(patternpic, str) and not multi_match and matched[1] >= threshold and config.userconfigdict["TEMPLATE_LEARN_LOCATION"]:
+        learn_location(patternpic, matched[2])
+    result, max_val, max_loc = matched
     
-    h, w, _ = pattern.shape
+    h, w = template.h, template.w
     
     if multi_match:
-        loc = np.where(result >= threshold)
         matches = []
-        
-        pts = list(zip(*loc[::-1]))
-        if pts:
-            # Sort points by match score descending (for peak analysis / Non-Maxima Suppression)
-            pt_scores = [(pt[0], pt[1], result[pt[1], pt[0]]) for pt in pts]
-            pt_scores.sort(key=lambda x: x[2], reverse=True)
+        for x, y, val in non_max_suppression(result, threshold, w, h, max_matches):
+            center_x = x + int(w / 2)
+            center_y = y + int(h / 2)
+            matches.append((True, (center_x, center_y), val))
             
-            filtered_pts = []
-            for pt in pt_scores:
-                x, y, val = pt
-                is_close = False
-                for fx, fy, _ in filtered_pts:
-                    # Using half width/height as threshold to group close duplicate peaks
-                    if abs(x - fx) < w / 2 and abs(y - fy) < h / 2:
-                        is_close = True
-                        break
-                
-                if not is_close:
-                    filtered_pts.append(pt)
-                    center_x = x + int(w / 2)
-                    center_y = y + int(h / 2)
-                    matches.append((True, (center_x, center_y), float(val)))
-                    
-                    if show_result:
-                        bottom_right = (x + w, y + h)
-                        cv2.rectangle(screenshot_cvmat, (x, y), bottom_right, (0, 255, 0), 2)
-                        cv2.circle(screenshot_cvmat, (center_x, center_y), 10, (0, 0, 255), -1)
+            if show_result:
+                bottom_right = (x + w, y + h)
+                cv2.rectangle(screenshot_cvmat, (x, y), bottom_right, (0, 255, 0), 2)
+                cv2.circle(screenshot_cvmat, (center_x, center_y), 10, (0, 0, 255), -1)
         
         if show_result:
             cv2.imshow('Matched Screenshot', screenshot_cvmat)
@@ -237,30 +411,27 @@ def filter_num(input: str):
     """filter the number in the string"""
     return "".join(filter(str.isdigit, input))
 
+def _replace_ocr_mis(ocr_text):
+    """
+    替换容易识别错误的字符
+    """
+    ocr_text = ocr_text.strip()
+    ocr_text = ocr_text.replace("９", "9")
+    return ocr_text
+
 def ocr_pic_area(image_mat, fromx, fromy, tox, toy, multi_lines = False, ocr_lang = OCR_LANG.EN):
     """
     get the string in the image area
     
     axis in image is x: from left to right, y: from top to bottom
     
+    区域像素与之前识别过的区域完全相同时直接返回缓存的结果
     """
-    ocr_sys = OCR_SYS_EN
-    if ocr_lang == OCR_LANG.ZHS:
-        ocr_sys = OCR_SYS_ZHS
-    elif ocr_lang == OCR_LANG.ZHT:
-        ocr_sys = OCR_SYS_ZHT
+    model = OCR_LANG_MODEL.get(ocr_lang, "en")
     fromx = int(fromx)
     fromy = int(fromy)
     tox = int(tox)
     toy = int(toy)
-    def replace_mis(ocr_text):
-        """
-        替换容易识别错误的字符
-        """
-        ocr_text = ocr_text.strip()
-        ocr_text = ocr_text.replace("９", "9")
-        return ocr_text
-    
     def local2global_pos(pixel_pos):
         """
         将局部坐标转换为全局坐标
@@ -277,13 +448,43 @@ def ocr_pic_area(image_mat, fromx, fromy, tox, toy, multi_lines = False, ocr_lan
         rawImage = rawImage[fromy:toy, fromx:tox]
         if not multi_lines:
             # 图像识别单行
-            resstring = ocr_sys.ocr_single_line(rawImage)
-            return [replace_mis(resstring[0]), resstring[1] if not isnan(resstring[1]) else 0]
+            def compute_single_line():
+                resstring = ocr_registry.ocr_lines(model, [rawImage])[0]
+                return [_replace_ocr_mis(resstring[0]), resstring[1] if not isnan(resstring[1]) else 0]
+            return ocr_cache.get_or_compute(ocr_cache.make_key(rawImage, model, False), compute_single_line)
         else:
-            # 图像识别多行
-            resstring_list = ocr_sys.detect_and_ocr(rawImage)
-            return [[replace_mis(res.ocr_text), res.score if not isnan(res.score) else 0, [local2global_pos(res.box[0]), local2global_pos(res.box[2])]] for res in resstring_list]
+            # 图像识别多行，结果中的坐标与区域位置有关，位置也作为缓存键的一部分
+            def compute_multi_lines():
+                resstring_list = ocr_registry.detect_and_ocr(model, rawImage)
+                return [[_replace_ocr_mis(text), score if not isnan(score) else 0, [local2global_pos(top_left), local2global_pos(bottom_right)]] for text, score, (top_left, bottom_right) in resstring_list]
+            return ocr_cache.get_or_compute(ocr_cache.make_key(rawImage, model, True, fromx, fromy), compute_multi_lines)
     
+def ocr_pic_areas(image_mat, areas, ocr_lang = OCR_LANG.EN):
+    """
+    识别多个区域的单行文字，返回与areas顺序一致的 [[识别结果, 置信度], ...]
+
+    areas: [(fromx, fromy, tox, toy), ...]
+
+    所有区域一起识别（按缩放后宽度分组，见ocr_lines_grouped），与ocr_pic_area共用识别结果缓存，只识别缓存中没有的区域
+    """
+    if image_mat is None:
+        return [["", 0] for _ in areas]
+    if not areas:
+        return []
+    model = OCR_LANG_MODEL.get(ocr_lang, "en")
+    crops = [image_mat[int(fromy):int(toy), int(fromx):int(tox)] for fromx, fromy, tox, toy in areas]
+    keys = [ocr_cache.make_key(crop, model, False) for crop in crops]
+    results = [None] * len(crops)
+    computed = {}
+    missing = [i for i, key in enumerate(keys) if not ocr_cache.contains(key)]
+    if missing:
+        for i, resstring in zip(missing, ocr_registry.ocr_lines(model, [crops[i] for i in missing])):
+            computed[i] = [_replace_ocr_mis(resstring[0]), resstring[1] if not isnan(resstring[1]) else 0]
+    for i, key in enumerate(keys):
+        # 缓存中的结果在判断之后被挤出时重新单独识别
+        results[i] = ocr_cache.get_or_compute(key, lambda i=i: computed[i] if i in computed else ocr_pic_area(image_mat, *areas[i], ocr_lang = ocr_lang))
+    return results
+
 def match_pixel_color_range(image_mat, x, y, low_range, high_range, printit = False):
     """
     match whether the color at that location is between the range
@@ -0,0 +1,332 @@
+import time
+import queue
+import socket
+import itertools
+import threading
+import subprocess
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.subprocess_helper import subprocess_run
+from modules.utils.adb_client import adb_client, AdbClientError
+from modules.utils.run_stats import add_run_stat
+from modules.utils.adb_utils import MaaTouchUtils, adb_shell, getNewestSeialNumber, get_config_adb_path, _use_adb_client, _is_PC_app, click_on_screen, swipe_on_screen, mark_input_action
+from modules.utils.gesture import Gesture, GestureHandle
+
+__all__ = ["InputBackend", "SubprocessInput", "ShellInput", "MaaTouchInput", "InputRouter", "get_input_router", "close_input_routers", "submit_gesture"]
+
+# 向设备发送点击/滑动的方式:
+# maatouch: 常驻的maatouch进程，直接注入触摸事件，每次操作只是向管道写一行
+# shell: 常驻的adb shell会话，每次操作在会话中执行一条input命令，省去每次建立shell的开销
+# subprocess: 每次操作单独执行一条adb shell input命令（经由ADB_CONNECT_METHOD选择的通道）
+# 按配置的方式开始，不可用时依次换用后面的方式，subprocess总是可用的最后手段
+# ========================================
+
+INPUT_METHODS = ["maatouch", "shell", "subprocess"]
+"""从快到慢排列的输入方式"""
+
+DEFAULT_INPUT_METHOD = "shell"
+"""未配置或配置无效时的输入方式"""
+
+SHELL_INPUT_TIMEOUT = 10
+"""常驻shell会话中一条input命令的最长等待秒数"""
+
+
+class InputBackend:
+    """
+    一种输入方式，is_available()检查连接是否健康（必要时建立连接），操作出错时抛出异常
+
+    操作出错时可能已经有一部分写到了设备上，所以只有is_available()返回False时才能换用其他方式重新发送
+    """
+    name = None
+
+    def __init__(self, target_config):
+        self.config = target_config
+
+    def is_available(self) -> bool:
+        raise NotImplementedError
+
+    def tap(self, x, y):
+        raise NotImplementedError
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        raise NotImplementedError
+
+    def run_gesture(self, gesture: Gesture) -> GestureHandle:
+        """默认逐个执行手势中的操作，执行完才返回"""
+        gesture.run_with(self.tap, self.swipe)
+        return GestureHandle(time.time())
+
+    def close(self):
+        pass
+
+
+class SubprocessInput(InputBackend):
+    """每次操作执行一条adb shell input命令"""
+    name = "subprocess"
+
+    def is_available(self) -> bool:
+        return True
+
+    def tap(self, x, y):
+        adb_shell(["input", "tap", str(int(x)), str(int(y))], self.config)
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        adb_shell(["input", "swipe", str(int(x1)), str(int(y1)), str(int(x2)), str(int(y2)), str(int(ms))], self.config)
+
+
+class ShellInput(InputBackend):
+    """
+    在常驻的adb shell会话中执行input命令
+
+    每条命令后面跟一句echo标记，读到标记时命令已执行完，与subprocess方式一样是同步的
+
+    会话的输出由后台线程逐行放入队列，等待标记时最多等SHELL_INPUT_TIMEOUT秒，超时视为会话出错
+    """
+    name = "shell"
+
+    def __init__(self, target_config):
+        super().__init__(target_config)
+        self._sock = None
+        self._process = None
+        self._reader = None
+        self._writer = None
+        self._lines = None
+        self._marker_counter = itertools.count(1)
+
+    def _open(self):
+        serial = getNewestSeialNumber(self.config)
+        if _use_adb_client(self.config):
+            try:
+                # 带命令的shell服务不分配pty，输入不会被回显
+                self._sock = adb_client.open_service(serial, "shell:sh", timeout=SHELL_INPUT_TIMEOUT)
+                # 读取在后台线程中阻塞进行，超时由_execute控制
+                self._sock.settimeout(None)
+                self._reader = self._writer = self._sock.makefile("rwb")
+                self._start_reader()
+                return
+            except AdbClientError as e:
+                adb_client.reset_available()
+                logging.debug(f"adb socket shell session failed, fallback to subprocess: {e}")
+        self._process = subprocess_run([get_config_adb_path(self.config), "-s", serial, "shell", "sh"], isasync=True, stderr=subprocess.DEVNULL, encoding=None)
+        self._reader, self._writer = self._process.stdout, self._process.stdin
+        self._start_reader()
+
+    def _start_reader(self):
+        """启动后台线程把会话的输出逐行放入队列，会话结束时放入空行"""
+        reader, lines = self._reader, queue.Queue()
+        def read_lines():
+            try:
+                for line in iter(reader.readline, b""):
+                    lines.put(line)
+            except (OSError, ValueError):
+                pass
+            lines.put(b"")
+        self._lines = lines
+        threading.Thread(target=read_lines, daemon=True).start()
+
+    def _execute(self, cmd: str):
+        marker = f"BAAH_INPUT_{next(self._marker_counter)}".encode("utf-8")
+        self._writer.write(cmd.encode("utf-8") + b"; echo " + marker + b"\n")
+        self._writer.flush()
+        deadline = time.monotonic() + SHELL_INPUT_TIMEOUT
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"adb shell session did not answer in {SHELL_INPUT_TIMEOUT}s")
+            if not line:
+                raise OSError("adb shell session closed")
+            if line.strip() == marker:
+                return
+
+    def is_available(self) -> bool:
+        if self._writer is not None:
+            return True
+        try:
+            self._open()
+            self._execute("true")
+            return True
+        except Exception as e:
+            logging.debug(f"adb shell session unavailable: {e}")
+            self.close()
+            return False
+
+    def tap(self, x, y):
+        self._execute(f"input tap {int(x)} {int(y)}")
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        self._execute(f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(ms)}")
+
+    def close(self):
+        if self._sock is not None:
+            # 唤醒阻塞在读取上的后台线程
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for each in [self._writer, self._sock]:
+            try:
+                if each is not None:
+                    each.close()
+            except OSError:
+                pass
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+        self._sock = self._process = self._reader = self._writer = self._lines = None
+
+
+class MaaTouchInput(InputBackend):
+    """通过常驻的maatouch进程注入触摸事件"""
+    name = "maatouch"
+
+    def __init__(self, target_config):
+        super().__init__(target_config)
+        self.maatouch = MaaTouchUtils()
+        self.maatouch.load_config(target_config)
+
+    def is_available(self) -> bool:
+        # 进程退出后会重新启动一次，启动失败过就不再尝试
+        return self.maatouch._initialize()
+
+    def tap(self, x, y):
+        self.maatouch.click(x, y)
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        self.maatouch.swipe(x1, y1, x2, y2, int(ms))
+
+    def run_gesture(self, gesture: Gesture) -> GestureHandle:
+        """整个手势一次写入，不等待执行完"""
+        self.maatouch.run_script(gesture.to_maatouch_script(self.maatouch))
+        return GestureHandle(time.time() + gesture.duration_ms() / 1000)
+
+    def close(self):
+        process = self.maatouch.maatouch_process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        self.maatouch.maatouch_process = None
+
+
+INPUT_BACKEND_CLASSES = {
+    "maatouch": MaaTouchInput,
+    "shell": ShellInput,
+    "subprocess": SubprocessInput,
+}
+
+
+class InputRouter:
+    """
+    从配置的输入方式开始，依次尝试 INPUT_METHODS 中后面的方式，使用第一个可用的
+
+    某个方式不可用或操作出错后，这次运行中不再使用它（subprocess除外）。
+    操作出错时设备可能已经执行了这次操作，为了不重复点击，这次操作不再用其他方式重发，只记录后丢弃
+    """
+    def __init__(self, target_config, method: str):
+        self.method = method
+        self.backends = [INPUT_BACKEND_CLASSES[name](target_config) for name in INPUT_METHODS[INPUT_METHODS.index(method):]]
+        self.failed = set()
+        self._lock = threading.Lock()
+
+    def _send(self, action: str, *args):
+        with self._lock:
+            for backend in self.backends:
+                if backend.name in self.failed:
+                    continue
+                is_last = backend is self.backends[-1]
+                try:
+                    available = backend.is_available()
+                except Exception as e:
+                    if is_last:
+                        raise
+                    available, error = False, e
+                else:
+                    error = "unavailable"
+                if available:
+                    return self._send_with(backend, is_last, action, *args)
+                self.failed.add(backend.name)
+                backend.close()
+                logging.warn(istr({
+                    CN: f"输入方式{backend.name}不可用({error})，改用下一种方式",
+                    EN: f"Input method {backend.name} is unavailable ({error}), fallback to the next one"
+                }))
+
+    def _send_with(self, backend: InputBackend, is_last: bool, action: str, *args):
+        """用可用的backend执行操作，出错时丢弃这次操作并返回None"""
+        start = time.perf_counter()
+        try:
+            result = getattr(backend, action)(*args)
+        except Exception as e:
+            add_run_stat("input_dropped")
+            if not is_last:
+                self.failed.add(backend.name)
+                backend.close()
+            logging.error(istr({
+                CN: f"输入方式{backend.name}执行{action}时出错({e})，设备可能已收到这次操作，不再重发",
+                EN: f"Input method {backend.name} failed during {action} ({e}), the device may have received it, so it is not resent"
+            }))
+            return None
+        add_run_stat(f"input_{backend.name}")
+        add_run_stat(f"input_{backend.name}_time", time.perf_counter() - start)
+        return result
+
+    def tap(self, x, y):
+        self._send("tap", x, y)
+
+    def swipe(self, x1, y1, x2, y2, ms):
+        self._send("swipe", x1, y1, x2, y2, ms)
+
+    def run_gesture(self, gesture: Gesture) -> GestureHandle:
+        handle = self._send("run_gesture", gesture)
+        return handle if handle is not None else GestureHandle(time.time())
+
+    def current_method(self) -> str:
+        """当前实际使用的输入方式"""
+        for backend in self.backends:
+            if backend.name not in self.failed:
+                return backend.name
+        return self.backends[-1].name
+
+    def close(self):
+        with self._lock:
+            for backend in self.backends:
+                backend.close()
+
+
+_input_routers = {}
+"""每个设备序列号对应一个输入路由"""
+
+def get_input_router(use_config=None) -> InputRouter:
+    """
+    得到当前设备的输入路由，配置的输入方式改变后重新创建
+    """
+    target_config = config if not use_config else use_config
+    serial = getNewestSeialNumber(target_config)
+    method = target_config.userconfigdict.get("INPUT_METHOD", DEFAULT_INPUT_METHOD)
+    if method not in INPUT_METHODS:
+        method = DEFAULT_INPUT_METHOD
+    router = _input_routers.get(serial)
+    if router is None or router.method != method:
+        if router is not None:
+            router.close()
+        router = InputRouter(target_config, method)
+        _input_routers[serial] = router
+    return router
+
+def close_input_routers():
+    """关闭所有常驻的输入连接（maatouch进程，adb shell会话）"""
+    for router in _input_routers.values():
+        router.close()
+    _input_routers.clear()
+
+def submit_gesture(gesture: Gesture, use_config=None) -> GestureHandle:
+    """
+    在当前设备上执行手势，maatouch方式下立即返回
+
+    最近一次输入操作的时间记为手势预计执行完的时间，后台持续截图据此挑选手势结束之后的帧
+    """
+    target_config = config if not use_config else use_config
+    if _is_PC_app(target_config.userconfigdict["SERVER_TYPE"]):
+        gesture.run_with(click_on_screen, swipe_on_screen)
+        return GestureHandle(time.time())
+    handle = get_input_router(target_config).run_gesture(gesture)
+    mark_input_action(target_config, kind="gesture", detail=gesture.actions, until=handle.end_time)
+    return handle
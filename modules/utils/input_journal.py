@@ -0,0 +1,52 @@
+import time
+import threading
+from collections import deque
+
+__all__ = ["InputJournal", "input_journal"]
+
+# 输入操作记录: 最近发送到设备的点击、滑动、手势、按键、打开/关闭应用
+# 截图时据此判断上一帧之后有没有操作过设备，出错时写入错误报告便于还原现场
+# ========================================
+
+INPUT_JOURNAL_SIZE = 200
+"""最多保留的操作条数"""
+
+
+class InputJournal:
+    """
+    最近的输入操作，每条为 (时间戳, 种类, 参数, 预计生效完的时间戳)
+    """
+    def __init__(self, size = INPUT_JOURNAL_SIZE):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, detail = None, until = None):
+        """
+        kind: click/swipe/gesture/key/open_app/close_app 等
+        until: 操作在这个时间之后才执行完（如提交后异步执行的手势），默认为记录时间
+        """
+        now = time.time()
+        with self._lock:
+            self._entries.append((now, kind, detail, max(now, until or now)))
+
+    def entries(self, since = None) -> list:
+        """记录时间晚于since的操作，since为None时返回所有"""
+        with self._lock:
+            return [entry for entry in self._entries if since is None or entry[0] > since]
+
+    def format(self, count = 20) -> str:
+        """最近count条操作，每行一条"""
+        lines = []
+        for timestamp, kind, detail, _ in self.entries()[-count:]:
+            lines.append(f"{time.strftime('%H:%M:%S', time.localtime(timestamp))}.{int(timestamp * 1000) % 1000:03d} {kind} {detail if detail is not None else ''}".rstrip())
+        return "\n".join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+input_journal = InputJournal()
+"""
+进程内共用的输入操作记录
+"""
@@ -0,0 +1,87 @@
+import copy
+import threading
+from collections import OrderedDict
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.run_stats import add_run_stat, get_run_stat_total
+
+__all__ = ["OcrCache", "ocr_cache", "log_ocr_cache_stats"]
+
+# 界面上很多文字在多次识别之间没有变化（资源栏、重试时的同一个弹窗），
+# 以截图区域像素内容的哈希为键缓存识别结果，像素完全相同时直接返回上次的结果
+# ========================================
+
+OCR_CACHE_SIZE = 256
+"""最多缓存的识别结果数"""
+
+class OcrCache:
+    """
+    (区域像素哈希, 区域形状, 语言, 是否多行[, 多行时区域左上角]) -> 识别结果 的LRU缓存
+    """
+    def __init__(self, max_size = OCR_CACHE_SIZE):
+        self.max_size = max_size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image_mat, *extra) -> tuple:
+        """
+        区域像素的哈希（python内置的非加密哈希）加上形状和extra组成缓存键
+        """
+        return (hash(image_mat.tobytes()), image_mat.shape) + extra
+
+    def get_or_compute(self, key: tuple, func):
+        """
+        有缓存时返回缓存结果的副本，否则调用func识别并缓存，命中情况计入运行统计
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                add_run_stat("ocr_cache_hit")
+                return copy.deepcopy(self._results[key])
+        result = func()
+        with self._lock:
+            self.misses += 1
+            add_run_stat("ocr_cache_miss")
+            self._results[key] = copy.deepcopy(result)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+    def contains(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._results
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0,
+        }
+
+
+ocr_cache = OcrCache()
+"""
+进程内共用的文字识别结果缓存
+"""
+
+def log_ocr_cache_stats(use_config = None):
+    """
+    输出这次运行中文字识别缓存的命中情况
+    """
+    hits = get_run_stat_total("ocr_cache_hit", use_config)
+    misses = get_run_stat_total("ocr_cache_miss", use_config)
+    if hits + misses == 0:
+        return
+    logging.info(istr({
+        CN: f"文字识别缓存: 命中{hits}次，未命中{misses}次（命中率{hits / (hits + misses) * 100:.1f}%）",
+        EN: f"OCR cache: hit {hits} times, missed {misses} times (hit rate {hits / (hits + misses) * 100:.1f}%)"
+    }))
@@ -0,0 +1,221 @@
+import math
+import time
+import threading
+import numpy as np
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.run_stats import add_run_stat
+
+__all__ = ["ocr_lines_grouped", "detect_and_ocr_plain", "OcrRegistry", "ocr_registry"]
+
+# 文字识别模型按语言在第一次使用时才加载，GUI等不做文字识别的进程不需要加载onnx模型
+# 运行时可以在启动模拟器期间由后台线程预先加载并做一次空识别(warm_up)，避免第一次识别的耗时落在任务流程里
+# 开启OCR_SERVER时识别请求发给本机的识别服务进程（见ocr_server.py），多个配置同时运行时共用一份模型，
+# 连接不上识别服务时退回本进程加载模型
+# ========================================
+
+def _session_options():
+    """
+    按配置生成onnx会话选项，全部是默认值时返回None
+    """
+    # 没有解析配置文件的进程（如单独测试文字识别）使用默认值
+    intra_op_threads = config.userconfigdict.get("OCR_INTRA_OP_THREADS", 0)
+    inter_op_threads = config.userconfigdict.get("OCR_INTER_OP_THREADS", 0)
+    execution_mode = config.userconfigdict.get("OCR_EXECUTION_MODE", "sequential")
+    if not intra_op_threads and not inter_op_threads and execution_mode == "sequential":
+        return None
+    import onnxruntime as ort
+    so = ort.SessionOptions()
+    so.log_severity_level = 3
+    so.intra_op_num_threads = intra_op_threads
+    so.inter_op_num_threads = inter_op_threads
+    so.execution_mode = ort.ExecutionMode.ORT_PARALLEL if execution_mode == "parallel" else ort.ExecutionMode.ORT_SEQUENTIAL
+    return so
+
+def _apply_session_options(ocr_sys, model: str, so):
+    """
+    pponnxcr在内部用固定的选项创建会话，用配置的选项重新创建检测和识别会话
+    """
+    import onnxruntime as ort
+    from pponnxcr.utility import get_model_data
+    for predictor, step in ((ocr_sys.text_detector, "det"), (ocr_sys.text_recognizer, "rec")):
+        sess = ort.InferenceSession(get_model_data(model, step), so, providers=["CPUExecutionProvider"])
+        predictor.predictor, predictor.input_tensor = sess, sess.get_inputs()[0]
+
+
+OCR_BATCH_MAX_PADDING = 0.25
+"""同一批中最宽图像比最窄图像宽出的比例上限，补齐的部分也要计算"""
+
+def ocr_lines_grouped(ocr_sys, crops) -> list:
+    """
+    识别多个单行文字图像，返回与crops顺序一致的 [(识别结果, 置信度), ...]
+
+    识别模型把每个图像缩放到固定的输入高度，一批中较窄的图像会被补齐到最宽图像的宽度，
+    所以按缩放后的宽度从窄到宽排列，宽度相差不超过OCR_BATCH_MAX_PADDING的相邻图像放在同一批做一次识别
+    """
+    input_h = ocr_sys.text_recognizer.rec_image_shape[1]
+    scaled_ws = [math.ceil(input_h * crop.shape[1] / crop.shape[0]) for crop in crops]
+    groups = []
+    for i in sorted(range(len(crops)), key=lambda i: scaled_ws[i]):
+        if groups and scaled_ws[i] <= scaled_ws[groups[-1][0]] * (1 + OCR_BATCH_MAX_PADDING):
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    results = [None] * len(crops)
+    for indexes in groups:
+        for i, resstring in zip(indexes, ocr_sys.ocr_lines([crops[i] for i in indexes])):
+            results[i] = (resstring[0], float(resstring[1]))
+    return results
+
+def detect_and_ocr_plain(ocr_sys, image_mat) -> list:
+    """
+    检测并识别图像中的多行文字，返回 [(识别结果, 置信度, [左上角, 右下角]), ...]
+    """
+    return [(res.ocr_text, float(res.score), [[int(v) for v in res.box[0]], [int(v) for v in res.box[2]]]) for res in ocr_sys.detect_and_ocr(image_mat)]
+
+
+class OcrRegistry:
+    """
+    语言模型名（pponnxcr的'en'/'zht'/'zhs'） -> TextSystem
+    """
+    def __init__(self):
+        self._systems = {}
+        self._inferred = set()
+        self._lock = threading.Lock()
+        self._client = None
+        self._server_failed = False
+
+    def _get_client(self):
+        """
+        开启OCR_SERVER且识别服务可用时返回连接识别服务的客户端，否则返回None
+
+        没有从启动识别服务的BAAH继承认证密钥时（例如单独启动的运行进程）不使用识别服务
+        """
+        if self._server_failed or not config.softwareconfigdict.get("OCR_SERVER", False):
+            return None
+        if self._client is None:
+            from modules.utils.ocr_server import OcrClient, get_ocr_server_authkey
+            authkey = get_ocr_server_authkey()
+            if authkey is None:
+                self._server_failed = True
+                return None
+            self._client = OcrClient(config.softwareconfigdict["OCR_SERVER_PORT"], authkey)
+        return self._client
+
+    def _remote(self, kind: str, model: str, payload):
+        """
+        把请求发给识别服务，识别服务不可用时返回None，之后的请求都在本进程识别
+        """
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            return client.request(kind, model, payload)
+        except Exception as e:
+            self._server_failed = True
+            logging.warn(istr({
+                CN: f"无法使用文字识别服务，改为在本进程中识别: {e}",
+                EN: f"OCR server unavailable, running OCR in this process: {e}"
+            }))
+            return None
+
+    def ocr_lines(self, model: str, crops: list) -> list:
+        """
+        识别多个单行文字图像，返回与crops顺序一致的 [(识别结果, 置信度), ...]
+        """
+        start = time.perf_counter()
+        results = self._remote("lines", model, crops)
+        if results is None:
+            results = ocr_lines_grouped(self.get(model), crops)
+        self.record_inference(model, time.perf_counter() - start)
+        return results
+
+    def detect_and_ocr(self, model: str, image_mat) -> list:
+        """
+        检测并识别图像中的多行文字，返回 [(识别结果, 置信度, [左上角, 右下角]), ...]
+        """
+        start = time.perf_counter()
+        results = self._remote("detect", model, image_mat)
+        if results is None:
+            results = detect_and_ocr_plain(self.get(model), image_mat)
+        self.record_inference(model, time.perf_counter() - start)
+        return results
+
+    def get(self, model: str):
+        """
+        得到语言对应的TextSystem，没有加载过时加载，加载耗时计入运行统计
+        """
+        ocr_sys = self._systems.get(model)
+        if ocr_sys is not None:
+            return ocr_sys
+        with self._lock:
+            # 等锁期间可能已经被其他线程加载
+            ocr_sys = self._systems.get(model)
+            if ocr_sys is None:
+                from pponnxcr import TextSystem
+                start = time.perf_counter()
+                ocr_sys = TextSystem(model)
+                so = _session_options()
+                if so is not None:
+                    _apply_session_options(ocr_sys, model, so)
+                cost = time.perf_counter() - start
+                self._systems[model] = ocr_sys
+                add_run_stat("ocr_load_time", cost)
+                logging.debug(f"OCR model {model} loaded in {cost:.2f}s")
+        return ocr_sys
+
+    def record_inference(self, model: str, cost: float):
+        """
+        记录一次识别的耗时，每个模型的第一次识别耗时计入运行统计
+        """
+        if model in self._inferred:
+            return
+        self._inferred.add(model)
+        add_run_stat("ocr_first_call_time", cost)
+        logging.debug(f"OCR model {model} first call took {cost:.3f}s")
+
+    def warm_up(self, models) -> threading.Thread:
+        """
+        在后台线程中加载模型并各做一次空识别，返回该线程，使用识别服务时由识别服务预加载
+        """
+        if self._get_client() is not None:
+            models = []
+        thread = threading.Thread(target=self._warm_up, args=(list(models),), daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self, models):
+        blank = np.full((48, 160, 3), 255, dtype=np.uint8)
+        for model in models:
+            try:
+                start = time.perf_counter()
+                ocr_sys = self.get(model)
+                ocr_sys.ocr_single_line(blank)
+                ocr_sys.detect_and_ocr(blank)
+                logging.debug(f"OCR model {model} warmed up in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                logging.warn(istr({
+                    CN: f"文字识别模型{model}预加载失败: {e}",
+                    EN: f"Failed to warm up OCR model {model}: {e}"
+                }))
+
+    def release(self, model: str = None):
+        """
+        释放语言对应的TextSystem，不传入时释放全部
+        """
+        with self._lock:
+            if model is None:
+                self._systems.clear()
+                self._inferred.clear()
+            else:
+                self._systems.pop(model, None)
+                self._inferred.discard(model)
+
+    def loaded_models(self) -> list:
+        return list(self._systems.keys())
+
+
+ocr_registry = OcrRegistry()
+"""
+进程内共用的文字识别模型
+"""
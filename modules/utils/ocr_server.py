@@ -0,0 +1,196 @@
+import os
+import time
+import queue
+import secrets
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.ocr_registry import ocr_registry, ocr_lines_grouped, detect_and_ocr_plain
+
+# 本机的文字识别服务进程，持有所有文字识别模型，多个配置同时运行时各运行进程把截图区域发过来识别，
+# 每个运行进程不需要各自加载一份模型
+# 服务端把同时到达的单行识别请求（可能来自不同的运行进程）合并成一批识别
+# 通信使用multiprocessing.connection（本机TCP + 认证 + pickle）
+# pickle反序列化可以执行任意代码，认证密钥在启动识别服务时随机生成，只通过环境变量传给由同一个BAAH启动的运行进程，
+# 双方都要验证对方持有密钥: 本机其他进程既不能向识别服务发请求，也不能抢先占用端口冒充识别服务
+# ========================================
+
+OCR_SERVER_HOST = "127.0.0.1"
+
+OCR_SERVER_AUTHKEY_ENV = "BAAH_OCR_SERVER_AUTHKEY"
+"""保存认证密钥（16进制）的环境变量，子进程继承"""
+
+OCR_SERVER_WARM_UP_MODELS = ["en", "zhs"]
+"""识别服务启动时预加载的模型"""
+
+OCR_SERVER_START_TIMEOUT = 10
+"""启动识别服务进程后等待其开始监听的最长秒数"""
+
+
+class OcrServerError(Exception):
+    """识别服务处理请求时出错"""
+
+
+def get_ocr_server_authkey(create = False):
+    """
+    本进程（或启动本进程的BAAH）生成的识别服务认证密钥，没有时返回None
+
+    create: 没有时随机生成一个并写入环境变量，之后启动的子进程都会继承
+    """
+    authkey = os.environ.get(OCR_SERVER_AUTHKEY_ENV)
+    if authkey:
+        return bytes.fromhex(authkey)
+    if not create:
+        return None
+    authkey = secrets.token_bytes(32)
+    os.environ[OCR_SERVER_AUTHKEY_ENV] = authkey.hex()
+    return authkey
+
+
+class OcrClient:
+    """
+    运行进程中连接识别服务的客户端，第一次请求时连接，多个线程共用一个连接
+    """
+    def __init__(self, port: int, authkey: bytes):
+        self.port = port
+        self.authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def request(self, kind: str, model: str, payload):
+        """
+        kind: "lines" 时payload为单行文字图像列表，"detect" 时payload为一张图像，返回值与OcrRegistry的同名方法一致
+
+        连接失败时抛出OSError等异常，服务端识别出错时抛出OcrServerError
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client((OCR_SERVER_HOST, self.port), authkey=self.authkey)
+            try:
+                self._conn.send((kind, model, payload))
+                ok, result = self._conn.recv()
+            except Exception:
+                self._conn.close()
+                self._conn = None
+                raise
+        if not ok:
+            raise OcrServerError(result)
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Request:
+    def __init__(self, kind, model, payload):
+        self.kind = kind
+        self.model = model
+        self.payload = payload
+        self.response = None
+        self.done = threading.Event()
+
+
+def _serve_connection(conn, requests: queue.Queue):
+    """
+    每个连接一个线程，把请求放进队列，等识别线程处理完后回复
+    """
+    try:
+        while True:
+            kind, model, payload = conn.recv()
+            request = _Request(kind, model, payload)
+            requests.put(request)
+            request.done.wait()
+            conn.send(request.response)
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+def _inference_loop(requests: queue.Queue):
+    """
+    识别线程: 取出队列中所有等待的请求，同一模型的单行识别请求合并成一批
+    """
+    while True:
+        batch = [requests.get()]
+        while True:
+            try:
+                batch.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        lines = {}
+        for request in batch:
+            if request.kind == "lines":
+                lines.setdefault(request.model, []).append(request)
+                continue
+            try:
+                if request.kind == "detect":
+                    request.response = (True, detect_and_ocr_plain(ocr_registry.get(request.model), request.payload))
+                else:
+                    request.response = (False, f"unknown request {request.kind}")
+            except Exception as e:
+                request.response = (False, str(e))
+            request.done.set()
+        for model, model_requests in lines.items():
+            crops = [crop for request in model_requests for crop in request.payload]
+            try:
+                results = ocr_lines_grouped(ocr_registry.get(model), crops)
+                offset = 0
+                for request in model_requests:
+                    request.response = (True, results[offset:offset + len(request.payload)])
+                    offset += len(request.payload)
+            except Exception as e:
+                for request in model_requests:
+                    request.response = (False, str(e))
+            for request in model_requests:
+                request.done.set()
+
+def run_ocr_server(port: int, authkey: bytes):
+    """
+    识别服务进程的入口，监听本机端口直到进程结束
+    """
+    listener = Listener((OCR_SERVER_HOST, port), authkey=authkey)
+    logging.info(istr({
+        CN: f"文字识别服务已启动，端口{port}",
+        EN: f"OCR server started on port {port}"
+    }))
+    threading.Thread(target=ocr_registry._warm_up, args=(OCR_SERVER_WARM_UP_MODELS,), daemon=True).start()
+    requests = queue.Queue()
+    threading.Thread(target=_inference_loop, args=(requests,), daemon=True).start()
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            # 认证失败等只影响这一个连接
+            logging.warn(f"OCR server rejected a connection: {e}")
+            continue
+        threading.Thread(target=_serve_connection, args=(conn, requests), daemon=True).start()
+
+def is_ocr_server_running(port: int, authkey: bytes) -> bool:
+    """端口上是否有持有authkey的识别服务"""
+    try:
+        Client((OCR_SERVER_HOST, port), authkey=authkey).close()
+        return True
+    except Exception:
+        return False
+
+def ensure_ocr_server(port: int):
+    """
+    本机端口上没有本BAAH启动的识别服务时启动识别服务进程（随调用者退出）并等待其开始监听，返回启动的进程，已有服务时返回None
+
+    端口被其他程序（或另一个BAAH启动的识别服务）占用时识别服务无法启动，各运行进程会在本进程中识别
+    """
+    authkey = get_ocr_server_authkey(create=True)
+    if is_ocr_server_running(port, authkey):
+        return None
+    process = multiprocessing.get_context("spawn").Process(target=run_ocr_server, args=(port, authkey), daemon=True)
+    process.start()
+    deadline = time.time() + OCR_SERVER_START_TIMEOUT
+    while time.time() < deadline and process.is_alive():
+        if is_ocr_server_running(port, authkey):
+            break
+        time.sleep(0.2)
+    return process
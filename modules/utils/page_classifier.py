@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import numpy as np
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.template_store import template_store
+
+__all__ = ["PageClassifier", "get_page_classifier", "compile_page_fingerprints"]
+
+FINGERPRINT_FILE_NAME = "page_fingerprints.json"
+"""
+每套素材（DATA/assets*）根目录下的页面指纹文件，由 asset_tools.py pages 从截图中生成，格式:
+
+{"tolerance": 30, "pages": {"PAGE_HOME": {"md5": 模板文件md5, "anchor": [模板左上角x, y], "points": [[x, y], ...], "colors": [[b, g, r], ...]}, ...}}
+
+每个页面用模板中少量最能和其他页面区分开的像素点（截图中的坐标和颜色）作为指纹，
+判断当前页面时一次取出所有页面的指纹像素比较，不需要对每个页面模板做一次matchTemplate
+"""
+
+def _file_md5(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+def _page_template_paths(asset_root: str) -> dict:
+    """素材根目录下PAGE文件夹里的 页面名 -> 模板路径"""
+    page_folder = os.path.join(asset_root, "PAGE")
+    if not os.path.isdir(page_folder):
+        return {}
+    return {os.path.splitext(filename)[0]: os.path.join(page_folder, filename) for filename in sorted(os.listdir(page_folder)) if filename.endswith(".png")}
+
+
+class PageClassifier:
+    """
+    用页面指纹一次性判断截图属于哪个页面
+
+    模板文件在生成指纹后被修改过的页面，以及没有指纹的页面，放在unknown_pages里，由调用者用模板匹配判断
+    """
+    def __init__(self, asset_root: str):
+        self.asset_root = asset_root
+        self.tolerance = 30
+        self.page_names = []
+        self.unknown_pages = []
+        self._xs = None
+        self._ys = None
+        self._colors = None
+        fingerprints = {}
+        fingerprint_file = os.path.join(asset_root, FINGERPRINT_FILE_NAME)
+        if os.path.exists(fingerprint_file):
+            try:
+                with open(fingerprint_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.tolerance = int(data.get("tolerance", self.tolerance))
+                fingerprints = data.get("pages", {})
+            except Exception as e:
+                logging.warn(istr({
+                    CN: f"页面指纹文件读取失败，将使用模板匹配判断页面: {fingerprint_file}, {e}",
+                    EN: f"Failed to read page fingerprint file, use template matching instead: {fingerprint_file}, {e}"
+                }))
+        xs, ys, colors = [], [], []
+        for page_name, template_path in _page_template_paths(asset_root).items():
+            fingerprint = fingerprints.get(page_name)
+            if fingerprint is None or fingerprint.get("md5") != _file_md5(template_path):
+                self.unknown_pages.append(page_name)
+                continue
+            self.page_names.append(page_name)
+            xs.append([p[0] for p in fingerprint["points"]])
+            ys.append([p[1] for p in fingerprint["points"]])
+            colors.append(fingerprint["colors"])
+        if self.page_names:
+            # 每个页面的指纹点数相同（生成时保证），可以组成 页面数*点数 的矩阵
+            self._xs = np.array(xs, dtype=np.intp)
+            self._ys = np.array(ys, dtype=np.intp)
+            self._colors = np.array(colors, dtype=np.int16)
+
+    def score(self, screenshot) -> list:
+        """
+        返回按得分从高到低排列的 [(页面名, 得分)]，得分是颜色在容差内的指纹像素比例
+        """
+        if not self.page_names or screenshot is None:
+            return []
+        h, w = screenshot.shape[:2]
+        xs = np.clip(self._xs, 0, w - 1)
+        ys = np.clip(self._ys, 0, h - 1)
+        pixels = screenshot[ys, xs].astype(np.int16)
+        diff = np.abs(pixels - self._colors).max(axis=2)
+        scores = (diff <= self.tolerance).mean(axis=1)
+        order = np.argsort(-scores, kind="stable")
+        return [(self.page_names[i], float(scores[i])) for i in order]
+
+
+_page_classifiers = {}
+"""素材根目录 -> (指纹文件修改时间, PageClassifier)"""
+
+def get_page_classifier(asset_root: str) -> PageClassifier:
+    """
+    得到素材根目录对应的页面分类器，指纹文件修改后重新加载
+    """
+    fingerprint_file = os.path.join(asset_root, FINGERPRINT_FILE_NAME)
+    mtime = os.stat(fingerprint_file).st_mtime if os.path.exists(fingerprint_file) else None
+    cached = _page_classifiers.get(asset_root)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, PageClassifier(asset_root))
+        _page_classifiers[asset_root] = cached
+    return cached[1]
+
+
+# ===============离线生成指纹===================
+
+def _pixel_diff(screenshots, indexes, ys, xs, colors):
+    """screenshots中下标为indexes的截图在(ys, xs)处像素与colors的最大通道差，形状为 截图数*点数"""
+    return np.stack([np.abs(screenshots[i][ys, xs].astype(np.int16) - colors).max(axis=1) for i in indexes])
+
+def compile_page_fingerprints(asset_root: str, screenshots: list, threshold = 0.9, points = 16, tolerance = 30, min_distance = 4):
+    """
+    在截图中匹配每个页面模板，确定模板在截图中的位置，再从模板里挑选points个最能与其他截图区分开的像素点作为指纹
+
+    返回 (写入指纹文件的dict, 每张截图上匹配到的页面名列表)
+    """
+    from modules.utils.image_processing import _match_template
+    page_paths = _page_template_paths(asset_root)
+    truths = [[] for _ in screenshots]
+    pages = {}
+    for page_name, template_path in page_paths.items():
+        template = template_store.get(template_path)
+        if template is None:
+            continue
+        hits = []
+        for i, screenshot_data in enumerate(screenshots):
+            matched = _match_template(screenshot_data, template)
+            if matched is not None and matched[1] >= threshold:
+                hits.append((i, matched[2], matched[1]))
+        if not hits:
+            logging.warn(f"{page_name}: not found in any screenshot, skip")
+            continue
+        # 页面模板是从该页面截图中截出来的，匹配值最高的位置就是模板在页面中的位置，其他位置的匹配来自相似的页面
+        anchor = max(hits, key=lambda hit: hit[2])[1]
+        positive = [i for i, loc, _ in hits if loc == anchor]
+        for i in positive:
+            truths[i].append(page_name)
+        negative = [i for i in range(len(screenshots)) if i not in positive]
+        # 候选点: 模板内每隔一个像素取一个点，去掉透明部分
+        dys, dxs = np.mgrid[0:template.h:2, 0:template.w:2]
+        dys, dxs = dys.ravel(), dxs.ravel()
+        if template.has_alpha:
+            opaque = template.mask[dys, dxs] > 0
+            dys, dxs = dys[opaque], dxs[opaque]
+        colors = template.bgr[dys, dxs].astype(np.int16)
+        ys, xs = dys + anchor[1], dxs + anchor[0]
+        # 在所有出现该页面的截图上颜色都稳定的点
+        stable = (_pixel_diff(screenshots, positive, ys, xs, colors) <= tolerance // 2).all(axis=0)
+        ys, xs, colors = ys[stable], xs[stable], colors[stable]
+        if len(ys) < points:
+            logging.warn(f"{page_name}: only {len(ys)} stable pixels, skip")
+            continue
+        if negative:
+            # 每个点能否把每张不是该页面的截图排除
+            reject = (_pixel_diff(screenshots, negative, ys, xs, colors) > tolerance).astype(np.float32)
+        else:
+            # 没有反例时选和模板平均颜色差别最大的点（文字笔画等）
+            reject = (np.abs(colors - colors.mean(axis=0)).max(axis=1) > tolerance).astype(np.float32)[None, :]
+        # 贪心选择: 优先排除还没有被足够多的点排除掉的截图，同时让点之间保持距离
+        chosen = []
+        reject_times = np.zeros(reject.shape[0], dtype=np.float32)
+        available = np.ones(len(ys), dtype=bool)
+        for _ in range(points):
+            gain = (reject / (1 + reject_times[:, None])).sum(axis=0)
+            gain[~available] = -1
+            best = int(np.argmax(gain))
+            if gain[best] < 0:
+                break
+            chosen.append(best)
+            reject_times += reject[:, best]
+            available &= (np.abs(ys - ys[best]) >= min_distance) | (np.abs(xs - xs[best]) >= min_distance)
+        if len(chosen) < points:
+            logging.warn(f"{page_name}: only {len(chosen)} separated pixels, skip")
+            continue
+        pages[page_name] = {
+            "md5": _file_md5(template_path),
+            "anchor": [int(anchor[0]), int(anchor[1])],
+            "points": [[int(xs[i]), int(ys[i])] for i in chosen],
+            "colors": [[int(c) for c in colors[i]] for i in chosen],
+        }
+    return {"tolerance": tolerance, "pages": pages}, truths
@@ -0,0 +1,46 @@
+import threading
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+
+__all__ = ["add_run_stat", "get_run_stat_total", "log_run_stats"]
+
+# 运行统计，按当前运行的任务名分组计数，保存在sessiondict["RUN_STATS"]里，运行结束时输出到日志
+# 不在任何任务中（如启动游戏）时的计数记在 NO_TASK_NAME 下
+# ========================================
+
+NO_TASK_NAME = "BAAH"
+
+_run_stats_lock = threading.Lock()
+"""批量匹配的工作线程也会计数"""
+
+def add_run_stat(key: str, value = 1, use_config = None):
+    """
+    给当前任务的key计数加value
+    """
+    target_config = config if not use_config else use_config
+    task_name = target_config.sessiondict["CURRENT_TASK_NAME"] or NO_TASK_NAME
+    with _run_stats_lock:
+        task_stats = target_config.sessiondict["RUN_STATS"].setdefault(task_name, {})
+        task_stats[key] = task_stats.get(key, 0) + value
+
+def get_run_stat_total(key: str, use_config = None):
+    """
+    所有任务中key的计数之和
+    """
+    target_config = config if not use_config else use_config
+    return sum(task_stats.get(key, 0) for task_stats in target_config.sessiondict["RUN_STATS"].values())
+
+def log_run_stats(use_config = None):
+    """
+    按任务输出运行统计
+    """
+    target_config = config if not use_config else use_config
+    run_stats = target_config.sessiondict["RUN_STATS"]
+    if not run_stats:
+        return
+    logging.info(istr({
+        CN: "运行统计:",
+        EN: "Run statistics:"
+    }))
+    for task_name, task_stats in run_stats.items():
+        logging.info(f"  {task_name}: " + ", ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}" for key, value in sorted(task_stats.items())))
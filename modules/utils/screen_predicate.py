@@ -0,0 +1,191 @@
+import time
+from modules.utils.image_processing import OCR_LANG
+from modules.utils.frame_memo import frame_memo
+
+__all__ = ["get_primitive_latencies", "Predicate", "PixelCheck", "MatchCheck", "PageCheck", "OcrCheck", "And", "Or", "Not"]
+
+# 声明式的截图判断条件: 像素(PixelCheck)，页面(PageCheck)，模板(MatchCheck)，文字(OcrCheck) 四种基本判断，用 & | ~ 组合成 与/或/非
+# 求值时 与/或 按估计耗时从小到大依次判断子条件并短路，例如先比较像素，像素不满足就不必再做模板匹配或文字识别
+# 每个基本判断的耗时在运行中实测，用指数移动平均估计下一次的耗时
+# 基本判断通过 match_pixel/match_page/match/ocr_area 计算，和其他代码共用当前帧的缓存，当前帧上已经算过的判断耗时视为0
+# ========================================
+
+DEFAULT_LATENCY = {
+    "pixel": 0.00001,
+    "page": 0.001,
+    "match": 0.01,
+    "ocr": 0.05,
+}
+"""还没有实测过的基本判断的预估耗时（秒）"""
+
+LATENCY_SMOOTHING = 0.2
+"""耗时的指数移动平均中，新测量值所占的比例"""
+
+_latencies = {}
+"""(基本判断种类, 参数) -> 实测的平均耗时"""
+
+def get_primitive_latencies() -> dict:
+    """所有基本判断的实测平均耗时（秒）"""
+    return dict(_latencies)
+
+
+class Predicate:
+    """
+    截图判断条件，evaluate()对当前截图求值
+
+    可以用 a & b，a | b，~a 组合
+    """
+    def evaluate(self) -> bool:
+        raise NotImplementedError
+
+    def cost(self) -> float:
+        """估计的求值耗时（秒）"""
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class _Primitive(Predicate):
+    """基本判断，求值时记录耗时"""
+    kind = None
+    """与frame_memo中的分析种类一致"""
+
+    def _key(self) -> tuple:
+        """与frame_memo中的缓存键一致"""
+        raise NotImplementedError
+
+    def _check(self) -> bool:
+        raise NotImplementedError
+
+    def evaluate(self) -> bool:
+        if frame_memo.is_cached(self.kind, self._key()):
+            return bool(self._check())
+        start = time.perf_counter()
+        result = bool(self._check())
+        cost = time.perf_counter() - start
+        latency_key = (self.kind, self._key())
+        last = _latencies.get(latency_key)
+        _latencies[latency_key] = cost if last is None else last + LATENCY_SMOOTHING * (cost - last)
+        return result
+
+    def cost(self) -> float:
+        if frame_memo.is_cached(self.kind, self._key()):
+            return 0
+        return _latencies.get((self.kind, self._key()), DEFAULT_LATENCY[self.kind])
+
+
+class PixelCheck(_Primitive):
+    """xy处的像素颜色是否在color范围内（Page.COLOR_*）"""
+    kind = "pixel"
+
+    def __init__(self, xy, color):
+        self.xy = tuple(xy)
+        self.color = tuple(map(tuple, color))
+
+    def _key(self):
+        return (self.xy, self.color)
+
+    def _check(self) -> bool:
+        from modules.utils import match_pixel
+        return match_pixel(self.xy, self.color)
+
+
+class MatchCheck(_Primitive):
+    """当前截图是否匹配到模板图片"""
+    kind = "match"
+
+    def __init__(self, imgurl: str, threshold = 0.9, rotate_trans = False):
+        self.imgurl = imgurl
+        self.threshold = threshold
+        self.rotate_trans = rotate_trans
+
+    def _key(self):
+        return (self.imgurl, self.threshold, self.rotate_trans)
+
+    def _check(self) -> bool:
+        from modules.utils import match
+        return match(self.imgurl, threshold=self.threshold, rotate_trans=self.rotate_trans)
+
+
+class PageCheck(_Primitive):
+    """当前截图是否是指定页面，先看页面指纹，不确定时再做模板匹配"""
+    kind = "page"
+
+    def __init__(self, pagename: str, threshold = 0.9):
+        self.pagename = pagename
+        self.threshold = threshold
+
+    def _key(self):
+        return (self.pagename, self.threshold)
+
+    def _check(self) -> bool:
+        from modules.utils import match_page
+        return match_page(self.pagename, threshold=self.threshold)
+
+
+class OcrCheck(_Primitive):
+    """
+    区域内识别出的文字是否满足text_test
+
+    text_test: 字符串（识别结果包含该字符串）或 接收识别结果返回bool的函数
+    """
+    kind = "ocr"
+
+    def __init__(self, frompixel, topixel, text_test, ocr_lang = OCR_LANG.EN):
+        self.frompixel = (min(frompixel[0], topixel[0]), min(frompixel[1], topixel[1]))
+        self.topixel = (max(frompixel[0], topixel[0]), max(frompixel[1], topixel[1]))
+        self.text_test = text_test
+        self.ocr_lang = ocr_lang
+
+    def _key(self):
+        return (self.frompixel, self.topixel, False, self.ocr_lang)
+
+    def _check(self) -> bool:
+        from modules.utils import ocr_area
+        text = ocr_area(self.frompixel, self.topixel, ocr_lang=self.ocr_lang)[0]
+        if isinstance(self.text_test, str):
+            return self.text_test in text
+        return self.text_test(text)
+
+
+class And(Predicate):
+    """所有子条件都成立，按估计耗时从小到大判断，遇到不成立的立即返回"""
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def evaluate(self) -> bool:
+        return all(predicate.evaluate() for predicate in sorted(self.predicates, key=lambda predicate: predicate.cost()))
+
+    def cost(self) -> float:
+        return sum(predicate.cost() for predicate in self.predicates)
+
+
+class Or(Predicate):
+    """任一子条件成立，按估计耗时从小到大判断，遇到成立的立即返回"""
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def evaluate(self) -> bool:
+        return any(predicate.evaluate() for predicate in sorted(self.predicates, key=lambda predicate: predicate.cost()))
+
+    def cost(self) -> float:
+        return sum(predicate.cost() for predicate in self.predicates)
+
+
+class Not(Predicate):
+    """子条件不成立"""
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def evaluate(self) -> bool:
+        return not self.predicate.evaluate()
+
+    def cost(self) -> float:
+        return self.predicate.cost()
@@ -0,0 +1,126 @@
+import time
+import cv2
+import numpy as np
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.run_stats import add_run_stat, get_run_stat_total
+from modules.utils.adb_utils import capture_screen_data
+from modules.utils.input_journal import input_journal
+from modules.utils.capture_engine import get_capture_engine, use_continuous_capture
+
+__all__ = ["settle_thumbnail", "thumbnails_differ", "settle_reference", "wait_screen_settle", "log_settle_stats"]
+
+# 点击/滑动后不再固定等待，而是不断截图，画面相对操作前的画面发生变化、并且连续stable_time秒不再变化时提前结束等待
+# 原来的固定等待时间作为最长等待时间，画面一直没有变化（例如点击空白处）时与原来一样等满
+# 操作前的画面取当前截图与上次等待时看到的最后一帧中较新的一个，连续操作之间没有截图时当前截图已经过时
+# 比较在缩小的灰度图上进行，忽略细小的噪点
+# ========================================
+
+SETTLE_FRAME_SIZE = (160, 90)
+"""比较前截图缩放到的 (宽, 高)"""
+
+SETTLE_PIXEL_DIFF = 16
+"""灰度差超过这个值的像素视为变化了"""
+
+SETTLE_CHANGED_RATIO = 0.002
+"""变化像素的比例超过这个值视为画面变化了"""
+
+def settle_thumbnail(frame) -> np.ndarray:
+    """缩小的灰度图"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, SETTLE_FRAME_SIZE, interpolation=cv2.INTER_AREA)
+
+def thumbnails_differ(thumb_a, thumb_b) -> bool:
+    changed = np.count_nonzero(cv2.absdiff(thumb_a, thumb_b) > SETTLE_PIXEL_DIFF)
+    return changed > thumb_a.size * SETTLE_CHANGED_RATIO
+
+def _next_frame(after_time, timeout, use_config=None):
+    """开启持续截图时取after_time之后的新帧，否则直接截一张"""
+    if use_continuous_capture(use_config):
+        return get_capture_engine(use_config).wait_frame_after(after_time, timeout=timeout)
+    return capture_screen_data(use_config)
+
+def settle_reference(screenshot, screenshot_time: float, use_config=None):
+    """
+    刚发送的输入操作之前画面的缩略图，screenshot为screenshot_time时截取的当前截图
+
+    上次等待画面稳定时看到的最后一帧比当前截图新时用它。
+    选中的画面之后除了刚发送的操作还有别的输入操作时，无法得知操作前的画面，返回None
+    """
+    target_config = config if not use_config else use_config
+    last_seen = target_config.sessiondict["SETTLE_LAST_THUMBNAIL"]
+    if last_seen is not None and last_seen[0] > screenshot_time:
+        reference_time, reference = last_seen
+    elif screenshot is not None:
+        reference_time, reference = screenshot_time, settle_thumbnail(screenshot)
+    else:
+        return None
+    if len(input_journal.entries(since=reference_time)) > 1:
+        return None
+    return reference
+
+def wait_screen_settle(reference, max_wait: float, stable_time: float, use_config=None) -> float:
+    """
+    等待画面相对reference（操作前画面的缩略图，见settle_reference）变化并稳定，至多等待max_wait秒，返回实际等待的秒数
+
+    reference为None时等满max_wait。看到的最后一帧的缩略图记入SETTLE_LAST_THUMBNAIL，作为下次操作前的画面
+
+    等待的次数，省下的时间，等满max_wait的次数记入运行统计
+    """
+    start = time.time()
+    deadline = start + max_wait
+    if reference is None:
+        time.sleep(max_wait)
+        return max_wait
+    target_config = config if not use_config else use_config
+    before = reference
+    last = None
+    stable_since = None
+    waited = None
+    while True:
+        frame_time = time.time()
+        if frame_time >= deadline:
+            break
+        frame = _next_frame(frame_time, deadline - frame_time, use_config)
+        if frame is None:
+            break
+        thumb = settle_thumbnail(frame)
+        target_config.sessiondict["SETTLE_LAST_THUMBNAIL"] = (frame_time, thumb)
+        if last is None:
+            # 还在等画面变化
+            if thumbnails_differ(before, thumb):
+                last, stable_since = thumb, frame_time
+            continue
+        if thumbnails_differ(last, thumb):
+            last, stable_since = thumb, frame_time
+        elif time.time() - stable_since >= stable_time:
+            waited = time.time() - start
+            break
+    if waited is None:
+        remaining = deadline - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        waited = max_wait
+        add_run_stat("settle_timeout", use_config=use_config)
+    add_run_stat("settle_wait", use_config=use_config)
+    add_run_stat("settle_saved_time", max(max_wait - waited, 0), use_config=use_config)
+    return waited
+
+def log_settle_stats(use_config = None):
+    """
+    按任务输出这次运行中等待画面稳定省下的时间
+    """
+    target_config = config if not use_config else use_config
+    if get_run_stat_total("settle_wait", target_config) == 0:
+        return
+    logging.info(istr({
+        CN: f"等待画面稳定: 共省下{get_run_stat_total('settle_saved_time', target_config):.1f}秒",
+        EN: f"Wait for screen settle: {get_run_stat_total('settle_saved_time', target_config):.1f}s saved in total"
+    }))
+    for task_name, task_stats in target_config.sessiondict["RUN_STATS"].items():
+        if task_stats.get("settle_wait", 0) == 0:
+            continue
+        logging.info(istr({
+            CN: f"  {task_name}: 等待{task_stats['settle_wait']}次，省下{task_stats.get('settle_saved_time', 0):.1f}秒，等满{task_stats.get('settle_timeout', 0)}次",
+            EN: f"  {task_name}: {task_stats['settle_wait']} waits, {task_stats.get('settle_saved_time', 0):.1f}s saved, {task_stats.get('settle_timeout', 0)} timed out"
+        }))
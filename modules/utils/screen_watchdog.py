@@ -0,0 +1,89 @@
+import time
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.run_stats import add_run_stat, get_run_stat_total
+from modules.utils.screen_predicate import Predicate
+
+__all__ = ["WatchdogDetector", "ScreenWatchdog", "screen_watchdog", "log_watchdog_stats"]
+
+# 每次截图后运行的全局检查（卡顿弹窗、网络重连弹窗等）
+# 每个检查项声明一个只比较像素的前置条件和采样间隔，前置条件成立时才做模板匹配/文字识别确认，
+# 这样大多数截图上只需要比较几个像素
+# ========================================
+
+class WatchdogDetector:
+    """
+    全局检查项
+
+    name: 检查项名，用于运行统计
+    precondition: 只比较像素的前置条件，不成立时跳过确认
+    confirm: 前置条件成立时调用，返回是否确实检测到
+    on_detect: 检测到时调用，可以点击或抛出异常
+    interval: 两次确认之间至少间隔的秒数，0表示每次前置条件成立都确认；前置条件每张截图都检查，不受间隔限制
+    """
+    def __init__(self, name: str, precondition: Predicate, confirm, on_detect, interval = 0):
+        self.name = name
+        self.precondition = precondition
+        self.confirm = confirm
+        self.on_detect = on_detect
+        self.interval = interval
+        self.last_check_time = None
+        """上一次运行confirm的时间"""
+
+
+class ScreenWatchdog:
+    """
+    按注册顺序运行所有检查项
+    """
+    def __init__(self):
+        self.detectors = []
+
+    def register(self, detector: WatchdogDetector):
+        """
+        注册检查项，同名的检查项会被替换
+        """
+        self.unregister(detector.name)
+        self.detectors.append(detector)
+
+    def unregister(self, name: str):
+        self.detectors = [detector for detector in self.detectors if detector.name != name]
+
+    def check(self):
+        """
+        对当前截图运行检查项，耗时计入运行统计的watchdog_time
+        """
+        start = time.perf_counter()
+        try:
+            for detector in self.detectors:
+                # 前置条件只比较像素，每张截图都检查，间隔只限制确认的频率
+                if not detector.precondition.evaluate():
+                    continue
+                now = time.time()
+                if detector.last_check_time is not None and now - detector.last_check_time < detector.interval:
+                    continue
+                detector.last_check_time = now
+                add_run_stat(f"watchdog_{detector.name}_confirm")
+                if detector.confirm():
+                    add_run_stat(f"watchdog_{detector.name}_detect")
+                    detector.on_detect()
+        finally:
+            add_run_stat("watchdog_frames")
+            add_run_stat("watchdog_time", time.perf_counter() - start)
+
+
+screen_watchdog = ScreenWatchdog()
+"""
+进程内共用的全局检查
+"""
+
+def log_watchdog_stats(use_config = None):
+    """
+    输出这次运行中全局检查的平均耗时
+    """
+    frames = get_run_stat_total("watchdog_frames", use_config)
+    if frames == 0:
+        return
+    cost = get_run_stat_total("watchdog_time", use_config)
+    logging.info(istr({
+        CN: f"全局截图检查: 检查{frames}张截图，共耗时{cost:.2f}秒，平均每张{cost / frames * 1000:.3f}毫秒",
+        EN: f"Global screenshot check: {frames} screenshots checked in {cost:.2f}s, {cost / frames * 1000:.3f}ms per screenshot"
+    }))
@@ -0,0 +1,72 @@
+import os
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.run_stats import get_run_stat_total
+
+__all__ = ["get_learned_location", "get_learned_window", "learn_location", "save_learned_locations", "log_location_stats"]
+
+# 模板上一次匹配到的位置，保存在userstoragedict["TEMPLATE_LOCATION_DICT"]里
+# userstorage本身按配置文件区分，键是包含素材文件夹的模板路径，因此不同服务器的素材互不影响
+# ========================================
+
+LOCATION_WINDOW_MARGIN = 16
+"""在上次匹配位置四周扩展的像素数"""
+
+_location_changed = False
+
+def _location_key(path: str) -> str:
+    return os.path.splitext(os.path.normpath(path))[0].replace("\\", "/")
+
+def get_learned_location(path: str, use_config = None):
+    """
+    得到模板上次匹配到的左上角坐标(x, y)，没有记录时返回None
+    """
+    target_config = config if not use_config else use_config
+    location = target_config.userstoragedict["TEMPLATE_LOCATION_DICT"].get(_location_key(path))
+    return tuple(location) if location else None
+
+def get_learned_window(path: str, template_w: int, template_h: int, use_config = None):
+    """
+    得到模板上次匹配位置附近的搜索窗口(x1, y1, x2, y2)，没有记录时返回None
+    """
+    location = get_learned_location(path, use_config)
+    if location is None:
+        return None
+    x, y = location
+    return (max(x - LOCATION_WINDOW_MARGIN, 0), max(y - LOCATION_WINDOW_MARGIN, 0),
+            x + template_w + LOCATION_WINDOW_MARGIN, y + template_h + LOCATION_WINDOW_MARGIN)
+
+def learn_location(path: str, location, use_config = None):
+    """
+    记录模板这次匹配到的左上角坐标
+    """
+    global _location_changed
+    target_config = config if not use_config else use_config
+    key = _location_key(path)
+    location = [int(location[0]), int(location[1])]
+    if target_config.userstoragedict["TEMPLATE_LOCATION_DICT"].get(key) != location:
+        target_config.userstoragedict["TEMPLATE_LOCATION_DICT"][key] = location
+        _location_changed = True
+
+def save_learned_locations(use_config = None):
+    """
+    有新的位置记录时写入userstorage文件，下次运行时直接使用
+    """
+    global _location_changed
+    target_config = config if not use_config else use_config
+    if _location_changed:
+        target_config.save_user_storage_dict()
+        _location_changed = False
+
+def log_location_stats(use_config = None):
+    """
+    输出这次运行中位置缓存的命中情况
+    """
+    hits = get_run_stat_total("match_location_hit", use_config)
+    misses = get_run_stat_total("match_location_miss", use_config)
+    full_frame = get_run_stat_total("match_full_frame", use_config)
+    miss_rate = misses / (hits + misses) * 100 if hits + misses > 0 else 0
+    logging.info(istr({
+        CN: f"模板匹配: 位置缓存命中{hits}次，未命中{misses}次（未命中率{miss_rate:.1f}%），搜索整张截图{full_frame}次",
+        EN: f"Template matching: learned location hit {hits} times, missed {misses} times (miss rate {miss_rate:.1f}%), full-frame search {full_frame} times"
+    }))
@@ -0,0 +1,189 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from modules.utils.log_utils import logging, istr, CN, EN
+
+__all__ = ["Template", "TemplateStore", "template_store"]
+
+class Template:
+    """
+    解码后的模板图片，包含去除透明通道后的BGR图，透明通道生成的二值mask，以及宽高
+
+    所有数组都是只读的，被多处共享使用，需要修改时先copy
+    """
+    def __init__(self, image, path = None, mtime = None):
+        self.path = path
+        self.mtime = mtime
+        self.image = image
+        """原始读取的图片，可能包含透明通道"""
+        self.h, self.w = image.shape[:2]
+        self.has_alpha = len(image.shape) == 3 and image.shape[2] == 4
+        if self.has_alpha:
+            # 以透明部分作为mask
+            self.mask = np.where(image[:, :, 3] > 0, 255, 0).astype(np.uint8)
+            self.bgr = np.ascontiguousarray(image[:, :, :3])
+        else:
+            self.mask = None
+            self.bgr = image if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        for arr in (self.image, self.bgr, self.mask):
+            if arr is not None:
+                arr.setflags(write=False)
+        self.rotations = None
+        """旋转匹配用的 [(角度, BGR图, mask)]，第一次旋转匹配时生成"""
+        self.pyramid = {}
+        """金字塔匹配用的 {缩小倍数: (BGR图, mask)}，第一次使用时生成"""
+
+    @staticmethod
+    def from_image(image):
+        """由内存中的图片构造模板（不缓存）"""
+        return Template(np.array(image, copy=True))
+
+
+REGION_FILE_NAME = "regions.json"
+"""
+每套素材（DATA/assets*）根目录下的模板搜索区域文件，格式:
+
+{"margin": 20, "regions": {"BUTTON/BUTTON_HOME_ICON": [x1, y1, x2, y2], ...}, "pyramid": {"PAGE/PAGE_HOME": 2, ...}}
+
+regions里是模板在截图中出现过的范围，匹配时在四周扩展margin像素后只在这块区域里搜索，没有声明的模板搜索整张截图
+
+pyramid里是经过截图验证的金字塔匹配缩小倍数（1表示不使用），没有声明的模板不使用金字塔匹配
+"""
+
+DEFAULT_REGION_MARGIN = 20
+
+
+class TemplateStore:
+    """
+    进程内的模板缓存，以路径和文件修改时间为键，避免每次匹配都读取解码图片、重新生成mask
+
+    超过容量时淘汰最久未使用的模板
+    """
+    def __init__(self, max_size = 256):
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # 素材根目录 -> (regions文件修改时间, margin, regions)
+        self._region_files = {}
+
+    def get(self, path: str, record = True) -> Template:
+        """
+        得到path对应的模板，文件不存在或无法读取时返回None
+
+        record为False时不计入命中统计
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            template = self._templates.get(path)
+            if template is not None and template.mtime == mtime:
+                self._templates.move_to_end(path)
+                if record:
+                    self.hits += 1
+                return template
+        # 未命中或文件已修改，重新读取
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)  # 读取包含透明通道的模板图像
+        if image is None:
+            return None
+        template = Template(image, path, mtime)
+        with self._lock:
+            if record:
+                self.misses += 1
+            self._templates[path] = template
+            self._templates.move_to_end(path)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def warm_up(self, folder: str) -> int:
+        """
+        预先加载folder下（包含子文件夹）的所有png模板，返回加载的数量
+        """
+        count = 0
+        if not os.path.isdir(folder):
+            return count
+        for root, dirs, files in os.walk(folder):
+            for filename in files:
+                if filename.endswith(".png") and self.get(os.path.join(root, filename), record=False) is not None:
+                    count += 1
+        logging.info(istr({
+            CN: f"预加载模板图片 {count} 张: {folder}",
+            EN: f"Preloaded {count} template pictures: {folder}"
+        }))
+        return count
+
+    def _load_regions(self, asset_root: str):
+        """读取素材根目录下的搜索区域文件，返回(margin, regions, pyramid)，文件修改后重新读取"""
+        region_file = os.path.join(asset_root, REGION_FILE_NAME)
+        try:
+            mtime = os.stat(region_file).st_mtime
+        except OSError:
+            return DEFAULT_REGION_MARGIN, {}, {}
+        cached = self._region_files.get(asset_root)
+        if cached is not None and cached[0] == mtime:
+            return cached[1:]
+        try:
+            with open(region_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            margin = int(data.get("margin", DEFAULT_REGION_MARGIN))
+            regions = {key: tuple(int(v) for v in value) for key, value in data.get("regions", {}).items()}
+            pyramid = {key: int(value) for key, value in data.get("pyramid", {}).items()}
+        except Exception as e:
+            logging.warn(istr({
+                CN: f"模板搜索区域文件读取失败，将搜索整张截图: {region_file}, {e}",
+                EN: f"Failed to read template region file, search the whole screenshot instead: {region_file}, {e}"
+            }))
+            margin, regions, pyramid = DEFAULT_REGION_MARGIN, {}, {}
+        self._region_files[asset_root] = (mtime, margin, regions, pyramid)
+        return margin, regions, pyramid
+
+    @staticmethod
+    def _split_template_path(path: str):
+        """<素材根目录>/BUTTON/BUTTON_HOME_ICON.png -> (素材根目录, "BUTTON/BUTTON_HOME_ICON")"""
+        path = os.path.normpath(path)
+        category_folder, filename = os.path.split(path)
+        asset_root, category = os.path.split(category_folder)
+        return asset_root, f"{category}/{os.path.splitext(filename)[0]}"
+
+    def get_region(self, path: str):
+        """
+        得到模板path的搜索区域(x1, y1, x2, y2)，已经扩展了margin，没有声明时返回None
+
+        path应形如 <素材根目录>/BUTTON/BUTTON_HOME_ICON.png
+        """
+        asset_root, key = self._split_template_path(path)
+        margin, regions, _ = self._load_regions(asset_root)
+        region = regions.get(key)
+        if region is None:
+            return None
+        x1, y1, x2, y2 = region
+        return (max(x1 - margin, 0), max(y1 - margin, 0), x2 + margin, y2 + margin)
+
+    def get_pyramid_scale(self, path: str):
+        """
+        得到模板path声明的金字塔匹配缩小倍数（1表示不使用金字塔匹配），没有声明时返回None
+        """
+        asset_root, key = self._split_template_path(path)
+        return self._load_regions(asset_root)[2].get(key)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._region_files.clear()
+
+    def get_stats(self) -> dict:
+        """命中/未命中次数与当前缓存的模板数量"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._templates)}
+
+
+template_store = TemplateStore()
+"""
+进程内共用的模板缓存
+"""
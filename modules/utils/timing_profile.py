@@ -0,0 +1,239 @@
+import time
+import cv2
+import numpy as np
+from modules.configs.MyConfig import config
+from modules.utils.log_utils import logging, istr, CN, EN
+from modules.utils.adb_utils import capture_screen_data, click_on_screen, swipe_on_screen, getNewestSeialNumber
+from modules.utils.screen_settle import thumbnails_differ
+
+__all__ = ["get_timing_profile", "timing_scale", "scaled_wait", "get_respond_y", "record_latency", "timing_calibration_needed", "scroll_calibration_needed", "measure_screencap_latency", "measure_tap_latency", "measure_scroll_response", "calibrate_timing", "calibrate_scroll_response"]
+
+# 设备时序档案: 在当前设备上实测 点击到画面变化的耗时、截图耗时、滑动触发距离，保存在userstorage的TIMING_PROFILE里
+# 开启TIMING_PROFILE_SCALE后，点击/滑动后的等待时间按 实测点击耗时 / REFERENCE_TAP_LATENCY 缩放，
+# 滑动触发距离使用实测值代替RESPOND_Y
+# 运行中持续统计截图耗时，与档案相差过大时在下一个任务开始前重新测量
+# ========================================
+
+REFERENCE_TAP_LATENCY = 0.3
+"""各处手调的等待时间所针对的慢速模拟器上，点击到画面变化的耗时（秒）"""
+
+TIMING_SCALE_RANGE = (0.4, 1.5)
+"""等待时间缩放倍数的范围"""
+
+CALIBRATION_TAP_POINT = (300, 2)
+"""测量点击耗时时点击的位置，与Page.MAGICPOINT相同，不会触发任何操作，但游戏会在点击处显示触摸特效"""
+
+CALIBRATION_TAP_RADIUS = 40
+"""判断点击处画面变化的区域半径"""
+
+CALIBRATION_SAMPLES = 5
+"""每项测量的次数，取中位数"""
+
+CALIBRATION_TAP_TIMEOUT = 3
+"""点击后等待画面变化的最长秒数"""
+
+DRIFT_RATIO = 1.5
+"""运行中实测的耗时与档案相差超过这个倍数时重新测量"""
+
+DRIFT_MIN_SAMPLES = 20
+"""至少统计这么多次后才判断是否偏离档案"""
+
+DRIFT_SMOOTHING = 0.1
+"""运行中耗时的指数移动平均中，新测量值所占的比例"""
+
+CALIBRATION_RETRY_INTERVAL = 600
+"""两次测量之间至少间隔的秒数，避免测量失败或耗时波动时反复测量"""
+
+_observed = {}
+"""测量项 -> [这次运行中的平均耗时, 次数]"""
+
+_drift_detected = False
+
+_last_calibration_attempt = None
+
+def get_timing_profile(use_config=None) -> dict:
+    target_config = config if not use_config else use_config
+    return target_config.userstoragedict.get("TIMING_PROFILE", {})
+
+def timing_scale(use_config=None) -> float:
+    """点击/滑动后等待时间的缩放倍数，未开启或还没有测量时为1"""
+    target_config = config if not use_config else use_config
+    if not target_config.userconfigdict.get("TIMING_PROFILE_SCALE", False):
+        return 1
+    tap_latency = get_timing_profile(target_config).get("tap_latency")
+    if not tap_latency:
+        return 1
+    return min(max(tap_latency / REFERENCE_TAP_LATENCY, TIMING_SCALE_RANGE[0]), TIMING_SCALE_RANGE[1])
+
+def scaled_wait(seconds: float, use_config=None) -> float:
+    return seconds * timing_scale(use_config)
+
+def get_respond_y(use_config=None, default=40):
+    """滑动触发距离，开启时序档案且测量过时使用实测值，否则使用RESPOND_Y"""
+    target_config = config if not use_config else use_config
+    if target_config.userconfigdict.get("TIMING_PROFILE_SCALE", False):
+        scroll_response = get_timing_profile(target_config).get("scroll_response")
+        if scroll_response is not None:
+            return scroll_response
+    return target_config.userconfigdict["RESPOND_Y"] or default
+
+# ===============运行中的统计===================
+
+def record_latency(kind: str, cost: float, use_config=None):
+    """
+    记录运行中测得的一次耗时（kind为档案中的测量项，如screencap_latency），偏离档案过多时标记需要重新测量
+    """
+    global _drift_detected
+    target_config = config if not use_config else use_config
+    observed = _observed.setdefault(kind, [cost, 0])
+    observed[0] += DRIFT_SMOOTHING * (cost - observed[0])
+    observed[1] += 1
+    expected = get_timing_profile(target_config).get(kind)
+    if _drift_detected or not expected or observed[1] < DRIFT_MIN_SAMPLES:
+        return
+    if not 1 / DRIFT_RATIO <= observed[0] / expected <= DRIFT_RATIO:
+        _drift_detected = True
+        logging.info(istr({
+            CN: f"{kind}从{expected * 1000:.0f}毫秒变为{observed[0] * 1000:.0f}毫秒，将重新测量设备时序",
+            EN: f"{kind} drifted from {expected * 1000:.0f}ms to {observed[0] * 1000:.0f}ms, the device timing will be re-calibrated"
+        }))
+
+def timing_calibration_needed(use_config=None) -> bool:
+    """开启了时序档案，并且 还没有测量过/设备变了/运行中的耗时偏离了档案，距上次测量不到CALIBRATION_RETRY_INTERVAL秒时不再测量"""
+    target_config = config if not use_config else use_config
+    if not target_config.userconfigdict.get("TIMING_PROFILE_SCALE", False):
+        return False
+    if _last_calibration_attempt is not None and time.time() - _last_calibration_attempt < CALIBRATION_RETRY_INTERVAL:
+        return False
+    profile = get_timing_profile(target_config)
+    return _drift_detected or not profile.get("tap_latency") or profile.get("device") != getNewestSeialNumber(target_config)
+
+def scroll_calibration_needed(use_config=None) -> bool:
+    target_config = config if not use_config else use_config
+    return target_config.userconfigdict.get("TIMING_PROFILE_SCALE", False) and get_timing_profile(target_config).get("scroll_response") is None
+
+# ===============测量===================
+
+def _gray(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+def _tap_region(frame, xy):
+    x, y = xy
+    return _gray(frame)[max(y - CALIBRATION_TAP_RADIUS, 0):y + CALIBRATION_TAP_RADIUS, max(x - CALIBRATION_TAP_RADIUS, 0):x + CALIBRATION_TAP_RADIUS]
+
+def measure_screencap_latency(samples = CALIBRATION_SAMPLES, use_config=None):
+    """截图耗时的中位数（秒），截图失败时返回None"""
+    costs = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        if capture_screen_data(use_config) is None:
+            return None
+        costs.append(time.perf_counter() - start)
+    return float(np.median(costs))
+
+def measure_tap_latency(xy = CALIBRATION_TAP_POINT, samples = CALIBRATION_SAMPLES):
+    """
+    点击xy后到点击处画面出现变化的耗时中位数（秒），以截到变化的那次截图的中间时刻计
+
+    点击前该区域本身在变化，或点击后一直没有变化时返回None
+    """
+    latencies = []
+    for _ in range(samples):
+        before = capture_screen_data()
+        if before is None:
+            return None
+        # 点击前区域应当是静止的
+        if thumbnails_differ(_tap_region(before, xy), _tap_region(capture_screen_data(), xy)):
+            return None
+        before_region = _tap_region(before, xy)
+        tap_time = time.time()
+        click_on_screen(*xy)
+        latency = None
+        while time.time() - tap_time < CALIBRATION_TAP_TIMEOUT:
+            frame_start = time.time()
+            frame = capture_screen_data()
+            if frame is None:
+                return None
+            if thumbnails_differ(before_region, _tap_region(frame, xy)):
+                latency = (frame_start + time.time()) / 2 - tap_time
+                break
+        if latency is None:
+            return None
+        latencies.append(latency)
+        # 等触摸特效消失
+        time.sleep(1)
+    return float(np.median(latencies))
+
+def measure_scroll_response(x, y, distance, region):
+    """
+    在(x, y)处慢慢向上滑动distance像素，用相位相关比较region（(x1, y1, x2, y2)）内容实际移动的距离，
+    两者之差即滑动触发距离，测量后滑回原处，无法测量时返回None
+    """
+    x1, y1, x2, y2 = region
+    before = capture_screen_data()
+    if before is None:
+        return None
+    # 慢速滑动，避免松手后的惯性滚动
+    swipe_on_screen(x, y, x, y - distance, 1000)
+    time.sleep(1)
+    after = capture_screen_data()
+    swipe_on_screen(x, y - distance, x, y, 1000)
+    time.sleep(1)
+    if after is None:
+        return None
+    (_, dy), response = cv2.phaseCorrelate(np.float32(_gray(before)[y1:y2, x1:x2]), np.float32(_gray(after)[y1:y2, x1:x2]))
+    moved = abs(dy)
+    if response < 0.3 or moved < distance * 0.1 or moved > distance:
+        # 列表太短滑不动，或者内容不是整体平移
+        return None
+    return int(round(distance - moved))
+
+def calibrate_timing(use_config=None):
+    """
+    测量截图和点击耗时并写入时序档案，应当在游戏中一个静止的页面上调用
+    """
+    global _drift_detected, _last_calibration_attempt
+    target_config = config if not use_config else use_config
+    _last_calibration_attempt = time.time()
+    screencap_latency = measure_screencap_latency(use_config=target_config)
+    tap_latency = measure_tap_latency()
+    if screencap_latency is None or tap_latency is None:
+        logging.warn(istr({
+            CN: "设备时序测量失败，下次再试",
+            EN: "Failed to calibrate the device timing, will try again later"
+        }))
+        return False
+    profile = dict(get_timing_profile(target_config))
+    profile.update({
+        "device": getNewestSeialNumber(target_config),
+        "screencap_latency": screencap_latency,
+        "tap_latency": tap_latency,
+        "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    target_config.userstoragedict["TIMING_PROFILE"] = profile
+    target_config.save_user_storage_dict()
+    _observed.clear()
+    _drift_detected = False
+    logging.info(istr({
+        CN: f"设备时序: 截图{screencap_latency * 1000:.0f}毫秒，点击到画面变化{tap_latency * 1000:.0f}毫秒，等待时间缩放为{timing_scale(target_config):.2f}倍",
+        EN: f"Device timing: screencap {screencap_latency * 1000:.0f}ms, tap to visible change {tap_latency * 1000:.0f}ms, waits scaled by {timing_scale(target_config):.2f}"
+    }))
+    return True
+
+def calibrate_scroll_response(x, y, distance, region, use_config=None):
+    """测量滑动触发距离并写入时序档案"""
+    target_config = config if not use_config else use_config
+    scroll_response = measure_scroll_response(x, y, distance, region)
+    if scroll_response is None:
+        logging.warn(istr({
+            CN: "滑动触发距离测量失败",
+            EN: "Failed to measure the swipe response distance"
+        }))
+        return None
+    target_config.userstoragedict["TIMING_PROFILE"] = {**get_timing_profile(target_config), "scroll_response": scroll_response}
+    target_config.save_user_storage_dict()
+    logging.info(istr({
+        CN: f"滑动触发距离: {scroll_response}",
+        EN: f"Swipe response distance: {scroll_response}"
+    }))
+    return scroll_response
@@ -0,0 +1,148 @@
+import socket
+import struct
+import threading
+import pytest
+from modules.utils.adb_client import AdbClient, AdbClientError, AdbCommandSentError
+
+
+def _read_request(conn) -> bytes:
+    length = int(AdbClient._recv_exactly(conn, 4), 16)
+    return AdbClient._recv_exactly(conn, length)
+
+
+class FakeAdbServer:
+    """
+    本机上的假adb server，每条连接交给handler(conn)处理，收到的请求记录在requests中
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self._listener = socket.socket()
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen()
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def read_request(self, conn) -> bytes:
+        request = _read_request(conn)
+        self.requests.append(request)
+        return request
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    self.handler(self, conn)
+                except (OSError, AdbClientError):
+                    pass
+
+    def close(self):
+        self._listener.close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+    def start(handler):
+        server = FakeAdbServer(handler)
+        servers.append(server)
+        return server, AdbClient(port=server.port, timeout=2)
+    yield start
+    for server in servers:
+        server.close()
+
+
+def _okay_service(output: bytes):
+    """切换到设备并启动服务都成功，输出output后关闭连接"""
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        server.read_request(conn)
+        conn.sendall(b"OKAY" + output)
+    return handler
+
+
+def test_server_version(serve):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAY00040029")
+    server, client = serve(handler)
+    assert client.server_version() == 41
+    assert server.requests == [b"host:version"]
+    assert client.is_available()
+
+
+def test_malformed_version_is_client_error(serve):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAYzz")
+    _, client = serve(handler)
+    with pytest.raises(AdbClientError):
+        client.server_version()
+    assert not client.is_available()
+
+
+def test_shell_framing_and_newlines(serve):
+    server, client = serve(_okay_service(b"a\r\nb c\n"))
+    assert client.shell("emulator-5554", ["echo", "b c"]) == "a\nb c\n"
+    assert server.requests == [b"host:transport:emulator-5554", b"shell:echo 'b c'"]
+    # 字符串命令原样交给设备的shell
+    client.shell("emulator-5554", "screencap | gzip -1")
+    assert server.requests[-1] == b"shell:screencap | gzip -1"
+
+
+def test_exec_out_keeps_binary(serve):
+    payload = bytes(range(256)) * 100 + b"\r\n"
+    _, client = serve(_okay_service(payload))
+    assert client.exec_out("emulator-5554", ["screencap"]) == payload
+
+
+def test_fail_before_the_command_is_not_a_sent_error(serve):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"FAIL0010device not found")
+    _, client = serve(handler)
+    with pytest.raises(AdbClientError, match="device not found") as error:
+        client.shell("emulator-5554", ["input", "tap", "1", "2"])
+    assert not isinstance(error.value, AdbCommandSentError)
+
+
+def test_lost_connection_after_the_command_is_a_sent_error(serve):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        server.read_request(conn)
+    _, client = serve(handler)
+    with pytest.raises(AdbCommandSentError):
+        client.shell("emulator-5554", ["input", "tap", "1", "2"])
+
+
+def test_sync_pull_and_push(serve):
+    received = {}
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        command, length = struct.unpack("<4sI", AdbClient._recv_exactly(conn, 8))
+        path = AdbClient._recv_exactly(conn, length)
+        if command == b"RECV":
+            conn.sendall(b"DATA" + struct.pack("<I", 3) + b"abc" + b"DATA" + struct.pack("<I", 2) + b"de" + b"DONE" + struct.pack("<I", 0))
+            return
+        chunks = []
+        while True:
+            command, length = struct.unpack("<4sI", AdbClient._recv_exactly(conn, 8))
+            if command == b"DONE":
+                break
+            chunks.append(AdbClient._recv_exactly(conn, length))
+        received[path] = chunks
+        conn.sendall(b"OKAY" + struct.pack("<I", 0))
+    _, client = serve(handler)
+    assert client.pull("emulator-5554", "/data/local/tmp/a") == b"abcde"
+    data = b"x" * (AdbClient.SYNC_DATA_MAX + 10)
+    client.push("emulator-5554", data, "/data/local/tmp/b", mode=0o755)
+    assert received == {b"/data/local/tmp/b,493": [data[:AdbClient.SYNC_DATA_MAX], data[AdbClient.SYNC_DATA_MAX:]]}
@@ -0,0 +1,88 @@
+import gzip
+import struct
+import numpy as np
+import modules.utils.adb_utils as adb_utils
+
+
+class FakeConfig:
+    def __init__(self, **userconfig):
+        self.userconfigdict = {
+            "ADB_CONNECT_METHOD": "subprocess",
+            "ADB_DIRECT_USE_SERIAL_NUMBER": True,
+            "ADB_SEIAL_NUMBER": "emulator-5554",
+            "ADB_PATH": "adb",
+            "SCREENSHOT_METHOD": "raw",
+            "RAW_SCREENSHOT_COMPRESS": "none",
+            **userconfig,
+        }
+
+
+class FakeCompleted:
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+
+def _raw_frame(width = 4, height = 2):
+    """screencap不带-p时的输出: 宽、高、像素格式 + RGBA像素"""
+    pixels = np.zeros((height, width, 4), np.uint8)
+    pixels[..., 0] = 255
+    return struct.pack("<III", width, height, adb_utils.RAW_FORMAT_RGBA_8888) + pixels.tobytes()
+
+
+def test_subprocess_exec_out_keeps_string_command_whole(monkeypatch):
+    calls = []
+    monkeypatch.setattr(adb_utils, "subprocess_run", lambda cmd, **kwargs: calls.append(cmd) or FakeCompleted(b""))
+    adb_utils.adb_exec_out("screencap | gzip -1", FakeConfig())
+    adb_utils.adb_shell("echo 1", FakeConfig())
+    adb_utils.adb_exec_out(["screencap"], FakeConfig())
+    assert calls == [
+        ["adb", "-s", "emulator-5554", "exec-out", "screencap | gzip -1"],
+        ["adb", "-s", "emulator-5554", "shell", "echo 1"],
+        ["adb", "-s", "emulator-5554", "exec-out", "screencap"],
+    ]
+
+
+def test_subprocess_gzip_raw_screenshot(monkeypatch):
+    def fake_run(cmd, **kwargs):
+        assert cmd[-1] == "screencap | gzip -1"
+        return FakeCompleted(gzip.compress(_raw_frame()))
+    monkeypatch.setattr(adb_utils, "subprocess_run", fake_run)
+    frame = adb_utils._raw_screen_shot(FakeConfig(RAW_SCREENSHOT_COMPRESS="gzip"))
+    assert frame.shape == (2, 4, 3)
+    # RGBA的红色转换为BGR
+    assert frame[0, 0].tolist() == [0, 0, 255]
+
+
+class FailingAdbClient:
+    """socket通道: 命令发出后连接断开"""
+    def __init__(self):
+        self.reset_times = 0
+
+    def is_available(self):
+        return True
+
+    def reset_available(self):
+        self.reset_times += 1
+
+    def shell(self, serial, cmd):
+        raise adb_utils.AdbCommandSentError("connection reset")
+
+    def exec_out(self, serial, cmd):
+        raise adb_utils.AdbCommandSentError("connection reset")
+
+
+def test_sent_command_is_not_resent(monkeypatch):
+    calls = []
+    monkeypatch.setattr(adb_utils, "adb_client", FailingAdbClient())
+    monkeypatch.setattr(adb_utils, "subprocess_run", lambda cmd, **kwargs: calls.append(cmd) or FakeCompleted("x"))
+    assert adb_utils.adb_shell(["input", "tap", "1", "2"], FakeConfig(ADB_CONNECT_METHOD="socket")) == ""
+    assert adb_utils.adb_exec_out(["screencap"], FakeConfig(ADB_CONNECT_METHOD="socket")) == b""
+    assert calls == []
+
+
+def test_idempotent_query_is_retried_with_subprocess(monkeypatch):
+    calls = []
+    monkeypatch.setattr(adb_utils, "adb_client", FailingAdbClient())
+    monkeypatch.setattr(adb_utils, "subprocess_run", lambda cmd, **kwargs: calls.append(cmd) or FakeCompleted("window"))
+    assert adb_utils.adb_shell(["dumpsys", "window"], FakeConfig(ADB_CONNECT_METHOD="socket"), idempotent=True) == "window"
+    assert calls == [["adb", "-s", "emulator-5554", "shell", "dumpsys", "window"]]
@@ -0,0 +1,75 @@
+import os
+import cv2
+import numpy as np
+from modules.utils.digit_recognizer import GLYPH_FOLDER_NAME, DIGIT_MIN_CONFIDENCE, glyph_char, glyph_file_name, segment_glyphs, get_digit_recognizer
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def _render(text: str, scale = 1.0, gap = 6) -> np.ndarray:
+    """白底黑字逐个字符绘制，字符之间留gap像素"""
+    widths = [cv2.getTextSize(char, FONT, scale, 2)[0][0] for char in text]
+    height = int(40 * scale)
+    image = np.full((height, sum(widths) + gap * (len(text) + 1), 3), 255, np.uint8)
+    x = gap
+    for char, width in zip(text, widths):
+        cv2.putText(image, char, (x, int(height * 0.8)), FONT, scale, (0, 0, 0), 2)
+        x += width + gap
+    return image
+
+
+def _asset_root(tmp_path, chars = "0123456789/"):
+    """按segment_glyphs的切分结果把每个字符保存为字形"""
+    glyph_folder = tmp_path / GLYPH_FOLDER_NAME
+    glyph_folder.mkdir()
+    for char in chars:
+        (_, glyph), = segment_glyphs(_render(char))
+        cv2.imwrite(str(glyph_folder / f"{glyph_file_name(char)}_0.png"), glyph)
+    return str(tmp_path)
+
+
+def test_glyph_file_names():
+    assert glyph_file_name("/") == "slash" and glyph_char("slash_3.png") == "/"
+    assert glyph_file_name("7") == "7" and glyph_char(os.path.join("DIGIT", "7_0.png")) == "7"
+
+
+def test_segment_glyphs_left_to_right_on_dark_background():
+    image = 255 - _render("1/2")
+    glyphs = segment_glyphs(image)
+    assert len(glyphs) == 3
+    assert [x for x, _ in glyphs] == sorted(x for x, _ in glyphs)
+
+
+def test_recognizes_rendered_numbers(tmp_path):
+    recognizer = get_digit_recognizer(_asset_root(tmp_path))
+    assert recognizer.available()
+    for text in ["120/240", "9876543210", "5"]:
+        result, confidence = recognizer.recognize(_render(text))
+        assert result == text and confidence >= DIGIT_MIN_CONFIDENCE
+    # 缩放后的字符也能识别
+    assert recognizer.recognize(_render("3407", scale=1.5))[0] == "3407"
+
+
+def test_splits_touching_characters(tmp_path):
+    recognizer = get_digit_recognizer(_asset_root(tmp_path))
+    # 字符之间重叠2像素，相邻字符连成一个连通域
+    widths = [cv2.getTextSize(char, FONT, 1.0, 2)[0][0] for char in "4808"]
+    image = np.full((40, sum(widths) + 10, 3), 255, np.uint8)
+    x = 4
+    for char, width in zip("4808", widths):
+        cv2.putText(image, char, (x, 32), FONT, 1.0, (0, 0, 0), 2)
+        x += width - 2
+    assert len(segment_glyphs(image)) < 4
+    assert recognizer.recognize(image)[0] == "4808"
+
+
+def test_unknown_characters_have_low_confidence(tmp_path):
+    recognizer = get_digit_recognizer(_asset_root(tmp_path))
+    assert recognizer.recognize(_render("AK"))[1] < DIGIT_MIN_CONFIDENCE
+    assert recognizer.recognize(np.full((20, 40, 3), 255, np.uint8)) == ("", 0)
+
+
+def test_missing_glyph_folder(tmp_path):
+    recognizer = get_digit_recognizer(str(tmp_path))
+    assert not recognizer.available()
+    assert recognizer.recognize(_render("1")) == ("", 0)
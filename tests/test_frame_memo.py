@@ -0,0 +1,64 @@
+import pytest
+from modules.configs.MyConfig import config
+from modules.utils.frame_memo import FrameMemo, new_frame_id
+
+
+@pytest.fixture
+def session(monkeypatch):
+    sessiondict = {"SCREENSHOT_FRAME_ID": None, "CURRENT_TASK_NAME": "test", "RUN_STATS": {}}
+    monkeypatch.setattr(config, "sessiondict", sessiondict)
+    return sessiondict
+
+
+def _counting(value):
+    calls = []
+    return calls, lambda: calls.append(1) or value
+
+
+def test_same_frame_is_computed_once(session):
+    memo = FrameMemo()
+    new_frame_id()
+    calls, func = _counting("result")
+    assert memo.get_or_compute("match", ("a.png", 0.9), func) == "result"
+    assert memo.get_or_compute("match", ("a.png", 0.9), func) == "result"
+    assert len(calls) == 1
+    assert memo.is_cached("match", ("a.png", 0.9))
+    assert not memo.is_cached("match", ("a.png", 0.8))
+    assert session["RUN_STATS"]["test"]["memo_match_hit"] == 1
+
+
+def test_new_frame_invalidates(session):
+    memo = FrameMemo()
+    new_frame_id()
+    calls, func = _counting("result")
+    memo.get_or_compute("ocr", (1,), func)
+    new_frame_id()
+    assert not memo.is_cached("ocr", (1,))
+    memo.get_or_compute("ocr", (1,), func)
+    assert len(calls) == 2
+
+
+def test_no_frame_and_none_results_are_not_cached(session):
+    memo = FrameMemo()
+    calls, func = _counting("result")
+    memo.get_or_compute("pixel", (), func)
+    memo.get_or_compute("pixel", (), func)
+    assert len(calls) == 2
+    new_frame_id()
+    calls, func = _counting(None)
+    memo.get_or_compute("png", (), func)
+    memo.get_or_compute("png", (), func)
+    assert len(calls) == 2
+
+
+def test_result_computed_across_a_frame_change_is_dropped(session):
+    memo = FrameMemo()
+    new_frame_id()
+    def compute_on_old_frame():
+        # 计算期间截图换了帧，并且其他线程已经在新帧上使用缓存
+        new_frame_id()
+        memo.get_or_compute("pixel", (), lambda: True)
+        return "old frame result"
+    memo.get_or_compute("match", ("a.png",), compute_on_old_frame)
+    assert memo.is_cached("pixel", ())
+    assert not memo.is_cached("match", ("a.png",))
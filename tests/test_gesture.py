@@ -0,0 +1,52 @@
+import time
+from modules.utils.adb_utils import MaaTouchUtils
+from modules.utils.gesture import Gesture, GestureHandle
+
+
+def _script_wait_ms(script: str) -> int:
+    return sum(int(line.split()[1]) for line in script.splitlines() if line.startswith("w "))
+
+
+def test_tap_and_wait_script():
+    gesture = Gesture().tap(100, 200.7).wait(150).tap(300, 200)
+    assert gesture.to_maatouch_script(MaaTouchUtils()) == (
+        "d 0 100 200 100\nc\nu 0\nc\n"
+        "w 150\n"
+        "d 0 300 200 100\nc\nu 0\nc\n"
+    )
+    assert gesture.duration_ms() == 150
+
+
+def test_swipe_waits_add_up_to_duration():
+    maatouch = MaaTouchUtils()
+    for ms in [1, 19, 20, 40, 50, 100, 333]:
+        gesture = Gesture().swipe(0, 0, 100, 50, ms)
+        script = gesture.to_maatouch_script(maatouch)
+        assert _script_wait_ms(script) == gesture.duration_ms() == ms
+        lines = script.splitlines()
+        assert lines[0] == "d 0 0 0 100" and lines[-4:] == ["m 0 100 50 100", "c", "u 0", "c"]
+        # 每次等待都不超过细粒度
+        assert all(int(line.split()[1]) <= maatouch.time_step for line in lines if line.startswith("w "))
+
+
+def test_mixed_gesture_duration():
+    gesture = Gesture().tap(1, 1).swipe(0, 0, 10, 10, 300).wait(0).wait(200).tap(2, 2)
+    script = gesture.to_maatouch_script(MaaTouchUtils())
+    assert gesture.duration_ms() == _script_wait_ms(script) == 500
+    # 0毫秒的等待不生成w命令
+    assert "w 0" not in script
+
+
+def test_run_with_executes_in_order():
+    calls = []
+    start = time.time()
+    Gesture().tap(1, 2).wait(50).swipe(1, 2, 3, 4, 10).run_with(lambda x, y: calls.append(("tap", x, y)), lambda *args: calls.append(("swipe",) + args))
+    assert calls == [("tap", 1, 2), ("swipe", 1, 2, 3, 4, 10)]
+    assert time.time() - start >= 0.05
+
+
+def test_handle_waits_until_end_time():
+    handle = GestureHandle(time.time() + 0.05)
+    assert not handle.done()
+    handle.wait()
+    assert handle.done()
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from modules.utils.image_processing import non_max_suppression
+
+
+def _reference_nms(result, threshold, w, h):
+    """原来逐点比较的写法"""
+    ys, xs = np.where(result >= threshold)
+    points = sorted(((x, y, result[y, x]) for x, y in zip(xs, ys)), key=lambda p: p[2], reverse=True)
+    kept = []
+    for x, y, val in points:
+        if all(not (abs(x - fx) < w / 2 and abs(y - fy) < h / 2) for fx, fy, _ in kept):
+            kept.append((int(x), int(y), float(val)))
+    return kept
+
+
+def test_matches_pointwise_suppression():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        result = rng.random((60, 80)).astype(np.float32)
+        assert non_max_suppression(result, 0.9, 12, 8, max_matches=1000) == _reference_nms(result, 0.9, 12, 8)
+
+
+def test_max_matches_and_inf_scores():
+    result = np.zeros((50, 50), np.float32)
+    result[5, 5], result[5, 30], result[30, 5] = 0.99, 0.97, 0.95
+    result[40, 40] = np.inf
+    assert non_max_suppression(result, 0.9, 10, 10, max_matches=2) == [(5, 5, pytest.approx(0.99)), (30, 5, pytest.approx(0.97))]
+
+
+def test_many_candidates_keep_each_peak():
+    # 两个平滑的峰，候选点数超过NMS_DILATE_MIN_CANDIDATES，走先膨胀的分支
+    ys, xs = np.mgrid[0:200, 0:200]
+    result = np.maximum(1 - np.hypot(xs - 50, ys - 60) / 100, 0.98 - np.hypot(xs - 150, ys - 140) / 100).astype(np.float32)
+    matches = non_max_suppression(result, 0.5, 40, 40)
+    assert [(x, y) for x, y, _ in matches] == [(50, 60), (150, 140)]
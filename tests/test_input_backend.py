@@ -0,0 +1,81 @@
+import io
+import os
+import time
+import pytest
+import modules.utils.input_backend as input_backend
+from modules.utils.input_backend import InputBackend, InputRouter, ShellInput
+
+
+class FakeBackend(InputBackend):
+    """记录收到的操作，available为False时不可用，fail_on_tap时在“写入”之后抛出异常"""
+    def __init__(self, name, available = True, fail_on_tap = False):
+        super().__init__(None)
+        self.name = name
+        self.available = available
+        self.fail_on_tap = fail_on_tap
+        self.taps = []
+        self.closed = False
+
+    def is_available(self):
+        return self.available
+
+    def tap(self, x, y):
+        self.taps.append((x, y))
+        if self.fail_on_tap:
+            raise OSError("broken pipe")
+
+    def close(self):
+        self.closed = True
+
+
+def _router(*backends):
+    router = InputRouter(None, "subprocess")
+    router.backends = list(backends)
+    return router
+
+
+def test_unavailable_backend_falls_back():
+    first, last = FakeBackend("shell", available=False), FakeBackend("subprocess")
+    router = _router(first, last)
+    router.tap(1, 2)
+    assert last.taps == [(1, 2)]
+    assert first.closed and router.current_method() == "subprocess"
+
+
+def test_error_after_write_is_not_resent():
+    first, last = FakeBackend("shell", fail_on_tap=True), FakeBackend("subprocess")
+    router = _router(first, last)
+    router.tap(1, 2)
+    # 出错的操作只发送过一次，之后的操作改用下一种方式
+    assert first.taps == [(1, 2)] and last.taps == []
+    router.tap(3, 4)
+    assert first.taps == [(1, 2)] and last.taps == [(3, 4)]
+
+
+def test_error_in_last_backend_is_dropped():
+    last = FakeBackend("subprocess", fail_on_tap=True)
+    router = _router(last)
+    router.tap(1, 2)
+    router.tap(3, 4)
+    assert last.taps == [(1, 2), (3, 4)]
+
+
+def test_shell_session_read_times_out(monkeypatch):
+    monkeypatch.setattr(input_backend, "SHELL_INPUT_TIMEOUT", 0.2)
+    read_fd, write_fd = os.pipe()
+    shell = ShellInput(None)
+    shell._reader, shell._writer = os.fdopen(read_fd, "rb"), io.BytesIO()
+    shell._start_reader()
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        shell._execute("input tap 1 2")
+    assert time.monotonic() - start < 2
+    assert shell._writer.getvalue() == b"input tap 1 2; echo BAAH_INPUT_1\n"
+    os.close(write_fd)
+
+
+def test_shell_session_reads_marker():
+    shell = ShellInput(None)
+    shell._reader, shell._writer = io.BytesIO(b"noise\nBAAH_INPUT_1\n"), io.BytesIO()
+    shell._start_reader()
+    shell._execute("true")
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import modules.utils.image_processing as image_processing
+from modules.configs.MyConfig import config
+from modules.utils.ocr_cache import OcrCache
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(config, "sessiondict", {"CURRENT_TASK_NAME": "test", "RUN_STATS": {}})
+
+
+def _screen():
+    rng = np.random.default_rng(0)
+    screen = np.zeros((100, 200, 3), np.uint8)
+    screen[10:30, 10:60] = rng.integers(0, 255, (20, 50, 3))
+    screen[60:80, 110:160] = screen[10:30, 10:60]
+    return screen
+
+
+def test_key_depends_on_pixels_shape_and_extra():
+    screen = _screen()
+    key = OcrCache.make_key(screen[10:30, 10:60], "en", False)
+    # 同样的像素出现在别的位置，不连续的切片与连续的副本键相同
+    assert OcrCache.make_key(screen[60:80, 110:160], "en", False) == key
+    assert OcrCache.make_key(screen[10:30, 10:60].copy(), "en", False) == key
+    assert OcrCache.make_key(screen[10:30, 10:60], "zh", False) != key
+    assert OcrCache.make_key(screen[10:30, 10:60], "en", True, 10, 10) != key
+    assert OcrCache.make_key(screen[10:30, 11:61], "en", False) != key
+    # 字节相同但形状不同
+    flat = np.zeros((2, 6), np.uint8)
+    assert OcrCache.make_key(flat) != OcrCache.make_key(flat.reshape(3, 4))
+
+
+def test_hits_return_copies_and_lru_evicts(session):
+    cache = OcrCache(max_size=2)
+    calls = []
+    compute = lambda: calls.append(1) or ["text", 0.9]
+    first = cache.get_or_compute(("a",), compute)
+    first[0] = "changed"
+    assert cache.get_or_compute(("a",), compute) == ["text", 0.9]
+    cache.get_or_compute(("b",), compute)
+    cache.get_or_compute(("a",), compute)
+    cache.get_or_compute(("c",), compute)
+    # b最久没有用到，被挤出
+    assert cache.contains(("a",)) and not cache.contains(("b",)) and cache.contains(("c",))
+    assert len(calls) == 3
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_same_pixels_elsewhere_skip_recognition(session, monkeypatch):
+    calls = []
+    monkeypatch.setattr(image_processing, "ocr_cache", OcrCache())
+    monkeypatch.setattr(image_processing.ocr_registry, "ocr_lines", lambda model, crops: calls.append(len(crops)) or [("12", 0.99)] * len(crops))
+    screen = _screen()
+    assert image_processing.ocr_pic_area(screen, 10, 10, 60, 30)[0] == "12"
+    assert image_processing.ocr_pic_area(screen, 110, 60, 160, 80)[0] == "12"
+    assert image_processing.ocr_pic_areas(screen, [(10, 10, 60, 30), (0, 0, 50, 20)]) == [["12", 0.99], ["12", 0.99]]
+    assert calls == [1, 1]
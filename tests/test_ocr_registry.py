@@ -0,0 +1,36 @@
+import numpy as np
+from modules.utils.ocr_registry import ocr_lines_grouped
+
+
+class FakeRecognizer:
+    rec_image_shape = [3, 48, 320]
+
+
+class FakeOcrSystem:
+    """记录每次识别的一批图像，识别结果为图像宽度"""
+    def __init__(self):
+        self.text_recognizer = FakeRecognizer()
+        self.batches = []
+
+    def ocr_lines(self, img_list):
+        self.batches.append([img.shape[1] for img in img_list])
+        return [[str(img.shape[1]), 0.9] for img in img_list]
+
+
+def _crop(width, height = 30):
+    return np.zeros((height, width, 3), np.uint8)
+
+
+def test_similar_widths_share_one_batch():
+    ocr_sys = FakeOcrSystem()
+    crops = [_crop(w) for w in [80, 160, 170, 70, 140]]
+    results = ocr_lines_grouped(ocr_sys, crops)
+    # 结果与输入顺序一致
+    assert [text for text, _ in results] == ["80", "160", "170", "70", "140"]
+    assert sorted(map(sorted, ocr_sys.batches)) == [[70, 80], [140, 160, 170]]
+
+
+def test_wide_crop_does_not_pad_narrow_ones():
+    ocr_sys = FakeOcrSystem()
+    ocr_lines_grouped(ocr_sys, [_crop(60), _crop(600), _crop(64)])
+    assert sorted(map(sorted, ocr_sys.batches)) == [[60, 64], [600]]
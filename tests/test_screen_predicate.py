@@ -0,0 +1,62 @@
+import pytest
+import modules.utils
+import modules.utils.screen_predicate as screen_predicate
+from modules.configs.MyConfig import config
+from modules.utils.screen_predicate import PixelCheck, MatchCheck, OcrCheck, DEFAULT_LATENCY
+
+
+@pytest.fixture
+def primitives(monkeypatch):
+    """替换基本判断的计算函数，按调用顺序记录"""
+    monkeypatch.setattr(config, "sessiondict", {"SCREENSHOT_FRAME_ID": None, "CURRENT_TASK_NAME": "test", "RUN_STATS": {}})
+    monkeypatch.setattr(screen_predicate, "_latencies", {})
+    calls = []
+    results = {"pixel": True, "match": True, "ocr": "Lv.90"}
+    monkeypatch.setattr(modules.utils, "match_pixel", lambda xy, color: calls.append("pixel") or results["pixel"], raising=False)
+    monkeypatch.setattr(modules.utils, "match", lambda imgurl, threshold, rotate_trans: calls.append("match") or results["match"], raising=False)
+    monkeypatch.setattr(modules.utils, "ocr_area", lambda frompixel, topixel, ocr_lang: calls.append("ocr") or (results["ocr"], 1.0), raising=False)
+    return calls, results
+
+
+def _checks():
+    return OcrCheck((10, 10), (0, 0), "Lv"), MatchCheck("a.png"), PixelCheck((1, 2), [(0, 0, 0), (255, 255, 255)])
+
+
+def test_and_runs_cheapest_first_and_short_circuits(primitives):
+    calls, results = primitives
+    ocr, match, pixel = _checks()
+    assert (ocr & match & pixel).evaluate()
+    assert calls == ["pixel", "match", "ocr"]
+    # 假的基本判断实测耗时都接近0，回到预估耗时再比较顺序
+    screen_predicate._latencies.clear()
+    calls.clear()
+    results["pixel"] = False
+    assert not (ocr & match & pixel).evaluate()
+    assert calls == ["pixel"]
+
+
+def test_or_short_circuits_on_first_true(primitives):
+    calls, results = primitives
+    ocr, match, pixel = _checks()
+    results["pixel"] = False
+    assert (ocr | match | pixel).evaluate()
+    assert calls == ["pixel", "match"]
+
+
+def test_not_and_text_tests(primitives):
+    calls, results = primitives
+    ocr, _, pixel = _checks()
+    assert not (~pixel).evaluate()
+    assert OcrCheck((0, 0), (10, 10), lambda text: text.endswith("90")).evaluate()
+    assert not OcrCheck((0, 0), (10, 10), "Lv.80").evaluate()
+
+
+def test_measured_latency_reorders(primitives):
+    calls, results = primitives
+    ocr, match, pixel = _checks()
+    assert pixel.cost() == DEFAULT_LATENCY["pixel"]
+    # 实测的模板匹配比文字识别慢时，先做文字识别
+    screen_predicate._latencies[("match", match._key())] = 1.0
+    (ocr & match).evaluate()
+    assert calls == ["ocr", "match"]
+    assert screen_predicate._latencies[("match", match._key())] < 1.0
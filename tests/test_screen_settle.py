@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import modules.utils.screen_settle as screen_settle
+from modules.utils.input_journal import input_journal
+from modules.utils.screen_settle import settle_reference, settle_thumbnail, thumbnails_differ, wait_screen_settle
+
+RESPONSE_TIME = 0.15
+"""假设备点击后画面变化所需的秒数"""
+
+
+class FakeConfig:
+    def __init__(self):
+        self.userconfigdict = {}
+        self.sessiondict = {"SETTLE_LAST_THUMBNAIL": None, "CURRENT_TASK_NAME": "test", "RUN_STATS": {}}
+
+
+class FakeDevice:
+    """每次点击后，画面在RESPONSE_TIME秒后变为下一种亮度"""
+    def __init__(self):
+        self.changes = []
+
+    def click(self):
+        input_journal.record("click")
+        self.changes.append(time.time() + RESPONSE_TIME)
+
+    def frame(self):
+        level = sum(1 for change_time in self.changes if change_time <= time.time())
+        return np.full((90, 160, 3), level * 60, np.uint8)
+
+
+def test_back_to_back_clicks_wait_for_the_second_change(monkeypatch):
+    input_journal.clear()
+    device, fake_config = FakeDevice(), FakeConfig()
+    monkeypatch.setattr(screen_settle, "_next_frame", lambda after_time, timeout, use_config=None: time.sleep(0.01) or device.frame())
+    screenshot, screenshot_time = device.frame(), time.time()
+
+    device.click()
+    wait_screen_settle(settle_reference(screenshot, screenshot_time, fake_config), 2, 0.05, fake_config)
+    # 两次点击之间没有截图，当前截图已经过时，用第一次等待看到的最后一帧作为第二次点击前的画面
+    device.click()
+    reference = settle_reference(screenshot, screenshot_time, fake_config)
+    assert not thumbnails_differ(reference, settle_thumbnail(np.full((90, 160, 3), 60, np.uint8)))
+    waited = wait_screen_settle(reference, 2, 0.05, fake_config)
+    assert RESPONSE_TIME <= waited < 2
+    assert device.frame()[0, 0, 0] == 120
+
+
+def test_reference_is_dropped_after_an_unseen_input():
+    input_journal.clear()
+    device, fake_config = FakeDevice(), FakeConfig()
+    screenshot, screenshot_time = device.frame(), time.time()
+    device.click()
+    device.click()
+    assert settle_reference(screenshot, screenshot_time, fake_config) is None
@@ -0,0 +1,74 @@
+import pytest
+from modules.configs.MyConfig import config
+from modules.utils.screen_predicate import Predicate
+from modules.utils.screen_watchdog import ScreenWatchdog, WatchdogDetector
+
+
+class FlagPredicate(Predicate):
+    def __init__(self, value):
+        self.value = value
+        self.evaluations = 0
+
+    def evaluate(self):
+        self.evaluations += 1
+        return self.value
+
+    def cost(self):
+        return 0
+
+
+@pytest.fixture
+def session(monkeypatch):
+    sessiondict = {"CURRENT_TASK_NAME": "test", "RUN_STATS": {}}
+    monkeypatch.setattr(config, "sessiondict", sessiondict)
+    return sessiondict
+
+
+def _detector(precondition, interval = 0, found = True):
+    confirms, detects = [], []
+    detector = WatchdogDetector("popup", precondition, lambda: confirms.append(1) or found, lambda: detects.append(1), interval)
+    return detector, confirms, detects
+
+
+def test_confirm_only_runs_when_precondition_holds(session):
+    precondition = FlagPredicate(False)
+    detector, confirms, detects = _detector(precondition)
+    watchdog = ScreenWatchdog()
+    watchdog.register(detector)
+    watchdog.check()
+    assert precondition.evaluations == 1 and confirms == [] and detects == []
+    precondition.value = True
+    watchdog.check()
+    assert confirms == [1] and detects == [1]
+    assert session["RUN_STATS"]["test"]["watchdog_frames"] == 2
+
+
+def test_interval_limits_confirm_not_precondition(session):
+    precondition = FlagPredicate(True)
+    detector, confirms, _ = _detector(precondition, interval=60, found=False)
+    watchdog = ScreenWatchdog()
+    watchdog.register(detector)
+    for _ in range(3):
+        watchdog.check()
+    assert precondition.evaluations == 3 and confirms == [1]
+
+
+def test_interval_starts_at_first_confirm(session):
+    # 前置条件一直不成立时不消耗间隔，之后第一次成立立即确认
+    precondition = FlagPredicate(False)
+    detector, confirms, _ = _detector(precondition, interval=60)
+    watchdog = ScreenWatchdog()
+    watchdog.register(detector)
+    watchdog.check()
+    precondition.value = True
+    watchdog.check()
+    assert confirms == [1]
+
+
+def test_register_replaces_same_name(session):
+    watchdog = ScreenWatchdog()
+    watchdog.register(_detector(FlagPredicate(True))[0])
+    replacement, confirms, _ = _detector(FlagPredicate(True))
+    watchdog.register(replacement)
+    watchdog.check()
+    assert watchdog.detectors == [replacement] and confirms == [1]
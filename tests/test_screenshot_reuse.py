@@ -0,0 +1,64 @@
+import time
+import numpy as np
+import pytest
+import modules.utils as utils
+from modules.configs.MyConfig import config
+from modules.utils.adb_utils import mark_input_action
+from modules.utils.frame_memo import new_frame_id
+from modules.utils.input_journal import input_journal
+
+
+@pytest.fixture
+def captures(monkeypatch):
+    """替换截图，记录实际截图的次数"""
+    monkeypatch.setattr(config, "userconfigdict", {"SCREENSHOT_REUSE_AGE": 0.3, "SCREENSHOT_METHOD": "raw"})
+    monkeypatch.setattr(config, "sessiondict", {
+        "SCREENSHOT_DATA": None, "SCREENSHOT_FRAME_ID": None, "SCREENSHOT_TIME": 0, "LAST_INPUT_TIME": 0,
+        "CURRENT_TASK_NAME": "test", "RUN_STATS": {},
+    })
+    captures = []
+    def fake_capture(output_png = False):
+        captures.append(1)
+        config.sessiondict["SCREENSHOT_DATA"] = np.zeros((9, 16, 3), np.uint8)
+        new_frame_id()
+    monkeypatch.setattr(utils, "screen_shot_to_global", fake_capture)
+    monkeypatch.setattr(utils, "use_continuous_capture", lambda use_config=None: False)
+    monkeypatch.setattr(utils, "record_latency", lambda *args, **kwargs: None)
+    monkeypatch.setattr(utils, "_global_screenshot_check", lambda: None)
+    monkeypatch.setattr(utils, "_update_history_screenshot_list", lambda: None)
+    input_journal.clear()
+    return captures
+
+
+def test_fresh_frame_is_reused_until_an_input(captures):
+    utils.screenshot()
+    utils.screenshot()
+    assert len(captures) == 1
+    assert config.sessiondict["RUN_STATS"]["test"]["screenshot_reused"] == 1
+    mark_input_action(kind="click", detail=(1, 2))
+    utils.screenshot()
+    assert len(captures) == 2
+    assert [entry[1] for entry in input_journal.entries()] == ["click"]
+
+
+def test_gesture_running_past_the_frame_blocks_reuse(captures):
+    utils.screenshot()
+    mark_input_action(kind="gesture", until=time.time() + 10)
+    # 截图时间晚于手势提交，但手势还没有执行完
+    config.sessiondict["SCREENSHOT_TIME"] = time.time()
+    utils.screenshot()
+    assert len(captures) == 2
+
+
+def test_old_frame_and_disabled_reuse(captures):
+    utils.screenshot()
+    config.sessiondict["SCREENSHOT_TIME"] -= 1
+    utils.screenshot()
+    assert len(captures) == 2
+    config.userconfigdict["SCREENSHOT_REUSE_AGE"] = 0
+    utils.screenshot()
+    assert len(captures) == 3
+    # 强制保存png时总是重新截图
+    config.userconfigdict["SCREENSHOT_REUSE_AGE"] = 0.3
+    utils.screenshot(output_png=True)
+    assert len(captures) == 4
@@ -0,0 +1,58 @@
+import pytest
+import modules.utils.timing_profile as timing_profile
+from modules.utils.timing_profile import REFERENCE_TAP_LATENCY, DRIFT_MIN_SAMPLES, timing_scale, scaled_wait, get_respond_y, record_latency, timing_calibration_needed
+
+
+class FakeConfig:
+    def __init__(self, profile = None, **userconfig):
+        self.userconfigdict = {
+            "TIMING_PROFILE_SCALE": True,
+            "ADB_DIRECT_USE_SERIAL_NUMBER": True,
+            "ADB_SEIAL_NUMBER": "emulator-5554",
+            "RESPOND_Y": 40,
+            **userconfig,
+        }
+        self.userstoragedict = {"TIMING_PROFILE": profile or {}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(timing_profile, "_observed", {})
+    monkeypatch.setattr(timing_profile, "_drift_detected", False)
+    monkeypatch.setattr(timing_profile, "_last_calibration_attempt", None)
+
+
+def test_scale_follows_tap_latency_within_range():
+    assert timing_scale(FakeConfig()) == 1
+    assert timing_scale(FakeConfig({"tap_latency": REFERENCE_TAP_LATENCY / 2})) == pytest.approx(0.5)
+    assert timing_scale(FakeConfig({"tap_latency": 0.01})) == timing_profile.TIMING_SCALE_RANGE[0]
+    assert timing_scale(FakeConfig({"tap_latency": 10})) == timing_profile.TIMING_SCALE_RANGE[1]
+    assert timing_scale(FakeConfig({"tap_latency": 0.15}, TIMING_PROFILE_SCALE=False)) == 1
+    assert scaled_wait(2, FakeConfig({"tap_latency": 0.15})) == pytest.approx(1)
+
+
+def test_respond_y_uses_measured_scroll_response():
+    assert get_respond_y(FakeConfig()) == 40
+    assert get_respond_y(FakeConfig({"scroll_response": 25})) == 25
+    assert get_respond_y(FakeConfig({"scroll_response": 25}, TIMING_PROFILE_SCALE=False)) == 40
+
+
+def test_calibration_needed_for_new_device_or_drift():
+    profile = {"tap_latency": 0.2, "screencap_latency": 0.1, "device": "emulator-5554"}
+    target_config = FakeConfig(profile)
+    assert not timing_calibration_needed(target_config)
+    assert timing_calibration_needed(FakeConfig(profile, ADB_SEIAL_NUMBER="127.0.0.1:16384"))
+    assert timing_calibration_needed(FakeConfig())
+    # 偏离档案的耗时要累计到DRIFT_MIN_SAMPLES次才算
+    for _ in range(DRIFT_MIN_SAMPLES - 1):
+        record_latency("screencap_latency", 0.5, target_config)
+    assert not timing_calibration_needed(target_config)
+    record_latency("screencap_latency", 0.5, target_config)
+    assert timing_calibration_needed(target_config)
+
+
+def test_latency_close_to_profile_is_not_drift():
+    target_config = FakeConfig({"tap_latency": 0.2, "screencap_latency": 0.1, "device": "emulator-5554"})
+    for _ in range(DRIFT_MIN_SAMPLES * 2):
+        record_latency("screencap_latency", 0.12, target_config)
+    assert not timing_calibration_needed(target_config)